@@ -0,0 +1,211 @@
+import functools
+import re
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columnas del reporte consular: nombre limpio -> encabezados conocidos.
+# Los encabezados se comparan normalizados (sin acentos, sin mayúsculas y con
+# los espacios colapsados), así que basta una variante por forma de escribirlos.
+# Concepto está vacío en los reportes; Articulo se usa como categoría.
+REPORT_COLUMNS = {
+    'servicio': ['Servicio'],
+    'categoria': ['Articulo'],
+    'costo_unitario': ['Derechos'],
+    'num_tramites': ['No. de trámites'],
+    'ingresos_totales': ['Importe USD'],
+    'fecha_emision': ['Fecha recaudación'],
+    'formas_canceladas': ['No. cancelados']
+}
+
+# Columnas sin las cuales el archivo no es válido (etiqueta para los mensajes)
+REQUIRED_COLUMNS = {
+    'servicio': 'Servicio',
+    'categoria': 'Articulo',
+    'costo_unitario': 'Derechos',
+    'num_tramites': 'Tramites',
+    'ingresos_totales': 'Importe',
+    'fecha_emision': 'Fecha'
+}
+
+# Tipos de las columnas limpias
+CURRENCY_COLUMNS = ['costo_unitario', 'ingresos_totales']
+COUNT_COLUMNS = ['num_tramites', 'formas_canceladas']
+DATE_FORMAT = '%d/%m/%Y'
+
+# Símbolos que acompañan a los importes en texto ("$1,234.00", "USD 80")
+CURRENCY_NOISE_PATTERN = r'[$,\s]|USD'
+
+# Caracter de reemplazo que dejan los reportes mal decodificados ('tr�mites')
+REPLACEMENT_CHAR = '�'
+
+
+def normalize_header(name) -> str:
+    """
+    Normaliza un encabezado para compararlo: repara UTF-8 leído como Latin-1,
+    descompone (NFKD) y quita los acentos, pasa a minúsculas (casefold) y
+    colapsa los espacios.
+
+    Args:
+        name: Encabezado tal como se leyó
+
+    Returns:
+        Encabezado normalizado
+    """
+    text = str(name)
+    try:
+        # 'trÃ¡mites' -> 'trámites'
+        text = text.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+# Encabezado normalizado -> nombre limpio, compilado una sola vez
+HEADER_ALIASES = {
+    normalize_header(header): column
+    for column, headers in REPORT_COLUMNS.items()
+    for header in headers
+}
+
+
+class ColumnResolution(NamedTuple):
+    """Resultado de resolver los encabezados de un archivo"""
+    rename: Dict            # encabezado original -> nombre limpio
+    found: Dict             # nombre limpio -> encabezado original
+    missing: Tuple          # columnas requeridas no encontradas
+
+
+def _match_header(normalized: str):
+    """Busca el nombre limpio de un encabezado normalizado"""
+    column = HEADER_ALIASES.get(normalized)
+    if column is not None or REPLACEMENT_CHAR not in normalized:
+        return column
+
+    # Cada caracter perdido en la decodificación equivale a un caracter cualquiera
+    pattern = re.compile('.'.join(re.escape(part) for part in normalized.split(REPLACEMENT_CHAR)))
+    for alias, column in HEADER_ALIASES.items():
+        if pattern.fullmatch(alias):
+            return column
+    return None
+
+
+@functools.lru_cache(maxsize=64)
+def _resolve_signature(headers: Tuple) -> ColumnResolution:
+    """Resuelve una firma de encabezados (cacheada: mismos encabezados, mismo resultado)"""
+    rename = {}
+    found = {}
+    for header in headers:
+        column = _match_header(normalize_header(header))
+        # Si dos encabezados resuelven a la misma columna, gana el primero
+        if column is not None and column not in found:
+            rename[header] = column
+            found[column] = header
+
+    missing = tuple(column for column in REQUIRED_COLUMNS if column not in found)
+    return ColumnResolution(rename, found, missing)
+
+
+def resolve_columns(headers: Iterable) -> ColumnResolution:
+    """
+    Asocia los encabezados de un archivo con las columnas del reporte.
+
+    Los archivos con el mismo diseño comparten la resolución: la segunda vez
+    solo se busca la firma en la caché.
+
+    Args:
+        headers: Encabezados en el orden del archivo
+
+    Returns:
+        ColumnResolution con el renombrado, las columnas encontradas y las faltantes
+    """
+    return _resolve_signature(tuple(headers))
+
+
+def describe_missing(missing: Iterable[str]) -> List[str]:
+    """Describe las columnas faltantes con los encabezados que se buscaron"""
+    return [
+        f'{REQUIRED_COLUMNS[column]} (buscado: {", ".join(REPORT_COLUMNS[column])})'
+        for column in missing
+    ]
+
+
+def parse_currency(values: pd.Series) -> pd.Series:
+    """
+    Convierte importes a float64 de forma vectorizada.
+
+    Las columnas que ya son numéricas solo cambian de tipo; el texto se limpia
+    de '$', 'USD', separadores de miles y espacios. Lo que no es un número
+    queda como NaN.
+
+    Args:
+        values: Columna de importes
+
+    Returns:
+        Serie float64
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+
+    text = values.astype('string').str.replace(CURRENCY_NOISE_PATTERN, '', regex=True)
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def parse_count(values: pd.Series) -> pd.Series:
+    """
+    Convierte conteos a int64, o a float64 si hay valores vacíos o no enteros.
+
+    Args:
+        values: Columna de conteos
+
+    Returns:
+        Serie int64 o float64
+    """
+    numbers = parse_currency(values)
+    as_array = numbers.to_numpy()
+    if not np.isnan(as_array).any() and np.array_equal(as_array, np.trunc(as_array)):
+        return numbers.astype('int64')
+    return numbers
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Convierte fechas DD/MM/AAAA a datetime64; las inválidas quedan como NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Renombra las columnas del reporte y las convierte a sus tipos.
+
+    Args:
+        df: Datos tal como se leyeron del archivo
+
+    Returns:
+        DataFrame con nombres limpios y tipos explícitos (sin filtrar filas)
+
+    Raises:
+        Exception: Si faltan columnas requeridas
+    """
+    resolution = resolve_columns(df.columns)
+    if resolution.missing:
+        raise Exception(f'Columnas faltantes: {", ".join(describe_missing(resolution.missing))}')
+
+    df = df.rename(columns=resolution.rename)
+
+    df['fecha_emision'] = parse_dates(df['fecha_emision'])
+    for column in CURRENCY_COLUMNS:
+        df[column] = parse_currency(df[column])
+    for column in COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_count(df[column])
+        else:
+            # Columna opcional: sin cancelaciones reportadas
+            df[column] = np.zeros(len(df), dtype='int64')
+
+    return df
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Callable, Dict, Optional
+
+# Perfil de pragmas aplicado a cada conexión nueva.
+# journal_mode es persistente en el archivo, por lo que solo se fija una vez por ruta.
+PRAGMA_PROFILE = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,     # 256 MB
+    'cache_size': -65536,       # 64 MB (valor negativo = KiB)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 30000
+}
+JOURNAL_MODE = 'WAL'
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexión SQLite administrada por ConnectionManager (admite referencias débiles)"""
+
+
+class ConnectionManager:
+    """
+    Administrador de conexiones SQLite a nivel de proceso.
+
+    Mantiene una conexión por hilo y por base de datos (Streamlit ejecuta cada
+    script en su propio hilo), aplica el perfil de pragmas al abrirla y ejecuta
+    la creación del esquema una sola vez por ruta. Si el archivo de la base se
+    reemplaza (p. ej. otro proceso la reconstruyó), la conexión se reabre la
+    siguiente vez que se pide.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._connections = weakref.WeakSet()
+        self._schema_ready = set()
+        self._journal_ready = set()
+        self._generations: Dict[str, int] = {}
+        self.stats = {
+            'connections_opened': 0,
+            'schema_setups': 0
+        }
+
+    @staticmethod
+    def _normalize_path(db_path: str) -> str:
+        if db_path == ':memory:':
+            return db_path
+        return os.path.abspath(db_path)
+
+    @staticmethod
+    def _file_id(key: str) -> Optional[tuple]:
+        """Dispositivo e inodo del archivo de la base (None en memoria o si no existe)"""
+        if key == ':memory:':
+            return None
+        try:
+            stat_result = os.stat(key)
+        except FileNotFoundError:
+            return None
+        return (stat_result.st_dev, stat_result.st_ino)
+
+    def get_connection(self, db_path: str) -> sqlite3.Connection:
+        """
+        Obtiene la conexión del hilo actual para la base de datos indicada.
+
+        Args:
+            db_path: Ruta a la base de datos SQLite
+
+        Returns:
+            Conexión reutilizable; no debe cerrarse manualmente
+        """
+        key = self._normalize_path(db_path)
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        generation = self._generations.get(key, 0)
+        entry = connections.get(key)
+        if entry is not None:
+            entry_generation, conn = entry
+            if entry_generation == generation and conn.file_id == self._file_id(key):
+                return conn
+            # La base de datos fue reemplazada o invalidada: reabrir. SQLite no
+            # toca el -wal ni el -shm de la ruta al cerrar un archivo reemplazado
+            conn.close()
+
+        conn = self._open_connection(key)
+        connections[key] = (generation, conn)
+        return conn
+
+    def _open_connection(self, key: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(key, factory=PooledConnection, check_same_thread=False)
+        conn.db_key = key
+        conn.file_id = self._file_id(key)
+
+        with self._lock:
+            self.stats['connections_opened'] += 1
+            self._connections.add(conn)
+            set_journal = key not in self._journal_ready and key != ':memory:'
+            if set_journal:
+                self._journal_ready.add(key)
+
+        if set_journal:
+            conn.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}')
+        for pragma, value in PRAGMA_PROFILE.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+
+        return conn
+
+    def is_current(self, conn: sqlite3.Connection) -> bool:
+        """
+        Indica si la conexión sigue abierta sobre el archivo que hoy está en su
+        ruta (una escritura en un archivo reemplazado se perdería).
+
+        Args:
+            conn: Conexión obtenida con get_connection
+
+        Returns:
+            False si el archivo de la base se reemplazó desde que se abrió
+        """
+        key = getattr(conn, 'db_key', None)
+        return key is None or conn.file_id == self._file_id(key)
+
+    def ensure_schema(self, db_path: str, setup_fn: Callable[[], None]):
+        """
+        Ejecuta la creación del esquema una sola vez por ruta de base de datos.
+
+        Args:
+            db_path: Ruta a la base de datos SQLite
+            setup_fn: Función que crea tablas e índices
+        """
+        key = self._normalize_path(db_path)
+        if key in self._schema_ready:
+            return
+
+        with self._lock:
+            if key in self._schema_ready:
+                return
+            setup_fn()
+            self._schema_ready.add(key)
+            self.stats['schema_setups'] += 1
+
+    def close_all(self, db_path: Optional[str] = None):
+        """
+        Invalida las conexiones abiertas (de todos los hilos) para que se reabran.
+
+        Solo se cierran las conexiones del hilo actual: las de otros hilos
+        pueden estar a mitad de una consulta, así que cada hilo cierra la suya
+        y abre otra en su siguiente get_connection, al ver que su generación
+        quedó atrás.
+
+        Args:
+            db_path: Ruta de la base de datos; si es None se invalidan todas
+        """
+        key = self._normalize_path(db_path) if db_path else None
+
+        with self._lock:
+            if key is None:
+                paths = set(self._generations) | self._schema_ready | self._journal_ready
+                paths |= {conn.db_key for conn in self._connections}
+            else:
+                paths = {key}
+
+            for path in paths:
+                self._generations[path] = self._generations.get(path, 0) + 1
+                self._schema_ready.discard(path)
+                self._journal_ready.discard(path)
+
+        connections = getattr(self._local, 'connections', None) or {}
+        for path in paths & set(connections):
+            _, conn = connections.pop(path)
+            conn.close()
+
+    def reset_stats(self):
+        """Reinicia los contadores de conexiones"""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+
+# Instancia compartida por todo el proceso
+connection_manager = ConnectionManager()
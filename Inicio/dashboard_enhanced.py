@@ -3,11 +3,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from enhanced_data_processor import EnhancedDataProcessor
+from enhanced_data_processor import get_shared_processor, clear_shared_processors
 from file_upload_page import show_file_upload_page
 from service_grouping_page import show_service_grouping_page
 from period_comparison_page import show_period_comparison_page
 from database_manager import DatabaseManager
+from figure_cache import figure_cache
+from result_cache import result_cache
+from lazy_sections import fragment, lazy_tabs, memoize_section
+from paginated_table import show_paginated_table
+from series_downsampling import downsample_frame, downsampling_caption
 from datetime import datetime, date
 import os
 
@@ -102,8 +107,7 @@ def show_analytics_page():
     
     # Obtener rango de fechas disponible
     try:
-        db_manager = DatabaseManager()
-        date_range = db_manager.get_date_range()
+        date_range = processor.db_manager.get_date_range()
         min_date = pd.to_datetime(date_range['fecha_min']).date()
         max_date = pd.to_datetime(date_range['fecha_max']).date()
     except:
@@ -114,8 +118,8 @@ def show_analytics_page():
     with col_fin:
         fecha_fin = st.date_input("Fecha Fin:", value=max_date, key="fecha_fin_new")
     
-    # Aplicar filtros al procesador
-    processor.initialize_from_database(
+    # Aplicar filtros al procesador (corte en memoria del histórico compartido)
+    processor = processor.with_date_range(
         fecha_inicio.strftime('%Y-%m-%d'), 
         fecha_fin.strftime('%Y-%m-%d')
     )
@@ -133,19 +137,7 @@ def show_analytics_page():
     
     # 4. GRÁFICA DE LÍNEAS DE INGRESOS (ANCHO COMPLETO)
     st.markdown("#### Evolución de Ingresos")
-    
-    # Control de agrupación temporal para gráfica de ingresos
-    income_col1, income_col2 = st.columns([3, 1])
-    with income_col2:
-        income_grouping = st.selectbox(
-            "Agrupación:",
-            ["Diaria", "Mensual", "Anual"],
-            key="income_grouping",
-            help="Seleccione el nivel de agrupación temporal"
-        )
-    
-    with income_col1:
-        create_income_line_chart(processor, income_grouping)
+    show_income_section(processor)
     
     st.markdown("---")
     
@@ -154,71 +146,103 @@ def show_analytics_page():
     
     with chart_col1:
         st.markdown("#### Número de Pasaportes")
-        # Control de agrupación temporal para pasaportes
-        passport_grouping = st.selectbox(
-            "Agrupación:",
-            ["Diaria", "Mensual", "Anual"],
-            key="passport_grouping",
-            help="Seleccione el nivel de agrupación temporal"
-        )
-        create_passport_chart(processor, passport_grouping)
+        show_passport_section(processor)
     
     with chart_col2:
         st.markdown("#### Número de Matrículas")
-        # Control de agrupación temporal para matrículas
-        matricula_grouping = st.selectbox(
-            "Agrupación:",
-            ["Diaria", "Mensual", "Anual"],
-            key="matricula_grouping",
-            help="Seleccione el nivel de agrupación temporal"
-        )
-        create_matriculas_chart(processor, matricula_grouping)
-    
-    st.markdown("---")
-    
-    # 6. ANÁLISIS DE SERVICIO ESPECÍFICO
-    st.markdown("#### Análisis de Servicio Específico")
-    show_specific_service_analysis(processor)
+        show_matriculas_section(processor)
     
     st.markdown("---")
     
-    # 7. TOP SERVICIOS POR PRODUCCIÓN (BARRAS HORIZONTALES)
-    st.markdown("#### Top Servicios por Producción")
-    create_top_services_horizontal_chart(processor)
-    
-    st.markdown("---")
+    # 6-9. SECCIONES DE DETALLE: solo la pestaña seleccionada se calcula
+    (specific_tab, specific_open), (top_tab, top_open), (weekly_tab, weekly_open), (detail_tab, detail_open) = lazy_tabs(
+        ["Servicio Específico", "Top Servicios", "Día de la Semana", "Datos Detallados"],
+        key="analytics_section"
+    )
     
-    # 7.1 ANÁLISIS POR DÍA DE LA SEMANA (DESPUÉS DE TOP SERVICIOS)
-    st.markdown("#### 📅 Análisis por Día de la Semana")
-    show_weekly_analysis_main(processor)
+    with specific_tab:
+        if specific_open:
+            # 6. ANÁLISIS DE SERVICIO ESPECÍFICO
+            st.markdown("#### Análisis de Servicio Específico")
+            show_specific_service_analysis(processor)
+    
+    with top_tab:
+        if top_open:
+            # 7. TOP SERVICIOS POR PRODUCCIÓN (BARRAS HORIZONTALES)
+            st.markdown("#### Top Servicios por Producción")
+            create_top_services_horizontal_chart(processor)
+    
+    with weekly_tab:
+        if weekly_open:
+            # 7.1 ANÁLISIS POR DÍA DE LA SEMANA
+            st.markdown("#### 📅 Análisis por Día de la Semana")
+            show_weekly_analysis_main(processor)
+    
+    with detail_tab:
+        if detail_open:
+            # 9. DATOS DETALLADOS
+            st.markdown("#### Datos Detallados")
+            show_detailed_data_section(processor)
     
     st.markdown("---")
     
     # 8. BOTÓN EXPORTAR PDF
     if st.button("📄 Exportar Dashboard a PDF", use_container_width=True):
         st.info("Funcionalidad de exportación PDF en desarrollo")
+
+@fragment
+def show_income_section(processor):
+    """Controles y gráfica de ingresos; cambiar sus controles solo vuelve a ejecutar esta sección"""
+    # Control de agrupación temporal para gráfica de ingresos
+    income_col1, income_col2 = st.columns([3, 1])
+    with income_col2:
+        income_grouping = st.selectbox(
+            "Agrupación:",
+            ["Diaria", "Mensual", "Anual"],
+            key="income_grouping",
+            help="Seleccione el nivel de agrupación temporal"
+        )
+        income_full_resolution = st.checkbox(
+            "Resolución completa",
+            key="income_full_resolution",
+            help="Graficar todos los puntos; por defecto las series largas se reducen conservando picos y valles"
+        )
     
-    st.markdown("---")
-    
-    # 9. DATOS DETALLADOS
-    st.markdown("#### Datos Detallados")
-    show_detailed_data_section(processor)
+    with income_col1:
+        create_income_line_chart(processor, income_grouping, income_full_resolution)
+
+@fragment
+def show_passport_section(processor):
+    """Control de agrupación y gráfica de pasaportes"""
+    passport_grouping = st.selectbox(
+        "Agrupación:",
+        ["Diaria", "Mensual", "Anual"],
+        key="passport_grouping",
+        help="Seleccione el nivel de agrupación temporal"
+    )
+    create_passport_chart(processor, passport_grouping)
+
+@fragment
+def show_matriculas_section(processor):
+    """Control de agrupación y gráfica de matrículas"""
+    matricula_grouping = st.selectbox(
+        "Agrupación:",
+        ["Diaria", "Mensual", "Anual"],
+        key="matricula_grouping",
+        help="Seleccione el nivel de agrupación temporal"
+    )
+    create_matriculas_chart(processor, matricula_grouping)
 
 def show_main_kpis(processor):
     """Muestra KPIs principales: ingresos totales, trámites, promedio diario, desviación estándar diaria"""
     try:
         if hasattr(processor, 'df') and processor.df is not None:
-            df = processor.df.copy()
-            df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
-            
-            # Calcular ingresos diarios agrupados
-            ingresos_diarios = df.groupby(df['fecha_emision'].dt.date)['ingresos_totales'].sum()
-            
-            # Métricas principales
-            total_ingresos = df['ingresos_totales'].sum()
-            total_tramites = df['num_tramites'].sum()
-            promedio_diario = ingresos_diarios.mean()
-            desv_std_diaria = ingresos_diarios.std()
+            # Métricas principales desde el resumen diario
+            kpis = processor.get_kpis()
+            total_ingresos = kpis['total_ingresos']
+            total_tramites = kpis['total_tramites']
+            promedio_diario = kpis['ingreso_diario_promedio']
+            desv_std_diaria = kpis['ingreso_diario_std']
             
             # Mostrar KPIs en 4 columnas
             kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
@@ -256,63 +280,63 @@ def show_main_kpis(processor):
     except Exception as e:
         st.error(f"Error calculando KPIs: {str(e)}")
 
-def create_income_line_chart(processor, grouping="Diaria"):
+def get_period_labels(grouping):
+    """Devuelve (sufijo del título, etiqueta del eje X) para la agrupación temporal"""
+    labels = {
+        "Diaria": ("Diaria", "Fecha"),
+        "Mensual": ("Mensual", "Mes"),
+        "Anual": ("Anual", "Año")
+    }
+    return labels.get(grouping, labels["Diaria"])
+
+def create_income_line_chart(processor, grouping="Diaria", full_resolution=False):
     """Crea gráfica de líneas de ingresos con agrupación temporal configurable"""
     try:
-        # Obtener datos directamente del DataFrame
         if hasattr(processor, 'df') and processor.df is not None:
-            df = processor.df.copy()
-            df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
-            
-            # Agrupar según la selección temporal
-            if grouping == "Diaria":
-                df['periodo'] = df['fecha_emision'].dt.date
-                title_suffix = "Diaria"
-                x_label = "Fecha"
-            elif grouping == "Mensual":
-                df['periodo'] = df['fecha_emision'].dt.to_period('M').astype(str)
-                title_suffix = "Mensual"
-                x_label = "Mes"
-            elif grouping == "Anual":
-                df['periodo'] = df['fecha_emision'].dt.year
-                title_suffix = "Anual"
-                x_label = "Año"
+            title_suffix, x_label = get_period_labels(grouping)
             
-            # Agrupar por período
-            temporal_data = df.groupby('periodo').agg({
-                'ingresos_totales': 'sum',
-                'num_tramites': 'sum'
-            }).reset_index()
+            # Serie por período desde las claves calculadas al cargar
+            temporal_data = processor.get_period_series(grouping, ('ingresos_totales', 'num_tramites'))
             
             if temporal_data.empty:
                 st.info("Sin datos temporales para mostrar")
                 return
             
-            # Crear gráfica de línea
-            fig = px.line(
-                temporal_data,
-                x='periodo',
-                y='ingresos_totales',
-                title=f'Evolución de Ingresos - Vista {title_suffix}',
-                markers=True
-            )
-            
-            fig.update_layout(
-                height=400,
-                showlegend=False,
-                xaxis_title=x_label,
-                yaxis_title="Ingresos USD",
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
-            
-            fig.update_traces(
-                line_color='#1f77b4',
-                line_width=2,
-                marker_size=4
-            )
+            # Series largas: reducir puntos conservando picos y valles
+            plot_data = temporal_data if full_resolution else downsample_frame(temporal_data, 'ingresos_totales')
+            
+            # Crear gráfica de línea; se reutiliza desde la caché mientras no cambien datos ni controles
+            def build_figure():
+                fig = px.line(
+                    plot_data,
+                    x='periodo',
+                    y='ingresos_totales',
+                    title=f'Evolución de Ingresos - Vista {title_suffix}',
+                    markers=True
+                )
+                
+                fig.update_layout(
+                    height=400,
+                    showlegend=False,
+                    xaxis_title=x_label,
+                    yaxis_title="Ingresos USD",
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
+                
+                fig.update_traces(
+                    line_color='#1f77b4',
+                    line_width=2,
+                    marker_size=4
+                )
+                return fig
             
+            fig = figure_cache.get_figure('ingresos', build_figure, processor.cache_scope(),
+                                          grouping=grouping, full_resolution=full_resolution)
             st.plotly_chart(fig, use_container_width=True)
+            caption = downsampling_caption(len(plot_data), len(temporal_data))
+            if caption:
+                st.caption(caption)
         else:
             st.warning("No hay datos disponibles para la gráfica de ingresos")
         
@@ -322,55 +346,41 @@ def create_income_line_chart(processor, grouping="Diaria"):
 def create_passport_chart(processor, grouping="Diaria"):
     """Crea gráfica de líneas de número de pasaportes con agrupación temporal"""
     try:
-        # Filtrar datos de pasaportes
         if hasattr(processor, 'df') and processor.df is not None:
-            passport_data = processor.df[processor.df['categoria'].str.contains('PASAPORTES', na=False)].copy()
+            # Trámites de pasaportes por período
+            passport_temporal = processor.get_period_series(grouping, ('num_tramites',),
+                                                            categoria_contains='PASAPORTES')
             
-            if passport_data.empty:
+            if passport_temporal.empty:
                 st.info("Sin datos de pasaportes")
                 return
             
-            passport_data['fecha_emision'] = pd.to_datetime(passport_data['fecha_emision'])
-            
-            # Agrupar según la selección temporal
-            if grouping == "Diaria":
-                passport_data['periodo'] = passport_data['fecha_emision'].dt.date
-                title_suffix = "Diaria"
-                x_label = "Fecha"
-            elif grouping == "Mensual":
-                passport_data['periodo'] = passport_data['fecha_emision'].dt.to_period('M').astype(str)
-                title_suffix = "Mensual"
-                x_label = "Mes"
-            elif grouping == "Anual":
-                passport_data['periodo'] = passport_data['fecha_emision'].dt.year
-                title_suffix = "Anual"
-                x_label = "Año"
-            
-            # Agrupar por período
-            passport_temporal = passport_data.groupby('periodo').agg({
-                'num_tramites': 'sum'
-            }).reset_index()
+            title_suffix, x_label = get_period_labels(grouping)
             
             # Crear gráfica
-            fig = px.line(
-                passport_temporal,
-                x='periodo',
-                y='num_tramites',
-                title=f'Pasaportes - Vista {title_suffix}',
-                markers=True
-            )
-            
-            fig.update_layout(
-                height=300,
-                showlegend=False,
-                xaxis_title=x_label,
-                yaxis_title="Número de Pasaportes",
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
-            
-            fig.update_traces(line_color='#ff7f0e', line_width=2)
+            def build_figure():
+                fig = px.line(
+                    passport_temporal,
+                    x='periodo',
+                    y='num_tramites',
+                    title=f'Pasaportes - Vista {title_suffix}',
+                    markers=True
+                )
+                
+                fig.update_layout(
+                    height=300,
+                    showlegend=False,
+                    xaxis_title=x_label,
+                    yaxis_title="Número de Pasaportes",
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
+                
+                fig.update_traces(line_color='#ff7f0e', line_width=2)
+                return fig
             
+            fig = figure_cache.get_figure('pasaportes', build_figure, processor.cache_scope(),
+                                          grouping=grouping)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Sin datos disponibles para pasaportes")
@@ -381,58 +391,41 @@ def create_passport_chart(processor, grouping="Diaria"):
 def create_matriculas_chart(processor, grouping="Diaria"):
     """Crea gráfica de líneas de número de matrículas con agrupación temporal"""
     try:
-        # Buscar datos relacionados con matrículas (RCM)
         if hasattr(processor, 'df') and processor.df is not None:
-            # Buscar servicios que contengan RCM o matrícula
-            matricula_data = processor.df[
-                processor.df['servicio'].str.contains('RCM|MATRÍCULA|MATRICULA', na=False, case=False)
-            ].copy()
+            # Servicios que contengan RCM o matrícula, por período
+            matricula_temporal = processor.get_period_series(grouping, ('num_tramites',),
+                                                             servicio_pattern='RCM|MATRÍCULA|MATRICULA')
             
-            if matricula_data.empty:
+            if matricula_temporal.empty:
                 st.info("Sin datos de matrículas")
                 return
             
-            matricula_data['fecha_emision'] = pd.to_datetime(matricula_data['fecha_emision'])
-            
-            # Agrupar según la selección temporal
-            if grouping == "Diaria":
-                matricula_data['periodo'] = matricula_data['fecha_emision'].dt.date
-                title_suffix = "Diaria"
-                x_label = "Fecha"
-            elif grouping == "Mensual":
-                matricula_data['periodo'] = matricula_data['fecha_emision'].dt.to_period('M').astype(str)
-                title_suffix = "Mensual"
-                x_label = "Mes"
-            elif grouping == "Anual":
-                matricula_data['periodo'] = matricula_data['fecha_emision'].dt.year
-                title_suffix = "Anual"
-                x_label = "Año"
-            
-            # Agrupar por período
-            matricula_temporal = matricula_data.groupby('periodo').agg({
-                'num_tramites': 'sum'
-            }).reset_index()
+            title_suffix, x_label = get_period_labels(grouping)
             
             # Crear gráfica
-            fig = px.line(
-                matricula_temporal,
-                x='periodo',
-                y='num_tramites',
-                title=f'Matrículas - Vista {title_suffix}',
-                markers=True
-            )
-            
-            fig.update_layout(
-                height=300,
-                showlegend=False,
-                xaxis_title=x_label,
-                yaxis_title="Número de Matrículas",
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
-            
-            fig.update_traces(line_color='#2ca02c', line_width=2)
+            def build_figure():
+                fig = px.line(
+                    matricula_temporal,
+                    x='periodo',
+                    y='num_tramites',
+                    title=f'Matrículas - Vista {title_suffix}',
+                    markers=True
+                )
+                
+                fig.update_layout(
+                    height=300,
+                    showlegend=False,
+                    xaxis_title=x_label,
+                    yaxis_title="Número de Matrículas",
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
+                
+                fig.update_traces(line_color='#2ca02c', line_width=2)
+                return fig
             
+            fig = figure_cache.get_figure('matriculas', build_figure, processor.cache_scope(),
+                                          grouping=grouping)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Sin datos disponibles para matrículas")
@@ -440,12 +433,16 @@ def create_matriculas_chart(processor, grouping="Diaria"):
     except Exception as e:
         st.error(f"Error creando gráfica de matrículas: {str(e)}")
 
+@fragment
 def show_specific_service_analysis(processor):
     """Muestra análisis de servicio específico con 2 dropdowns y gráfica"""
     try:
         # Obtener lista de servicios disponibles directamente del DataFrame
         if hasattr(processor, 'df') and processor.df is not None:
-            services_list = sorted(processor.df['servicio'].unique().tolist())
+            services_list = memoize_section(
+                'servicios', lambda: sorted(processor.df['servicio'].dropna().unique().tolist()),
+                processor.cache_scope()
+            )
             
             # 2 DROPDOWNS: SERVICIO Y UNIDAD A ANALIZAR
             dropdown_col1, dropdown_col2 = st.columns(2)
@@ -497,58 +494,44 @@ def create_specific_service_chart(processor, service_name, analysis_unit, groupi
     """Crea gráfica de líneas para servicio específico con agrupación temporal"""
     try:
         if hasattr(processor, 'df') and processor.df is not None:
-            # Filtrar datos del servicio específico
-            service_data = processor.df[processor.df['servicio'] == service_name].copy()
-            
-            if service_data.empty:
-                st.warning(f"No hay datos para el servicio: {service_name}")
-                return
-            
-            service_data['fecha_emision'] = pd.to_datetime(service_data['fecha_emision'])
-            
             # Definir columna y etiqueta según unidad de análisis
             y_column = 'num_tramites' if analysis_unit == 'Cantidad' else 'ingresos_totales'
             y_label = 'Número de Trámites' if analysis_unit == 'Cantidad' else 'Ingresos USD'
             
-            # Agrupar según la selección temporal
-            if grouping == "Diaria":
-                service_data['periodo'] = service_data['fecha_emision'].dt.date
-                title_suffix = "Diaria"
-                x_label = "Fecha"
-            elif grouping == "Mensual":
-                service_data['periodo'] = service_data['fecha_emision'].dt.to_period('M').astype(str)
-                title_suffix = "Mensual"
-                x_label = "Mes"
-            elif grouping == "Anual":
-                service_data['periodo'] = service_data['fecha_emision'].dt.year
-                title_suffix = "Anual"
-                x_label = "Año"
+            # Serie del servicio específico por período
+            service_temporal = processor.get_period_series(grouping, (y_column,), servicio=service_name)
             
-            # Agrupar por período
-            service_temporal = service_data.groupby('periodo').agg({
-                y_column: 'sum'
-            }).reset_index()
-            
-            # Crear gráfica
-            fig = px.line(
-                service_temporal,
-                x='periodo',
-                y=y_column,
-                title=f'{analysis_unit} - {service_name} (Vista {title_suffix})',
-                markers=True
-            )
+            if service_temporal.empty:
+                st.warning(f"No hay datos para el servicio: {service_name}")
+                return
             
-            fig.update_layout(
-                height=350,
-                showlegend=False,
-                xaxis_title=x_label,
-                yaxis_title=y_label,
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
+            title_suffix, x_label = get_period_labels(grouping)
             
-            fig.update_traces(line_color='#d62728', line_width=2, marker_size=4)
+            # Crear gráfica
+            def build_figure():
+                fig = px.line(
+                    service_temporal,
+                    x='periodo',
+                    y=y_column,
+                    title=f'{analysis_unit} - {service_name} (Vista {title_suffix})',
+                    markers=True
+                )
+                
+                fig.update_layout(
+                    height=350,
+                    showlegend=False,
+                    xaxis_title=x_label,
+                    yaxis_title=y_label,
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
+                
+                fig.update_traces(line_color='#d62728', line_width=2, marker_size=4)
+                return fig
             
+            fig = figure_cache.get_figure('servicio_especifico', build_figure, processor.cache_scope(),
+                                          grouping=grouping, service_name=service_name,
+                                          analysis_unit=analysis_unit)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No hay datos disponibles")
@@ -560,18 +543,30 @@ def show_service_specific_kpis(processor, service_name):
     """Muestra KPIs específicos del servicio: #trámites, total ingresos, promedio, desviación estándar"""
     try:
         if hasattr(processor, 'df') and processor.df is not None:
-            # Filtrar datos del servicio
-            service_data = processor.df[processor.df['servicio'] == service_name]
-            
-            if service_data.empty:
+            def compute_kpis():
+                # Filtrar datos del servicio
+                service_data = processor.df[processor.df['servicio'] == service_name]
+                if service_data.empty:
+                    return {}
+                return {
+                    'total_tramites': service_data['num_tramites'].sum(),
+                    'total_ingresos': service_data['ingresos_totales'].sum(),
+                    'promedio_tramites': service_data['num_tramites'].mean(),
+                    'desv_std_tramites': service_data['num_tramites'].std()
+                }
+            
+            kpis = memoize_section('kpis_servicio', compute_kpis, processor.cache_scope(),
+                                   service_name=service_name)
+            
+            if not kpis:
                 st.warning("No hay datos para calcular KPIs del servicio")
                 return
             
             # Calcular métricas
-            total_tramites = service_data['num_tramites'].sum()
-            total_ingresos = service_data['ingresos_totales'].sum()
-            promedio_tramites = service_data['num_tramites'].mean()
-            desv_std_tramites = service_data['num_tramites'].std()
+            total_tramites = kpis['total_tramites']
+            total_ingresos = kpis['total_ingresos']
+            promedio_tramites = kpis['promedio_tramites']
+            desv_std_tramites = kpis['desv_std_tramites']
             
             # Mostrar KPIs en 4 columnas
             kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
@@ -614,42 +609,49 @@ def create_top_services_horizontal_chart(processor):
     try:
         # Obtener datos directamente del DataFrame y agrupar por servicio
         if hasattr(processor, 'df') and processor.df is not None:
-            # Agrupar por servicio para obtener totales
-            top_services_data = processor.df.groupby('servicio').agg({
-                'ingresos_totales': 'sum',
-                'num_tramites': 'sum'
-            }).reset_index()
+            def compute_top_services():
+                # Agrupar por servicio para obtener totales
+                totals = processor.df.groupby('servicio', observed=True).agg({
+                    'ingresos_totales': 'sum',
+                    'num_tramites': 'sum'
+                }).reset_index()
+                
+                # Ordenar por cantidad de trámites y tomar top 10
+                return totals.nlargest(10, 'num_tramites')
             
-            # Ordenar por cantidad de trámites y tomar top 10
-            top_services_data = top_services_data.nlargest(10, 'num_tramites')
+            top_services_data = memoize_section('top_servicios', compute_top_services, processor.cache_scope())
             
             if top_services_data.empty:
                 st.info("Sin datos para top servicios")
                 return
             
             # Crear gráfica de barras horizontales
-            fig = px.bar(
-                top_services_data,
-                x='num_tramites',
-                y='servicio',
-                orientation='h',
-                title='Top 10 Servicios por Cantidad de Trámites',
-                color='num_tramites',
-                color_continuous_scale='viridis'
-            )
-            
-            fig.update_layout(
-                height=500,
-                showlegend=False,
-                xaxis_title="Número de Trámites",
-                yaxis_title="Servicio",
-                plot_bgcolor='white',
-                paper_bgcolor='white'
-            )
-            
-            # Ordenar de mayor a menor
-            fig.update_yaxes(categoryorder="total ascending")
+            def build_figure():
+                fig = px.bar(
+                    top_services_data,
+                    x='num_tramites',
+                    y='servicio',
+                    orientation='h',
+                    title='Top 10 Servicios por Cantidad de Trámites',
+                    color='num_tramites',
+                    color_continuous_scale='viridis'
+                )
+                
+                fig.update_layout(
+                    height=500,
+                    showlegend=False,
+                    xaxis_title="Número de Trámites",
+                    yaxis_title="Servicio",
+                    plot_bgcolor='white',
+                    paper_bgcolor='white'
+                )
+                
+                # Ordenar de mayor a menor
+                fig.update_yaxes(categoryorder="total ascending")
+                return fig
             
+            fig = figure_cache.get_figure('top_servicios', build_figure, processor.cache_scope(),
+                                          top_n=10)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No hay datos disponibles para top servicios")
@@ -658,33 +660,10 @@ def create_top_services_horizontal_chart(processor):
         st.error(f"Error en gráfica de top servicios: {str(e)}")
 
 def show_detailed_data_section(processor):
-    """Muestra datos detallados con botón de exportar Excel"""
+    """Muestra los datos detallados en una tabla paginada, con botón de exportar Excel"""
     try:
-        if hasattr(processor, 'df') and processor.df is not None:
-            # Mostrar muestra de datos
-            sample_data = processor.df.head(50).copy()
-            
-            # Formatear datos para mejor visualización
-            display_data = sample_data.copy()
-            
-            # Formatear columnas monetarias
-            if 'ingresos_totales' in display_data.columns:
-                display_data['ingresos_totales'] = display_data['ingresos_totales'].apply(lambda x: f"${x:,.2f}")
-            
-            if 'costo_unitario' in display_data.columns:
-                display_data['costo_unitario'] = display_data['costo_unitario'].apply(lambda x: f"${x:.2f}")
-            
-            # Seleccionar columnas principales
-            main_columns = ['servicio', 'categoria', 'fecha_emision', 'num_tramites', 'ingresos_totales']
-            available_columns = [col for col in main_columns if col in display_data.columns]
-            
-            st.dataframe(
-                display_data[available_columns],
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            st.info(f"Mostrando los primeros 50 registros de {len(processor.df):,} total")
+        if hasattr(processor, 'df') and processor.df is not None and not processor.df.empty:
+            show_paginated_table(processor.get_data_page, key='detalle')
             
             # Botón exportar Excel
             if st.button("📊 Exportar Datos Detallados a Excel", use_container_width=True):
@@ -695,14 +674,18 @@ def show_detailed_data_section(processor):
     except Exception as e:
         st.error(f"Error mostrando datos detallados: {str(e)}")
 
-@st.cache_data
 def initialize_enhanced_processor():
-    """Inicializa el procesador mejorado con datos de la base de datos"""
+    """
+    Obtiene el procesador compartido con el histórico completo.
+    
+    La base solo se vuelve a leer cuando cambia su versión de datos; los
+    filtros de fecha se aplican después con with_date_range.
+    """
     try:
-        processor = EnhancedDataProcessor()
+        processor = get_shared_processor()
         
         # Intentar cargar datos de la base de datos
-        if processor.initialize_from_database():
+        if processor.df is not None and not processor.df.empty:
             return processor
         
         # Si no hay datos en BD, intentar migrar desde archivo original
@@ -797,8 +780,7 @@ def show_main_filters(processor, db_summary):
     
     # Obtener rango de fechas disponible
     try:
-        db_manager = DatabaseManager()
-        date_range = db_manager.get_date_range()
+        date_range = processor.db_manager.get_date_range()
         
         if date_range['total_registros'] > 0:
             min_date = pd.to_datetime(date_range['fecha_min']).date()
@@ -851,8 +833,8 @@ def show_main_analysis(processor):
     end_date = filtros.get('fecha_fin')
     categoria = filtros.get('categoria')
     
-    # Re-inicializar con filtros de fecha
-    processor.initialize_from_database(start_date, end_date)
+    # Vista con filtros de fecha; el procesador compartido no se modifica
+    processor = processor.with_date_range(start_date, end_date)
     
     # Aplicar filtro de categoría si existe
     if categoria and processor.df is not None:
@@ -876,7 +858,7 @@ def show_main_analysis(processor):
     show_efficiency_analysis(processor)
     
     # Datos detallados
-    show_detailed_data(processor)
+    show_detailed_data(processor, categoria)
 
 def show_kpis(processor):
     """Muestra los KPIs principales"""
@@ -928,13 +910,23 @@ def show_temporal_analysis(processor):
             key="temporal_group"
         )
     
+    with col2:
+        full_resolution = st.checkbox(
+            "Resolución completa",
+            key="temporal_full_resolution",
+            help="Graficar todos los puntos; por defecto las series largas se reducen conservando picos y valles"
+        )
+    
     # Gráfico de ingresos por período
     temporal_data = processor.get_temporal_data(group_by)
     
     if not temporal_data.empty:
+        # Series largas: reducir puntos conservando picos y valles
+        plot_data = temporal_data if full_resolution else downsample_frame(temporal_data, 'ingresos_totales')
+        
         # Preparar datos para el gráfico
-        x_col = temporal_data.columns[0]  # Primera columna es la temporal
-        x_data = temporal_data[x_col].astype(str)
+        x_col = plot_data.columns[0]  # Primera columna es la temporal
+        x_data = plot_data[x_col].astype(str)
         
         # Gráfico de ingresos únicamente
         fig_ingresos = go.Figure()
@@ -942,7 +934,7 @@ def show_temporal_analysis(processor):
         fig_ingresos.add_trace(
             go.Scatter(
                 x=x_data,
-                y=temporal_data['ingresos_totales'],
+                y=plot_data['ingresos_totales'],
                 name='Ingresos',
                 line=dict(color='#1f77b4', width=3),
                 hovertemplate='<b>%{x}</b><br>Ingresos: $%{y:,.2f}<extra></extra>'
@@ -959,6 +951,9 @@ def show_temporal_analysis(processor):
         )
         
         st.plotly_chart(fig_ingresos, use_container_width=True)
+        caption = downsampling_caption(len(plot_data), len(temporal_data))
+        if caption:
+            st.caption(caption)
     
     # Nueva sección: Análisis por servicio específico
     st.markdown("---")
@@ -1125,8 +1120,9 @@ def show_service_analysis(processor):
 def show_weekly_analysis_main(processor):
     """Muestra análisis por día de la semana en análisis principal"""
     
-    # Calcular estadísticas por día de la semana
-    weekly_stats = calculate_weekly_statistics_main(processor)
+    # Calcular estadísticas por día de la semana (una vez por filtros y versión de datos)
+    weekly_stats = memoize_section('dia_semana', lambda: calculate_weekly_statistics_main(processor),
+                                   processor.cache_scope())
     
     if weekly_stats:
         # Mostrar días de mayor y menor actividad
@@ -1189,21 +1185,18 @@ def calculate_weekly_statistics_main(processor):
         if processor.df is None or processor.df.empty:
             return None
             
-        df = processor.df.copy()
-        df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
-        df['dia_semana_es'] = df['fecha_emision'].dt.strftime('%A').map({
+        # Totales diarios desde el resumen (una fila por fecha)
+        daily_totals = processor.get_daily_totals()
+        if daily_totals.empty:
+            return None
+        
+        dia_semana_es = daily_totals['fecha_emision'].dt.strftime('%A').map({
             'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles',
             'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-        })
+        }).rename('dia_semana_es')
         
-        # Agrupar por día específico para obtener totales diarios
-        daily_totals = df.groupby(['fecha_emision', 'dia_semana_es']).agg({
-            'ingresos_totales': 'sum',
-            'num_tramites': 'sum'
-        }).reset_index()
-        
-        # Calcular promedios por día de la semana
-        weekly_averages = daily_totals.groupby('dia_semana_es').agg({
+        # Calcular promedios por día de la semana (la clave no se agrega a daily_totals)
+        weekly_averages = daily_totals.groupby(dia_semana_es).agg({
             'ingresos_totales': 'mean',
             'num_tramites': 'mean'
         }).reset_index()
@@ -1284,23 +1277,16 @@ def show_efficiency_analysis(processor):
                 help="Variabilidad de ingresos diarios"
             )
 
-def show_detailed_data(processor):
-    """Muestra datos detallados con opciones de filtrado"""
+def show_detailed_data(processor, categoria=None):
+    """Muestra datos detallados con opciones de filtrado (y la categoría elegida, si hay)"""
     st.markdown("<h3 style='text-align: center;'>Datos Detallados</h3>", unsafe_allow_html=True)
     
     if processor.df is not None and not processor.df.empty:
         
-        # Controles de visualización
-        col1, col2, col3 = st.columns(3)
+        # Exportación de todos los registros
+        col1, col2 = st.columns(2)
         
         with col1:
-            show_rows = st.selectbox(
-                "Mostrar filas:",
-                options=[50, 100, 200, 500, "Todas"],
-                key="show_rows"
-            )
-        
-        with col2:
             if st.button("Exportar a CSV"):
                 csv = processor.df.to_csv(index=False)
                 st.download_button(
@@ -1310,7 +1296,7 @@ def show_detailed_data(processor):
                     mime="text/csv"
                 )
         
-        with col3:
+        with col2:
             if st.button("Exportar a Excel"):
                 # Crear archivo Excel temporal
                 excel_filename = f"datos_consulares_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
@@ -1324,19 +1310,9 @@ def show_detailed_data(processor):
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
         
-        # Mostrar datos
-        display_df = processor.df.copy()
-        
-        if show_rows != "Todas":
-            display_df = display_df.head(show_rows)
-        
-        st.dataframe(
-            display_df,
-            use_container_width=True,
-            hide_index=True
-        )
-        
-        st.caption(f"Mostrando {len(display_df)} de {len(processor.df)} registros")
+        # Mostrar datos: una página a la vez, buscada y ordenada en SQL
+        show_paginated_table(processor.get_data_page, key="datos_detallados",
+                             filters={'categoria': categoria})
 
 def show_empty_state():
     """Muestra estado cuando no hay datos"""
@@ -1362,6 +1338,53 @@ def show_empty_state():
         st.session_state.page = "Gestión de Archivos"
         st.rerun()
 
+def show_result_cache_stats():
+    """Muestra la caché de resultados del procesador y la memoria del histórico cargado"""
+    st.markdown("<h3 style='text-align: center;'>Caché de Resultados</h3>", unsafe_allow_html=True)
+    
+    stats = result_cache.get_stats()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Aciertos", f"{stats['hits']:,}")
+    with col2:
+        st.metric("Fallos", f"{stats['misses']:,}")
+    with col3:
+        st.metric("Tasa de aciertos", f"{stats['hit_rate']:.1%}")
+    with col4:
+        st.metric("Entradas", f"{stats['entries']:,} / {stats['max_entries']:,}")
+    
+    st.caption(
+        f"Memoria usada: {stats['bytes'] / (1024 * 1024):.2f} MB de "
+        f"{stats['max_bytes'] / (1024 * 1024):.0f} MB · "
+        f"Desalojos: {stats['evictions']:,} · "
+        f"Invalidaciones por cambio de datos: {stats['invalidations']:,}"
+    )
+    
+    figures = figure_cache.get_stats()
+    st.caption(
+        f"Figuras en caché: {figures['entries']:,} · "
+        f"{figures['bytes'] / (1024 * 1024):.2f} MB de {figures['max_bytes'] / (1024 * 1024):.0f} MB · "
+        f"Tasa de aciertos: {figures['hit_rate']:.1%}"
+    )
+    if figures['charts']:
+        st.dataframe(
+            pd.DataFrame([
+                {'Gráfica': chart, 'Construcciones': stats['builds'], 'Desde caché': stats['hits'],
+                 'Construcción promedio (ms)': round(stats['avg_build_ms'], 1)}
+                for chart, stats in figures['charts'].items()
+            ]),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    memory = get_shared_processor().get_memory_usage()
+    st.caption(
+        f"Histórico en memoria: {memory['total_bytes'] / (1024 * 1024):.2f} MB · "
+        f"{memory['rows']:,} registros · "
+        f"Modo {'compacto' if memory['compact'] else 'normal'}"
+    )
+
 def show_settings_page():
     """Página de configuración"""
     st.markdown("<h1 style='text-align: center;'>Configuración del Sistema</h1>", unsafe_allow_html=True)
@@ -1390,6 +1413,7 @@ def show_settings_page():
             st.write(f"- Registros totales: {stats.get('total_registros', 0):,}")
             st.write(f"- Categorías únicas: {stats.get('categorias_unicas', 0)}")
             st.write(f"- Servicios únicos: {stats.get('servicios_unicos', 0)}")
+            st.write(f"- Versión de datos: {db_manager.get_data_version()}")
         
         with col2:
             st.markdown("**Rango de fechas:**")
@@ -1402,6 +1426,9 @@ def show_settings_page():
     except Exception as e:
         st.error(f"Error obteniendo información del sistema: {str(e)}")
     
+    st.markdown("---")
+    show_result_cache_stats()
+    
     st.markdown("---")
     st.markdown("<h3 style='text-align: center;'>Acciones de Mantenimiento</h3>", unsafe_allow_html=True)
     
@@ -1410,6 +1437,9 @@ def show_settings_page():
     with col1:
         if st.button("Limpiar Cache"):
             st.cache_data.clear()
+            result_cache.clear()
+            figure_cache.clear()
+            clear_shared_processors()
             st.success("Cache limpiado")
     
     with col2:
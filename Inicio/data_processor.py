@@ -1,73 +1,149 @@
 import pandas as pd
 from datetime import datetime
 import os
+from column_schema import apply_schema
+from html_stream_parser import CHUNK_ROWS, iter_html_table_chunks
+
+# Firmas para reconocer el formato real del archivo (los reportes consulares
+# son HTML con extensión .xls)
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_SIGNATURE = b'PK\x03\x04'
+HTML_MARKERS = (b'<html', b'<table', b'<!doctype html')
+SNIFF_BYTES = 64 * 1024
+
+# Lectores en el orden de respaldo cuando el formato no se reconoce
+ENGINE_ORDER = ['xlrd', 'openpyxl', 'html']
+
+# Versión de la limpieza (clean_frame y column_schema). Los datos limpios
+# guardados en disco se asocian a esta versión: incrementarla al cambiar la
+# limpieza invalida la caché Parquet de archivos leídos
+PROCESSOR_VERSION = 1
+
+def detect_file_format(file_path):
+    """
+    Reconoce el formato de un archivo por su contenido.
+    
+    Args:
+        file_path: Ruta del archivo
+        
+    Returns:
+        'xls' (OLE2), 'xlsx' (ZIP), 'html' o None si no se reconoce
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    
+    if head.startswith(OLE2_SIGNATURE):
+        return 'xls'
+    if head.startswith(ZIP_SIGNATURE):
+        return 'xlsx'
+    
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    # Algunos reportes empiezan directamente con <form> o <div>
+    if text.startswith(b'<') or any(marker in text for marker in HTML_MARKERS):
+        return 'html'
+    
+    return None
 
 class MayoDataProcessor:
+    # Lector preferido para cada formato reconocido
+    FORMAT_ENGINES = {'xls': 'xlrd', 'xlsx': 'openpyxl', 'html': 'html'}
+    
     def __init__(self, file_path):
         self.file_path = file_path
         self.df = None
+        # Formato detectado y lector que finalmente leyó el archivo
+        self.detected_format = None
+        self.engine = None
         
     def load_data(self):
-        """Carga el archivo mayo.xls (que puede ser HTML o Excel)"""
-        try:
-            # Intentar con xlrd para archivos .xls antiguos
-            self.df = pd.read_excel(self.file_path, engine='xlrd')
-        except:
+        """
+        Carga el archivo mayo.xls (que puede ser HTML o Excel).
+        
+        El formato se reconoce por el contenido y el archivo va directo a su
+        lector; los demás lectores solo se intentan si ese falla o si el
+        formato no se reconoce.
+        """
+        self.detected_format = detect_file_format(self.file_path)
+        preferred = self.FORMAT_ENGINES.get(self.detected_format)
+        engines = ENGINE_ORDER if preferred is None else [preferred] + [e for e in ENGINE_ORDER if e != preferred]
+        
+        errors = []
+        for engine in engines:
             try:
-                # Fallback a openpyxl
-                self.df = pd.read_excel(self.file_path, engine='openpyxl')
-            except:
-                try:
-                    # Si falla Excel, intentar como HTML
-                    self.df = pd.read_html(self.file_path)[0]  # Tomar la primera tabla
-                except Exception as e:
-                    raise Exception(f"Error al cargar el archivo: {str(e)}")
+                self.df = self._read_with_engine(engine)
+                self.engine = engine
+                return self.df
+            except Exception as e:
+                errors.append(f"{engine}: {str(e)}")
         
-        return self.df
+        # Si el formato se reconoció, el error relevante es el de su lector
+        raise Exception(f"Error al cargar el archivo: {errors[0] if preferred else errors[-1]}")
+    
+    def _read_with_engine(self, engine):
+        """Lee el archivo con un lector concreto"""
+        if engine == 'html':
+            return pd.read_html(self.file_path)[0]  # Tomar la primera tabla
+        return pd.read_excel(self.file_path, engine=engine)
     
     def clean_data(self):
         """Limpia y procesa los datos"""
         if self.df is None:
             raise Exception("Primero debe cargar los datos")
+        
+        self.df = self.clean_frame(self.df)
+        return self.df
+    
+    def iter_clean_chunks(self, chunk_size=CHUNK_ROWS, skip_chunks=0):
+        """
+        Lee y limpia el archivo por bloques.
+        
+        Los reportes HTML se leen con el parser incremental, así que la memoria
+        no depende del tamaño del archivo; los formatos Excel se leen completos
+        y se parten en bloques ya limpios.
+        
+        Args:
+            chunk_size: Filas por bloque (del archivo en HTML, limpias en Excel)
+            skip_chunks: Bloques iniciales a omitir (para reanudar una carga)
             
-        # Renombrar columnas para facilitar el trabajo
-        # Columnas del HTML: ['Servicio', 'Concepto', 'Articulo', 'Derechos', 'No. de trámites', 'Importe USD', ...]
-        # Concepto está vacío, usamos Articulo como categoría
-        columns_map = {
-            'Servicio': 'servicio',
-            'Articulo': 'categoria',  # Cambio: usar Articulo en lugar de Concepto
-            'Derechos': 'costo_unitario',
-            'No. de trámites': 'num_tramites',
-            'Importe USD': 'ingresos_totales',
-            'Fecha recaudación': 'fecha_emision',
-            'No. cancelados': 'formas_canceladas'
-        }
+        Returns:
+            Iterador de DataFrames limpios, como los de clean_data
+        """
+        self.detected_format = detect_file_format(self.file_path)
         
-        # Solo renombrar columnas que existen
-        existing_columns_map = {k: v for k, v in columns_map.items() if k in self.df.columns}
-        self.df = self.df.rename(columns=existing_columns_map)
+        if self.detected_format != 'html':
+            self.load_data()
+            cleaned = self.clean_data()
+            for start in range(skip_chunks * chunk_size, len(cleaned), chunk_size):
+                yield cleaned.iloc[start:start + chunk_size]
+            return
         
-        # Limpiar y convertir fechas
-        self.df['fecha_emision'] = pd.to_datetime(
-            self.df['fecha_emision'], 
-            format='%d/%m/%Y', 
-            errors='coerce'
-        )
+        self.engine = 'html-stream'
+        for chunk in iter_html_table_chunks(self.file_path, chunk_size, skip_chunks * chunk_size):
+            yield self.clean_frame(chunk)
+    
+    @staticmethod
+    def clean_frame(df):
+        """
+        Limpia un DataFrame con las columnas del reporte consular.
         
-        # Convertir columnas numéricas
-        numeric_cols = ['costo_unitario', 'num_tramites', 'ingresos_totales', 'formas_canceladas']
-        for col in numeric_cols:
-            self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
+        Args:
+            df: Datos tal como se leyeron del archivo (completos o un bloque)
+            
+        Returns:
+            DataFrame limpio
+        """
+        # Encabezados resueltos una vez por diseño de archivo y tipos explícitos
+        df = apply_schema(df)
         
         # Eliminar filas con fechas inválidas
-        self.df = self.df.dropna(subset=['fecha_emision'])
+        df = df.dropna(subset=['fecha_emision'])
         
         # Agregar columnas derivadas
-        self.df['año'] = self.df['fecha_emision'].dt.year
-        self.df['mes'] = self.df['fecha_emision'].dt.month
-        self.df['mes_año'] = self.df['fecha_emision'].dt.to_period('M')
+        df['año'] = df['fecha_emision'].dt.year
+        df['mes'] = df['fecha_emision'].dt.month
+        df['mes_año'] = df['fecha_emision'].dt.to_period('M')
         
-        return self.df
+        return df
     
     def get_summary_stats(self):
         """Obtiene estadísticas resumen de los datos"""
@@ -1,9 +1,66 @@
 import sqlite3
+import json
 import pandas as pd
 from datetime import datetime
 import os
-from typing import List, Optional, Dict, Any
+import time
+from typing import Callable, Iterable, List, Optional, Dict, Any, Tuple
 import logging
+from connection_manager import connection_manager
+
+# Columnas escritas en consular_data por las rutas de carga
+INSERT_COLUMNS = '''servicio, categoria, costo_unitario, num_tramites,
+                    ingresos_totales, fecha_emision, formas_canceladas, archivo_origen'''
+
+# Columnas de valores que determinan si un registro existente cambió
+VALUE_COLUMNS = ['costo_unitario', 'num_tramites', 'ingresos_totales', 'formas_canceladas']
+
+# Agrupación de servicios en SQL; replica EnhancedDataProcessor._group_service_name.
+# Los servicios COMPULSA conservan su nombre para poder excluirlos al consultar.
+SERVICIO_AGRUPADO_SQL = '''CASE
+                    WHEN {servicio} LIKE '%COMPULSA%' THEN {servicio}
+                    WHEN {servicio} LIKE '%RCM%' THEN 'RCM - Expedición Diaria'
+                    WHEN {servicio} LIKE '%PASAPORTE%' AND ({servicio} LIKE '%ORDINARIO%'
+                         OR INSTR({servicio}, '50%') > 0 OR INSTR({servicio}, '50 %') > 0)
+                        THEN 'Pasaportes Ordinarios'
+                    ELSE {servicio}
+                END'''
+
+# Columnas de la tabla paginada de datos detallados (todas ordenables)
+DATA_PAGE_COLUMNS = ['fecha_emision', 'servicio', 'categoria', 'costo_unitario', 'num_tramites',
+                     'ingresos_totales', 'formas_canceladas', 'archivo_origen']
+
+# Columnas sumadas en daily_service_rollup
+ROLLUP_SUM_COLUMNS = ['num_tramites', 'ingresos_totales', 'formas_canceladas']
+
+# Archivo que marca el reemplazo de la base por una reconstruida (ver
+# database_rebuild); mientras existe se rechazan las escrituras. Pasados
+# SWAP_LOCK_TIMEOUT segundos se ignora, así un reemplazo interrumpido no
+# bloquea la base
+SWAP_LOCK_SUFFIX = '.swap'
+SWAP_LOCK_TIMEOUT = 60
+
+# Estadísticas de carga por modo ('insert' normal, 'upsert' al sobrescribir)
+LOAD_STATS_KEYS = {
+    'insert': ['inserted', 'duplicates', 'errors', 'total_processed'],
+    'upsert': ['inserted', 'updated', 'unchanged', 'duplicates', 'errors', 'total_processed']
+}
+
+# Firma de archivo guardada en archivos_cargados (tamaño, mtime y SHA-256)
+FILE_SIGNATURE_COLUMNS = {
+    'tamaño_bytes': 'INTEGER',
+    'fecha_modificacion': 'REAL',
+    'hash_contenido': 'TEXT'
+}
+
+
+def swap_in_progress(db_path: str) -> bool:
+    """Indica si la base de datos se está reemplazando por una reconstruida"""
+    try:
+        return time.time() - os.path.getmtime(db_path + SWAP_LOCK_SUFFIX) < SWAP_LOCK_TIMEOUT
+    except OSError:
+        return False
+
 
 class DatabaseManager:
     def __init__(self, db_path: str = None):
@@ -19,11 +76,16 @@ class DatabaseManager:
             self.db_path = os.path.join(current_dir, "consular_data.db")
         else:
             self.db_path = db_path
-        self.setup_database()
+        # El esquema se crea una sola vez por ruta en todo el proceso
+        connection_manager.ensure_schema(self.db_path, self.setup_database)
+        
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtiene la conexión persistente del hilo actual (no debe cerrarse)"""
+        return connection_manager.get_connection(self.db_path)
         
     def setup_database(self):
         """Crea las tablas necesarias si no existen"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
             # Tabla principal de datos consulares
@@ -52,7 +114,28 @@ class DatabaseManager:
                     fecha_carga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     registros_insertados INTEGER,
                     registros_duplicados INTEGER,
-                    estado TEXT DEFAULT 'success'
+                    estado TEXT DEFAULT 'success',
+                    tamaño_bytes INTEGER,
+                    fecha_modificacion REAL,
+                    hash_contenido TEXT,
+                    modo_carga TEXT DEFAULT 'insert'
+                )
+            ''')
+            self._migrate_files_table(cursor)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_archivos_hash ON archivos_cargados(hash_contenido)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_archivos_nombre ON archivos_cargados(nombre_archivo)')
+            
+            # Cargas interrumpidas: último bloque confirmado por archivo y modo
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cargas_pendientes (
+                    hash_contenido TEXT NOT NULL,
+                    modo TEXT NOT NULL,
+                    nombre_archivo TEXT NOT NULL,
+                    filas_por_bloque INTEGER NOT NULL,
+                    ultimo_bloque INTEGER NOT NULL,
+                    estadisticas TEXT NOT NULL,
+                    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (hash_contenido, modo)
                 )
             ''')
             
@@ -61,68 +144,535 @@ class DatabaseManager:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_categoria ON consular_data(categoria)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_servicio ON consular_data(servicio)')
             
+            # Metadatos: versión de datos para invalidar cachés de resultados
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metadatos (
+                    clave TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute("INSERT OR IGNORE INTO metadatos (clave, valor) VALUES ('data_version', 0)")
+            
+            # Resumen diario por servicio agrupado y categoría
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_service_rollup'")
+            rollup_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_service_rollup (
+                    fecha DATE NOT NULL,
+                    servicio_agrupado TEXT NOT NULL,
+                    categoria TEXT NOT NULL DEFAULT '',
+                    num_tramites INTEGER NOT NULL DEFAULT 0,
+                    ingresos_totales REAL NOT NULL DEFAULT 0,
+                    formas_canceladas INTEGER NOT NULL DEFAULT 0,
+                    registros INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (fecha, servicio_agrupado, categoria)
+                ) WITHOUT ROWID
+            ''')
+            self._create_rollup_triggers(cursor)
+            
+            # Bases de datos creadas antes del resumen: poblarlo una sola vez
+            if not rollup_exists:
+                self._rebuild_daily_rollup(cursor)
+            
             conn.commit()
+
+    @staticmethod
+    def _migrate_files_table(cursor: sqlite3.Cursor):
+        """Agrega a archivos_cargados las columnas de firma y de modo si la base es anterior a ellas"""
+        cursor.execute('PRAGMA table_info(archivos_cargados)')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in FILE_SIGNATURE_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE archivos_cargados ADD COLUMN {column} {column_type}')
+        if 'modo_carga' not in existing:
+            cursor.execute("ALTER TABLE archivos_cargados ADD COLUMN modo_carga TEXT DEFAULT 'insert'")
+
+    @staticmethod
+    def _create_rollup_triggers(cursor: sqlite3.Cursor):
+        """
+        Crea los triggers que mantienen daily_service_rollup al insertar,
+        eliminar o actualizar registros de consular_data.
+
+        Todas las rutas de escritura (carga normal, sobrescribir, eliminación por
+        archivo y agrupación permanente) actualizan el resumen de forma incremental.
+        """
+        def add_row(row: str) -> str:
+            values = ', '.join(f'COALESCE({row}.{col}, 0)' for col in ROLLUP_SUM_COLUMNS)
+            updates = ',\n'.join(
+                f'{col} = {col} + excluded.{col}' for col in ROLLUP_SUM_COLUMNS + ['registros']
+            )
+            return f'''
+                INSERT INTO daily_service_rollup
+                (fecha, servicio_agrupado, categoria, {', '.join(ROLLUP_SUM_COLUMNS)}, registros)
+                VALUES ({row}.fecha_emision, {SERVICIO_AGRUPADO_SQL.format(servicio=f'{row}.servicio')},
+                        COALESCE({row}.categoria, ''), {values}, 1)
+                ON CONFLICT(fecha, servicio_agrupado, categoria) DO UPDATE SET
+                {updates};
+            '''
+
+        def remove_row(row: str) -> str:
+            key = f'''fecha = {row}.fecha_emision
+                    AND servicio_agrupado = {SERVICIO_AGRUPADO_SQL.format(servicio=f'{row}.servicio')}
+                    AND categoria = COALESCE({row}.categoria, '')'''
+            updates = ',\n'.join(
+                f'{col} = {col} - COALESCE({row}.{col}, 0)' for col in ROLLUP_SUM_COLUMNS
+            )
+            return f'''
+                UPDATE daily_service_rollup SET
+                {updates},
+                registros = registros - 1
+                WHERE {key};
+                DELETE FROM daily_service_rollup WHERE {key} AND registros <= 0;
+            '''
+
+        tracked_columns = 'servicio, categoria, fecha_emision, ' + ', '.join(ROLLUP_SUM_COLUMNS)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_insert
+            AFTER INSERT ON consular_data
+            BEGIN {add_row('NEW')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_delete
+            AFTER DELETE ON consular_data
+            BEGIN {remove_row('OLD')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_update
+            AFTER UPDATE OF {tracked_columns} ON consular_data
+            BEGIN {remove_row('OLD')} {add_row('NEW')} END
+        ''')
+
+    @staticmethod
+    def _rebuild_daily_rollup(cursor: sqlite3.Cursor):
+        """Recalcula daily_service_rollup completo a partir de consular_data"""
+        sums = ', '.join(f'SUM(COALESCE({col}, 0))' for col in ROLLUP_SUM_COLUMNS)
+        cursor.execute('DELETE FROM daily_service_rollup')
+        cursor.execute(f'''
+            INSERT INTO daily_service_rollup
+            (fecha, servicio_agrupado, categoria, {', '.join(ROLLUP_SUM_COLUMNS)}, registros)
+            SELECT
+                fecha_emision,
+                {SERVICIO_AGRUPADO_SQL.format(servicio='servicio')},
+                COALESCE(categoria, ''),
+                {sums},
+                COUNT(*)
+            FROM consular_data
+            GROUP BY 1, 2, 3
+        ''')
+
+    def rebuild_daily_rollup(self):
+        """Reconstruye el resumen diario (útil tras modificar datos fuera del gestor)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._rebuild_daily_rollup(cursor)
+            self.bump_data_version(cursor)
+            conn.commit()
+
+    def get_data_version(self) -> int:
+        """Obtiene la versión de datos (cambia con cada inserción, eliminación o agrupación)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT valor FROM metadatos WHERE clave = 'data_version'")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+
+    def set_data_version(self, version: int):
+        """Fija la versión de datos (al reconstruir la base, continúa la de la anterior)"""
+        with self.get_connection() as conn:
+            conn.execute("UPDATE metadatos SET valor = ? WHERE clave = 'data_version'", (version,))
+            conn.commit()
+
+    def bump_data_version(self, cursor: Optional[sqlite3.Cursor] = None):
+        """
+        Incrementa la versión de datos.
+
+        Args:
+            cursor: Cursor de una transacción en curso; si es None se usa una propia
+        """
+        query = "UPDATE metadatos SET valor = valor + 1 WHERE clave = 'data_version'"
+        if cursor is not None:
+            cursor.execute(query)
+            self._ensure_not_swapping(cursor.connection)
+            return
+
+        with self.get_connection() as conn:
+            conn.execute(query)
+            self._ensure_not_swapping(conn)
+            conn.commit()
+
+    def _ensure_not_swapping(self, conn: sqlite3.Connection):
+        """
+        Rechaza la escritura en curso si la base se está reemplazando o ya se
+        reemplazó (p. ej. desde otro proceso) después de abrir conn.
+
+        Se llama con el bloqueo de escritura ya tomado: o el reemplazo espera a
+        que esta transacción termine (y ve el cambio de versión), o la
+        transacción ve el archivo de bloqueo o el archivo nuevo y se revierte.
+        """
+        if swap_in_progress(self.db_path):
+            raise sqlite3.OperationalError('La base de datos se está reemplazando por una reconstruida')
+        if not connection_manager.is_current(conn):
+            raise sqlite3.OperationalError('La base de datos fue reemplazada por una reconstruida')
             
-    def insert_data_from_dataframe(self, df: pd.DataFrame, archivo_origen: str) -> Dict[str, int]:
+    def insert_data_from_dataframe(self, df: pd.DataFrame, archivo_origen: str,
+                                   file_signature: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """
         Inserta datos desde un DataFrame validando duplicados.
         
         Args:
             df: DataFrame con los datos a insertar
             archivo_origen: Nombre del archivo origen
+            file_signature: Tamaño, fecha de modificación y hash del archivo
             
         Returns:
             Dict con estadísticas de inserción
         """
-        inserted = 0
-        duplicates = 0
-        errors = 0
+        return self.insert_data_from_chunks([df], archivo_origen, file_signature)
+
+    def insert_data_from_chunks(self, chunks: Iterable[pd.DataFrame], archivo_origen: str,
+                                file_signature: Optional[Dict[str, Any]] = None,
+                                checkpoint: Optional[Dict[str, Any]] = None,
+                                progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        Inserta datos que llegan por bloques (por ejemplo del parser incremental).
         
-        with sqlite3.connect(self.db_path) as conn:
-            for _, row in df.iterrows():
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO consular_data 
-                        (servicio, categoria, costo_unitario, num_tramites, 
-                         ingresos_totales, fecha_emision, formas_canceladas, archivo_origen)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        row['servicio'],
-                        row['categoria'],
-                        row['costo_unitario'],
-                        row['num_tramites'],
-                        row['ingresos_totales'],
-                        row['fecha_emision'].strftime('%Y-%m-%d') if pd.notna(row['fecha_emision']) else None,
-                        row.get('formas_canceladas', 0),
-                        archivo_origen
-                    ))
-                    
-                    if cursor.rowcount > 0:
-                        inserted += 1
-                    else:
-                        duplicates += 1
-                        
-                except Exception as e:
-                    errors += 1
-                    logging.error(f"Error insertando fila: {e}")
-            
-            conn.commit()
+        Cada bloque se confirma en su propia transacción; con checkpoint, el
+        punto de control se guarda en esa misma transacción y una carga
+        interrumpida continúa desde el bloque siguiente (ver _write_chunks).
+        
+        Args:
+            chunks: Iterable de DataFrames con los datos a insertar
+            archivo_origen: Nombre del archivo origen
+            file_signature: Tamaño, fecha de modificación y hash del archivo
+            checkpoint: Punto de control de get_ingest_checkpoint para reanudar
+            progress_callback: Función llamada con el número de bloques confirmados
             
-            # Registrar el archivo cargado
+        Returns:
+            Dict con estadísticas de inserción ('interrupted_at' si no terminó)
+        """
+        def write_chunk(cursor: sqlite3.Cursor, records: List[tuple]) -> Dict[str, int]:
+            # Los duplicados se deducen contando los ids nuevos (total_changes
+            # incluye los cambios de los triggers del resumen diario)
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM consular_data")
+            last_id = cursor.fetchone()[0]
+            cursor.executemany(f'''
+                INSERT OR IGNORE INTO consular_data ({INSERT_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', records)
+            cursor.execute("SELECT COUNT(*) FROM consular_data WHERE id > ?", (last_id,))
+            inserted = cursor.fetchone()[0]
+            return {'inserted': inserted, 'duplicates': len(records) - inserted}
+
+        return self._write_chunks(chunks, archivo_origen, 'insert', write_chunk,
+                                  file_signature, checkpoint, progress_callback)
+
+    def upsert_data_from_dataframe(self, df: pd.DataFrame, archivo_origen: str,
+                                   file_signature: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Inserta o actualiza datos desde un DataFrame (modo sobrescribir).
+
+        Args:
+            df: DataFrame con los datos a insertar o actualizar
+            archivo_origen: Nombre del archivo origen
+            file_signature: Tamaño, fecha de modificación y hash del archivo
+
+        Returns:
+            Dict con estadísticas: insertados, actualizados, sin cambios,
+            duplicados dentro del archivo y errores
+        """
+        return self.upsert_data_from_chunks([df], archivo_origen, file_signature)
+
+    def upsert_data_from_chunks(self, chunks: Iterable[pd.DataFrame], archivo_origen: str,
+                                file_signature: Optional[Dict[str, Any]] = None,
+                                checkpoint: Optional[Dict[str, Any]] = None,
+                                progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        Inserta o actualiza datos que llegan por bloques (modo sobrescribir).
+
+        Cada bloque se carga en una tabla temporal de staging y se fusiona con
+        consular_data en una sola sentencia INSERT ... ON CONFLICT DO UPDATE,
+        en su propia transacción. Solo se actualizan los registros cuyos
+        valores realmente cambiaron. Las claves repetidas dentro del archivo se
+        quedan con la primera aparición; tras reanudar, esto solo se garantiza
+        entre los bloques de la nueva ejecución.
+
+        Args:
+            chunks: Iterable de DataFrames con los datos a insertar o actualizar
+            archivo_origen: Nombre del archivo origen
+            file_signature: Tamaño, fecha de modificación y hash del archivo
+            checkpoint: Punto de control de get_ingest_checkpoint para reanudar
+            progress_callback: Función llamada con el número de bloques confirmados
+
+        Returns:
+            Dict con estadísticas: insertados, actualizados, sin cambios,
+            duplicados dentro del archivo y errores ('interrupted_at' si no terminó)
+        """
+        changed_condition = ' OR '.join(
+            f'consular_data.{col} IS NOT excluded.{col}' for col in VALUE_COLUMNS
+        )
+        differs_condition = ' OR '.join(
+            f'c.{col} IS NOT s.{col}' for col in VALUE_COLUMNS
+        )
+        # Claves (servicio, fecha_emision, categoria) ya vistas en bloques anteriores
+        seen_keys = set()
+
+        def write_chunk(cursor: sqlite3.Cursor, records: List[tuple]) -> Dict[str, int]:
             cursor.execute('''
-                INSERT INTO archivos_cargados 
-                (nombre_archivo, ruta_archivo, registros_insertados, registros_duplicados)
-                VALUES (?, ?, ?, ?)
-            ''', (archivo_origen, archivo_origen, inserted, duplicates))
+                CREATE TEMP TABLE IF NOT EXISTS staging_consular_data (
+                    servicio TEXT NOT NULL,
+                    categoria TEXT,
+                    costo_unitario REAL,
+                    num_tramites INTEGER,
+                    ingresos_totales REAL,
+                    fecha_emision DATE NOT NULL,
+                    formas_canceladas INTEGER DEFAULT 0,
+                    archivo_origen TEXT,
+                    UNIQUE(servicio, fecha_emision, categoria)
+                )
+            ''')
+            cursor.execute('DELETE FROM staging_consular_data')
+
+            # Claves ya cargadas por un bloque anterior de este archivo
+            keys = [(r[0], r[5], r[1]) for r in records]
+            repeated = [key in seen_keys for key in keys]
+            seen_keys.update(keys)
+            if any(repeated):
+                records = [record for record, skip in zip(records, repeated) if not skip]
+
+            # Carga masiva al staging; las claves repetidas dentro del bloque
+            # se quedan con la primera aparición, igual que en la carga normal
+            changes_before = cursor.connection.total_changes
+            cursor.executemany(f'''
+                INSERT OR IGNORE INTO staging_consular_data ({INSERT_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', records)
+            staged = cursor.connection.total_changes - changes_before
+
+            # Clasificar los registros antes de fusionar
+            cursor.execute(f'''
+                SELECT
+                    COALESCE(SUM(CASE WHEN c.id IS NULL THEN 1 ELSE 0 END), 0),
+                    COALESCE(SUM(CASE WHEN c.id IS NOT NULL AND ({differs_condition}) THEN 1 ELSE 0 END), 0)
+                FROM staging_consular_data s
+                LEFT JOIN consular_data c
+                    ON c.servicio = s.servicio
+                    AND c.fecha_emision = s.fecha_emision
+                    AND c.categoria = s.categoria
+            ''')
+            inserted, updated = cursor.fetchone()
+
+            # Fusión en una sola sentencia
+            cursor.execute(f'''
+                INSERT INTO consular_data ({INSERT_COLUMNS})
+                SELECT {INSERT_COLUMNS} FROM staging_consular_data WHERE true
+                ON CONFLICT(servicio, fecha_emision, categoria) DO UPDATE SET
+                    costo_unitario = excluded.costo_unitario,
+                    num_tramites = excluded.num_tramites,
+                    ingresos_totales = excluded.ingresos_totales,
+                    formas_canceladas = excluded.formas_canceladas,
+                    archivo_origen = excluded.archivo_origen,
+                    fecha_carga = CURRENT_TIMESTAMP
+                WHERE {changed_condition}
+            ''')
+            cursor.execute('DELETE FROM staging_consular_data')
+
+            return {
+                'inserted': inserted,
+                'updated': updated,
+                'unchanged': staged - inserted - updated,
+                'duplicates': sum(repeated) + len(records) - staged
+            }
+
+        return self._write_chunks(chunks, archivo_origen, 'upsert', write_chunk,
+                                  file_signature, checkpoint, progress_callback)
+
+    def _write_chunks(self, chunks: Iterable[pd.DataFrame], archivo_origen: str, mode: str,
+                      write_chunk: Callable[[sqlite3.Cursor, List[tuple]], Dict[str, int]],
+                      file_signature: Optional[Dict[str, Any]],
+                      checkpoint: Optional[Dict[str, Any]],
+                      progress_callback: Optional[Callable[[int], None]]) -> Dict[str, int]:
+        """
+        Escribe los bloques de un archivo confirmando cada uno por separado.
+
+        Con checkpoint y hash de contenido, cada transacción guarda también el
+        último bloque confirmado y las estadísticas acumuladas en cargas_pendientes.
+        Si la carga se interrumpe (error de SQLite o excepción al leer el
+        archivo), lo confirmado se conserva y el archivo no se registra; al
+        reanudar se pasan solo los bloques siguientes y las estadísticas parten
+        de las guardadas, así nada se cuenta dos veces. Al terminar, el archivo
+        se registra y el punto de control se elimina.
+
+        Args:
+            chunks: Bloques a escribir (a partir del siguiente al del checkpoint)
+            archivo_origen: Nombre del archivo origen
+            mode: 'insert' o 'upsert'
+            write_chunk: Escribe los registros de un bloque y devuelve sus estadísticas
+            file_signature: Firma del archivo
+            checkpoint: Punto de control previo o nuevo (con filas_por_bloque)
+            progress_callback: Función llamada con el número de bloques confirmados
+
+        Returns:
+            Estadísticas acumuladas; si la carga se interrumpió por un error de
+            SQLite, incluyen 'interrupted_at' con el bloque que falló
+        """
+        stats = dict.fromkeys(LOAD_STATS_KEYS[mode], 0)
+        content_hash = (file_signature or {}).get('hash_contenido')
+        track = checkpoint is not None and content_hash is not None
+        first_chunk = 0
+        if checkpoint is not None:
+            stats.update(checkpoint.get('stats', {}))
+            first_chunk = checkpoint.get('ultimo_bloque', -1) + 1
+
+        interrupted_at = None
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk_index, df in enumerate(chunks, start=first_chunk):
+                records, chunk_errors = self._prepare_insert_records(df, archivo_origen)
+                try:
+                    chunk_stats = write_chunk(cursor, records)
+                    chunk_stats.update(errors=chunk_errors, total_processed=len(df))
+                    chunk_stats = {key: stats[key] + chunk_stats.get(key, 0) for key in stats}
+                    if track:
+                        self._save_ingest_checkpoint(cursor, content_hash, mode, archivo_origen,
+                                                     checkpoint['filas_por_bloque'], chunk_index, chunk_stats)
+                    self._ensure_not_swapping(conn)
+                    conn.commit()
+                    stats = chunk_stats
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    stats['errors'] += len(records) + chunk_errors
+                    stats['total_processed'] += len(df)
+                    interrupted_at = chunk_index
+                    logging.error(f"Error cargando el bloque {chunk_index} de {archivo_origen}: {e}")
+                    break
+
+                if progress_callback is not None:
+                    progress_callback(chunk_index + 1)
+
+            if interrupted_at is None:
+                if mode == 'upsert':
+                    # Un archivo sobrescrito reemplaza su registro previo en el historial
+                    cursor.execute("DELETE FROM archivos_cargados WHERE nombre_archivo = ?", (archivo_origen,))
+                    self._register_loaded_file(cursor, archivo_origen, stats['inserted'] + stats['updated'],
+                                               stats['unchanged'] + stats['duplicates'], file_signature, mode)
+                else:
+                    self._register_loaded_file(cursor, archivo_origen, stats['inserted'],
+                                               stats['duplicates'], file_signature, mode)
+                if track:
+                    cursor.execute("DELETE FROM cargas_pendientes WHERE hash_contenido = ? AND modo = ?",
+                                   (content_hash, mode))
+            if stats['inserted'] or stats.get('updated'):
+                self.bump_data_version(cursor)
             conn.commit()
-            
+
+        if interrupted_at is not None:
+            stats['interrupted_at'] = interrupted_at
+        return stats
+
+    def get_ingest_checkpoint(self, hash_contenido: str, modo: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el punto de control de una carga interrumpida.
+
+        Args:
+            hash_contenido: SHA-256 del archivo
+            modo: 'insert' o 'upsert'
+
+        Returns:
+            Diccionario con nombre_archivo, filas_por_bloque, ultimo_bloque y
+            stats, o None si no hay carga pendiente
+        """
+        with self.get_connection() as conn:
+            row = conn.execute('''
+                SELECT nombre_archivo, filas_por_bloque, ultimo_bloque, estadisticas
+                FROM cargas_pendientes
+                WHERE hash_contenido = ? AND modo = ?
+            ''', (hash_contenido, modo)).fetchone()
+
+        if row is None:
+            return None
         return {
-            'inserted': inserted,
-            'duplicates': duplicates,
-            'errors': errors,
-            'total_processed': len(df)
+            'nombre_archivo': row[0],
+            'filas_por_bloque': row[1],
+            'ultimo_bloque': row[2],
+            'stats': json.loads(row[3])
         }
+
+    @staticmethod
+    def _save_ingest_checkpoint(cursor: sqlite3.Cursor, hash_contenido: str, modo: str,
+                                archivo_origen: str, filas_por_bloque: int,
+                                ultimo_bloque: int, stats: Dict[str, int]):
+        """Guarda el último bloque confirmado de una carga (dentro de su transacción)"""
+        cursor.execute('''
+            INSERT INTO cargas_pendientes
+            (hash_contenido, modo, nombre_archivo, filas_por_bloque, ultimo_bloque, estadisticas)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash_contenido, modo) DO UPDATE SET
+                nombre_archivo = excluded.nombre_archivo,
+                ultimo_bloque = excluded.ultimo_bloque,
+                estadisticas = excluded.estadisticas,
+                fecha_actualizacion = CURRENT_TIMESTAMP
+        ''', (hash_contenido, modo, archivo_origen, filas_por_bloque, ultimo_bloque, json.dumps(stats)))
+
+    @staticmethod
+    def _register_loaded_file(cursor: sqlite3.Cursor, archivo_origen: str,
+                              inserted: int, duplicates: int,
+                              file_signature: Optional[Dict[str, Any]] = None,
+                              mode: str = 'insert'):
+        """Registra un archivo cargado (su firma, si se conoce, y el modo de carga) en la tabla de control"""
+        file_signature = file_signature or {}
+        cursor.execute('''
+            INSERT INTO archivos_cargados
+            (nombre_archivo, ruta_archivo, registros_insertados, registros_duplicados,
+             tamaño_bytes, fecha_modificacion, hash_contenido, modo_carga)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (archivo_origen, archivo_origen, inserted, duplicates,
+              *(file_signature.get(column) for column in FILE_SIGNATURE_COLUMNS), mode))
+
+    @staticmethod
+    def _prepare_insert_records(df: pd.DataFrame, archivo_origen: str) -> Tuple[List[tuple], int]:
+        """
+        Convierte las columnas del DataFrame una sola vez a tipos nativos de SQLite.
+
+        Las fechas se formatean de forma vectorizada y los NaN se convierten en NULL.
+        Las filas sin servicio o sin fecha válida violarían las restricciones NOT NULL
+        de la tabla, por lo que se descartan y se cuentan como errores.
+
+        Args:
+            df: DataFrame con los datos a insertar
+            archivo_origen: Nombre del archivo origen
+
+        Returns:
+            Tupla (lista de registros listos para executemany, número de filas inválidas)
+        """
+        if df.empty:
+            return [], 0
+
+        def to_sql_values(series: pd.Series) -> pd.Series:
+            return series.astype(object).where(series.notna(), None)
+
+        fechas = pd.to_datetime(df['fecha_emision'], errors='coerce')
+        valid_mask = fechas.notna() & df['servicio'].notna()
+
+        if 'formas_canceladas' in df.columns:
+            canceladas = pd.to_numeric(df['formas_canceladas'], errors='coerce')
+        else:
+            canceladas = pd.Series(0, index=df.index)
+
+        columns = [
+            to_sql_values(df['servicio']),
+            to_sql_values(df['categoria']),
+            to_sql_values(pd.to_numeric(df['costo_unitario'], errors='coerce')),
+            to_sql_values(pd.to_numeric(df['num_tramites'], errors='coerce')),
+            to_sql_values(pd.to_numeric(df['ingresos_totales'], errors='coerce')),
+            to_sql_values(fechas.dt.strftime('%Y-%m-%d')),
+            to_sql_values(canceladas),
+            pd.Series(archivo_origen, index=df.index, dtype=object)
+        ]
+
+        valid_columns = [column[valid_mask].tolist() for column in columns]
+        records = list(zip(*valid_columns))
+
+        return records, int((~valid_mask).sum())
     
     def get_all_data(self, start_date: Optional[str] = None, 
                      end_date: Optional[str] = None) -> pd.DataFrame:
@@ -149,26 +699,26 @@ class DatabaseManager:
             
         query += " ORDER BY fecha_emision DESC"
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             return pd.read_sql_query(query, conn, params=params)
     
     def get_categories_list(self) -> List[str]:
         """Obtiene lista única de categorías"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT categoria FROM consular_data WHERE categoria IS NOT NULL ORDER BY categoria")
             return [row[0] for row in cursor.fetchall()]
     
     def get_services_list(self) -> List[str]:
         """Obtiene lista única de servicios"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT servicio FROM consular_data ORDER BY servicio")
             return [row[0] for row in cursor.fetchall()]
     
     def get_date_range(self) -> Dict[str, Any]:
         """Obtiene el rango de fechas disponible en la base de datos"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
@@ -184,9 +734,190 @@ class DatabaseManager:
                 'total_registros': result[2]
             }
     
+    @staticmethod
+    def _rollup_filters(start_date: Optional[str], end_date: Optional[str],
+                        exclude_pattern: Optional[str]) -> Tuple[str, List[Any]]:
+        """Construye la cláusula WHERE común de las consultas al resumen diario"""
+        where = "WHERE 1=1"
+        params = []
+
+        if start_date:
+            where += " AND fecha >= ?"
+            params.append(start_date)
+
+        if end_date:
+            where += " AND fecha <= ?"
+            params.append(end_date)
+
+        if exclude_pattern:
+            where += " AND servicio_agrupado NOT LIKE ?"
+            params.append(f'%{exclude_pattern}%')
+
+        return where, params
+
+    def get_daily_rollup(self, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         exclude_pattern: Optional[str] = None) -> pd.DataFrame:
+        """
+        Obtiene el resumen diario por servicio agrupado y categoría.
+
+        Args:
+            start_date: Fecha inicio (YYYY-MM-DD)
+            end_date: Fecha fin (YYYY-MM-DD)
+            exclude_pattern: Texto de servicios a excluir (p. ej. 'COMPULSA')
+
+        Returns:
+            DataFrame con fecha_emision, servicio, categoria, sumas y registros
+        """
+        where, params = self._rollup_filters(start_date, end_date, exclude_pattern)
+        query = f"""
+            SELECT
+                fecha AS fecha_emision,
+                servicio_agrupado AS servicio,
+                NULLIF(categoria, '') AS categoria,
+                num_tramites,
+                ingresos_totales,
+                formas_canceladas,
+                registros
+            FROM daily_service_rollup
+            {where}
+            ORDER BY fecha
+        """
+
+        with self.get_connection() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def get_daily_totals(self, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         exclude_pattern: Optional[str] = None) -> pd.DataFrame:
+        """
+        Obtiene los totales por día desde el resumen diario.
+
+        Args:
+            start_date: Fecha inicio (YYYY-MM-DD)
+            end_date: Fecha fin (YYYY-MM-DD)
+            exclude_pattern: Texto de servicios a excluir (p. ej. 'COMPULSA')
+
+        Returns:
+            DataFrame con una fila por fecha con datos
+        """
+        where, params = self._rollup_filters(start_date, end_date, exclude_pattern)
+        query = f"""
+            SELECT
+                fecha AS fecha_emision,
+                SUM(num_tramites) AS num_tramites,
+                SUM(ingresos_totales) AS ingresos_totales,
+                SUM(formas_canceladas) AS formas_canceladas,
+                SUM(registros) AS registros,
+                COUNT(DISTINCT servicio_agrupado) AS servicios_unicos
+            FROM daily_service_rollup
+            {where}
+            GROUP BY fecha
+            ORDER BY fecha
+        """
+
+        with self.get_connection() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def get_data_page(self, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None,
+                      exclude_pattern: Optional[str] = None,
+                      categoria: Optional[str] = None,
+                      search: Optional[str] = None,
+                      sort_by: str = 'fecha_emision',
+                      descending: bool = True,
+                      page: int = 1,
+                      page_size: int = 50) -> Dict[str, Any]:
+        """
+        Obtiene una página de registros filtrada, buscada y ordenada en SQL.
+
+        La página y el total de registros que cumplen los filtros salen de la
+        misma consulta (el total como subconsulta escalar). El servicio se
+        devuelve agrupado, como en el dashboard, y el desempate por id hace
+        estable el orden entre páginas. Ordenada por fecha, la consulta recorre
+        idx_fecha_emision y solo lee las filas de la página.
+
+        Args:
+            start_date: Fecha inicio (YYYY-MM-DD)
+            end_date: Fecha fin (YYYY-MM-DD)
+            exclude_pattern: Texto de servicios a excluir (p. ej. 'COMPULSA')
+            categoria: Categoría exacta a mostrar (None = todas)
+            search: Texto a buscar en el servicio agrupado y la categoría
+            sort_by: Columna de DATA_PAGE_COLUMNS por la que se ordena
+            descending: Orden descendente
+            page: Número de página, desde 1 (después de la última, la última)
+            page_size: Registros por página
+
+        Returns:
+            Diccionario con data (DataFrame de la página), total, page y pages
+        """
+        if sort_by not in DATA_PAGE_COLUMNS:
+            raise ValueError(f"Columna de orden no válida: {sort_by}")
+        page_size = max(1, int(page_size))
+        page = max(1, int(page))
+
+        servicio_agrupado = SERVICIO_AGRUPADO_SQL.format(servicio='servicio')
+        where = "WHERE 1=1"
+        params = []
+
+        if start_date:
+            where += " AND fecha_emision >= ?"
+            params.append(start_date)
+
+        if end_date:
+            where += " AND fecha_emision <= ?"
+            params.append(end_date)
+
+        if exclude_pattern:
+            where += " AND servicio NOT LIKE ?"
+            params.append(f'%{exclude_pattern}%')
+
+        if categoria:
+            where += " AND categoria = ?"
+            params.append(categoria)
+
+        if search and search.strip():
+            # El texto se busca literal: % y _ no son comodines
+            escaped = search.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where += f" AND ({servicio_agrupado} LIKE ? ESCAPE '\\' OR categoria LIKE ? ESCAPE '\\')"
+            params.extend([f'%{escaped}%'] * 2)
+
+        direction = 'DESC' if descending else 'ASC'
+        order_column = servicio_agrupado if sort_by == 'servicio' else sort_by
+        columns = ', '.join(f'{servicio_agrupado} AS servicio' if column == 'servicio' else column
+                            for column in DATA_PAGE_COLUMNS)
+        query = f"""
+            SELECT {columns},
+                   (SELECT COUNT(*) FROM consular_data {where}) AS total_registros
+            FROM consular_data
+            {where}
+            ORDER BY {order_column} {direction}, id {direction}
+            LIMIT ? OFFSET ?
+        """
+
+        with self.get_connection() as conn:
+            data = pd.read_sql_query(query, conn, params=params * 2 + [page_size, (page - 1) * page_size])
+            if not data.empty:
+                total = int(data['total_registros'].iloc[0])
+            else:
+                # Página vacía: el total se cuenta aparte y, si la página pedida
+                # pasó de la última, se devuelve la última
+                total = conn.execute(f"SELECT COUNT(*) FROM consular_data {where}", params).fetchone()[0]
+                last_page = max(1, -(-total // page_size))
+                if page > last_page:
+                    page = last_page
+                    data = pd.read_sql_query(query, conn, params=params * 2 + [page_size, (page - 1) * page_size])
+
+        return {
+            'data': data.drop(columns='total_registros'),
+            'total': total,
+            'page': page,
+            'pages': max(1, -(-total // page_size))
+        }
+
     def get_files_history(self) -> pd.DataFrame:
         """Obtiene el historial de archivos cargados"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             return pd.read_sql_query("""
                 SELECT nombre_archivo, fecha_carga, registros_insertados, 
                        registros_duplicados, estado
@@ -194,6 +925,69 @@ class DatabaseManager:
                 ORDER BY fecha_carga DESC
             """, conn)
     
+    def get_loaded_files_index(self) -> Dict[str, Any]:
+        """
+        Lee en una sola consulta lo necesario para marcar archivos como cargados.
+        
+        Returns:
+            Diccionario con 'names' (nombres cargados), 'hashes' (hash -> nombre
+            con el que se cargó) y 'signatures' (nombre -> firma registrada)
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT nombre_archivo, {', '.join(FILE_SIGNATURE_COLUMNS)}
+                FROM archivos_cargados
+                ORDER BY id
+            ''').fetchall()
+        
+        index = {'names': set(), 'hashes': {}, 'signatures': {}}
+        for nombre, *signature in rows:
+            index['names'].add(nombre)
+            signature = dict(zip(FILE_SIGNATURE_COLUMNS, signature))
+            if signature['hash_contenido']:
+                index['hashes'].setdefault(signature['hash_contenido'], nombre)
+                index['signatures'][nombre] = signature
+        return index
+    
+    def get_loaded_files(self) -> List[Dict[str, Any]]:
+        """
+        Lista los archivos cargados en el orden en que se cargaron.
+        
+        Returns:
+            Lista de diccionarios con nombre_archivo, modo_carga y la firma registrada
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT nombre_archivo, COALESCE(modo_carga, 'insert'), {', '.join(FILE_SIGNATURE_COLUMNS)}
+                FROM archivos_cargados
+                ORDER BY id
+            ''').fetchall()
+        
+        return [
+            {'nombre_archivo': nombre, 'modo_carga': modo, **dict(zip(FILE_SIGNATURE_COLUMNS, signature))}
+            for nombre, modo, *signature in rows
+        ]
+    
+    def find_loaded_file(self, nombre_archivo: str, hash_contenido: Optional[str] = None) -> Optional[str]:
+        """
+        Busca un archivo ya cargado por nombre o por contenido.
+        
+        Args:
+            nombre_archivo: Nombre del archivo
+            hash_contenido: SHA-256 del contenido (opcional)
+            
+        Returns:
+            Nombre con el que se cargó, o None si no se ha cargado
+        """
+        with self.get_connection() as conn:
+            row = conn.execute('''
+                SELECT nombre_archivo FROM archivos_cargados
+                WHERE nombre_archivo = ? OR hash_contenido = ?
+                ORDER BY nombre_archivo != ?, id
+                LIMIT 1
+            ''', (nombre_archivo, hash_contenido, nombre_archivo)).fetchone()
+        return row[0] if row else None
+    
     def delete_data_by_file(self, archivo_origen: str) -> int:
         """
         Elimina datos por archivo origen.
@@ -204,43 +998,48 @@ class DatabaseManager:
         Returns:
             Número de registros eliminados
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM consular_data WHERE archivo_origen = ?", (archivo_origen,))
             deleted = cursor.rowcount
             
-            # También eliminar de la tabla de archivos cargados
+            # También eliminar de la tabla de archivos cargados y de las cargas pendientes
             cursor.execute("DELETE FROM archivos_cargados WHERE nombre_archivo = ?", (archivo_origen,))
+            cursor.execute("DELETE FROM cargas_pendientes WHERE nombre_archivo = ?", (archivo_origen,))
+            if deleted:
+                self.bump_data_version(cursor)
             conn.commit()
             
         return deleted
     
     def get_summary_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas resumen de la base de datos"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Estadísticas generales
+            # Totales desde el resumen diario (mucho más pequeño que consular_data)
             cursor.execute("""
                 SELECT 
-                    COUNT(*) as total_registros,
+                    SUM(registros) as total_registros,
                     SUM(ingresos_totales) as ingresos_totales,
                     SUM(num_tramites) as tramites_totales,
                     SUM(formas_canceladas) as canceladas_totales,
-                    COUNT(DISTINCT categoria) as categorias_unicas,
-                    COUNT(DISTINCT servicio) as servicios_unicos
-                FROM consular_data
+                    COUNT(DISTINCT NULLIF(categoria, '')) as categorias_unicas
+                FROM daily_service_rollup
             """)
-            
             stats = cursor.fetchone()
             
+            # Los servicios únicos se cuentan sin agrupar (recorre solo idx_servicio)
+            cursor.execute("SELECT COUNT(DISTINCT servicio) FROM consular_data")
+            servicios_unicos = cursor.fetchone()[0]
+            
             return {
                 'total_registros': stats[0] or 0,
                 'ingresos_totales': stats[1] or 0.0,
                 'tramites_totales': stats[2] or 0,
                 'canceladas_totales': stats[3] or 0,
                 'categorias_unicas': stats[4] or 0,
-                'servicios_unicos': stats[5] or 0
+                'servicios_unicos': servicios_unicos or 0
             }
     
     def backup_database(self, backup_path: Optional[str] = None) -> str:
@@ -258,8 +1057,11 @@ class DatabaseManager:
             backup_path = f"Inicio/backup_consular_{timestamp}.db"
             
         # Copiar la base de datos
-        with sqlite3.connect(self.db_path) as source:
-            with sqlite3.connect(backup_path) as backup:
-                source.backup(backup)
+        source = self.get_connection()
+        backup = sqlite3.connect(backup_path)
+        try:
+            source.backup(backup)
+        finally:
+            backup.close()
                 
         return backup_path
\ No newline at end of file
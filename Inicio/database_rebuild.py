@@ -0,0 +1,355 @@
+"""
+Reconstrucción completa de la base de datos a partir de los archivos cargados.
+
+Cuando cambian las reglas de limpieza o de agrupación, en lugar de modificar
+los datos con UPDATE o de eliminar y volver a cargar archivo por archivo, se
+construye una base nueva con todos los archivos de archivos_cargados (en el
+orden y con el modo en que se cargaron), leídos en paralelo desde su copia
+archivada o la caché Parquet. La base nueva reemplaza a la actual con un solo
+os.replace: quien lee ve la base anterior completa o la nueva completa. Los
+demás procesos (el dashboard, el servicio de carga automática) notan el
+archivo nuevo al pedir su siguiente conexión y se reabren sobre él; una
+escritura que empezó sobre la base anterior se rechaza y debe repetirse.
+
+Uso (desde la carpeta Inicio):
+    python -m database_rebuild
+    python -m database_rebuild --db consular_data.db --workers 4
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from connection_manager import connection_manager
+from database_manager import SWAP_LOCK_SUFFIX, swap_in_progress
+from file_manager import INGEST_CHUNK_ROWS, FileManager, iter_loaded_chunks, parse_file_for_load
+from parquet_cache import parquet_cache
+from robust_data_processor import RobustDataProcessor
+
+# Sufijo de la base en construcción, junto a la actual
+REBUILD_SUFFIX = '.rebuild'
+
+# Reintentos de os.replace mientras otro hilo cierra su conexión a la base
+SWAP_ATTEMPTS = 50
+SWAP_RETRY_SECONDS = 0.1
+
+
+def _remove_database_files(db_path: str):
+    """Elimina una base de datos SQLite y sus archivos -wal y -shm"""
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        try:
+            os.remove(db_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _resolve_sources(file_manager: FileManager, loaded_files: List[Dict[str, Any]]):
+    """
+    Busca de dónde leer cada archivo cargado: su copia archivada o, si no
+    existe, la caché Parquet de la versión actual de la limpieza.
+
+    Returns:
+        Tupla (lista de (archivo, ruta de lectura), nombres sin fuente)
+    """
+    sources = []
+    missing = []
+    for loaded in loaded_files:
+        content_hash = loaded['hash_contenido']
+        archived = file_manager.find_archived_source(content_hash)
+        if archived is not None:
+            sources.append((loaded, str(archived)))
+        elif content_hash and parquet_cache.get_metadata(content_hash) is not None:
+            # RobustDataProcessor toma los datos de la caché sin abrir la ruta
+            sources.append((loaded, loaded['nombre_archivo']))
+        else:
+            missing.append(loaded['nombre_archivo'])
+    return sources, missing
+
+
+def rebuild_database(db_path: Optional[str] = None, max_workers: Optional[int] = None,
+                     skip_missing: bool = False,
+                     progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+    """
+    Reconstruye consular_data en una base nueva y la intercambia con la actual.
+
+    Fases (con su tiempo en 'timings'):
+        inventario: archivos cargados y su fuente
+        lectura: espera por los archivos leídos y limpios en el pool de procesos
+        escritura: inserción por bloques en la base nueva
+        verificacion: PRAGMA quick_check y checkpoint de la base nueva
+        intercambio: reemplazo atómico del archivo de la base (las
+            escrituras se rechazan mientras dura)
+
+    Si falta la fuente de algún archivo (y skip_missing es False), si un
+    archivo falla o si la base actual cambió durante la reconstrucción, la
+    base actual queda intacta. La versión de datos de la base nueva es la de
+    la anterior más uno, así las cachés del dashboard se invalidan.
+
+    Args:
+        db_path: Ruta de la base de datos (por defecto la del dashboard)
+        max_workers: Procesos de lectura (por defecto uno por núcleo)
+        skip_missing: Si True, reconstruye sin los archivos que no tienen fuente
+        progress_callback: Función (archivos escritos, total, nombre)
+
+    Returns:
+        Diccionario con success, message, files, missing_files, stats, timings
+        y data_version
+    """
+    result = {
+        'success': False,
+        'message': '',
+        'files': [],
+        'missing_files': [],
+        'stats': {'inserted': 0, 'updated': 0, 'duplicates': 0, 'errors': 0, 'total_processed': 0},
+        'timings': {},
+        'data_version': None
+    }
+    timings = result['timings']
+
+    # Inventario
+    start = time.perf_counter()
+    current = FileManager(db_path)
+    db_path = current.db_manager.db_path
+    start_version = current.db_manager.get_data_version()
+    sources, result['missing_files'] = _resolve_sources(current, current.db_manager.get_loaded_files())
+    timings['inventario'] = time.perf_counter() - start
+
+    if result['missing_files'] and not skip_missing:
+        result['message'] = (f"No se encontró la fuente de {len(result['missing_files'])} archivos: "
+                             f"{', '.join(result['missing_files'])}")
+        return result
+
+    rebuild_path = db_path + REBUILD_SUFFIX
+    _remove_database_files(rebuild_path)
+    connection_manager.close_all(rebuild_path)
+
+    try:
+        rebuilt = FileManager(rebuild_path)
+        _load_sources(rebuilt, sources, max_workers, result, progress_callback)
+        if result['message']:
+            return result
+
+        # Verificación
+        start = time.perf_counter()
+        rebuilt.db_manager.set_data_version(start_version + 1)
+        conn = rebuilt.db_manager.get_connection()
+        check = conn.execute('PRAGMA quick_check').fetchone()[0]
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection_manager.close_all(rebuild_path)
+        timings['verificacion'] = time.perf_counter() - start
+        if check != 'ok':
+            result['message'] = f'La base reconstruida no pasó la verificación: {check}'
+            return result
+
+        # Intercambio
+        start = time.perf_counter()
+        try:
+            swapped = _swap_database(db_path, rebuild_path, start_version)
+        except OSError as e:
+            result['message'] = f'No se pudo reemplazar la base de datos: {e}'
+            return result
+        timings['intercambio'] = time.perf_counter() - start
+        if not swapped:
+            result['message'] = ('La base de datos cambió durante la reconstrucción (se cargaron o '
+                                 'eliminaron datos); vuelva a intentarlo')
+            return result
+    finally:
+        connection_manager.close_all(rebuild_path)
+        _remove_database_files(rebuild_path)
+
+    result['success'] = True
+    result['data_version'] = start_version + 1
+    result['message'] = (f"Base reconstruida: {len(result['files'])} archivos, "
+                         f"{result['stats']['inserted'] + result['stats']['updated']} registros")
+    if result['missing_files']:
+        result['message'] += f" ({len(result['missing_files'])} archivos sin fuente omitidos)"
+    return result
+
+
+def _load_sources(rebuilt: FileManager, sources: List, max_workers: Optional[int],
+                  result: Dict[str, Any], progress_callback) -> None:
+    """
+    Lee los archivos en un pool de procesos y los escribe en la base nueva en
+    el orden en que se cargaron originalmente. A lo sumo max_workers archivos
+    se leen a la vez, y sus datos limpios se toman de la caché Parquet bloque
+    por bloque. Con un solo proceso cada archivo se limpia mientras se
+    escribe, así que su lectura se cuenta en 'escritura'. Deja un mensaje en
+    result si algún archivo falla.
+    """
+    timings = result['timings']
+    timings['lectura'] = 0.0
+    timings['escritura'] = 0.0
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(sources)))
+
+    executor = None
+    if max_workers > 1:
+        # 'spawn': los procesos no heredan hilos de Streamlit ni conexiones SQLite
+        executor = ProcessPoolExecutor(max_workers=max_workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+    try:
+        def submit(index: int):
+            loaded, path = sources[index]
+            return executor.submit(parse_file_for_load, path, loaded['hash_contenido'])
+
+        # Ventana de max_workers archivos en vuelo; el siguiente se envía al
+        # empezar a esperar uno
+        pending = deque(submit(index) for index in range(max_workers)) if executor is not None else deque()
+
+        for index, (loaded, path) in enumerate(sources):
+            filename = loaded['nombre_archivo']
+            start = time.perf_counter()
+            future = None
+            if executor is not None:
+                future = pending.popleft()
+                if index + max_workers < len(sources):
+                    pending.append(submit(index + max_workers))
+            try:
+                if future is not None:
+                    error_message, chunk_offsets, chunks = future.result()
+                    chunks = iter_loaded_chunks(path, loaded['hash_contenido'], chunk_offsets, chunks)
+                else:
+                    processor = RobustDataProcessor(path, loaded['hash_contenido'])
+                    validation = processor.validate_structure()
+                    error_message = None if validation['is_valid'] else validation['error_message']
+                    chunks = processor.iter_clean_chunks(INGEST_CHUNK_ROWS)
+            except Exception as e:
+                error_message, chunks = str(e), None
+            timings['lectura'] += time.perf_counter() - start
+
+            if error_message is not None:
+                result['message'] = f'No se pudo leer {filename}: {error_message}'
+                return
+
+            start = time.perf_counter()
+            signature = {column: loaded[column] for column in ('tamaño_bytes', 'fecha_modificacion',
+                                                               'hash_contenido')}
+            try:
+                if loaded['modo_carga'] == 'upsert':
+                    stats = rebuilt.db_manager.upsert_data_from_chunks(chunks, filename, signature)
+                else:
+                    stats = rebuilt.db_manager.insert_data_from_chunks(chunks, filename, signature)
+            except Exception as e:
+                # Error al leer un bloque (p. ej. un archivo que se limpia mientras se escribe)
+                result['message'] = f'No se pudo leer {filename}: {e}'
+                return
+            timings['escritura'] += time.perf_counter() - start
+
+            if 'interrupted_at' in stats:
+                result['message'] = f'Error escribiendo {filename} en la base nueva'
+                return
+
+            # Soltar las referencias para liberar los bloques ya escritos
+            future = chunks = None
+            result['files'].append({'filename': filename, 'stats': stats})
+            for key in result['stats']:
+                result['stats'][key] += stats.get(key, 0)
+            if progress_callback is not None:
+                progress_callback(index + 1, len(sources), filename)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _swap_database(db_path: str, rebuild_path: str, expected_version: int) -> bool:
+    """
+    Reemplaza la base actual por la reconstruida si su versión de datos no cambió.
+
+    Mientras existe el archivo de bloqueo (SWAP_LOCK_SUFFIX) las escrituras se
+    rechazan, así que la versión comprobada con el bloqueo de escritura de
+    SQLite sigue valiendo al reemplazar el archivo. Antes de os.replace se
+    vacía el WAL y se cierran las conexiones (en Windows un archivo abierto no
+    puede reemplazarse, así que falla si otro proceso tiene la base abierta);
+    después se eliminan el -wal y el -shm anteriores. Las conexiones de otros
+    procesos se reabren solas (ver ConnectionManager.get_connection).
+
+    Returns:
+        True si se hizo el intercambio; False si la versión cambió o hay otro
+        intercambio en curso
+    """
+    lock_path = db_path + SWAP_LOCK_SUFFIX
+    if swap_in_progress(db_path):
+        return False
+    try:
+        # Un bloqueo vencido se descarta
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+
+    try:
+        # Las conexiones del proceso (de todos los hilos) se reabren con la base nueva
+        connection_manager.close_all(db_path)
+
+        lock = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        try:
+            # Espera a la escritura en curso; las siguientes ven el archivo de bloqueo
+            lock.execute('BEGIN IMMEDIATE')
+            row = lock.execute("SELECT valor FROM metadatos WHERE clave = 'data_version'").fetchone()
+            lock.execute('ROLLBACK')
+            if (row[0] if row else 0) != expected_version:
+                return False
+            lock.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            lock.close()
+        connection_manager.close_all(db_path)
+
+        # Otros hilos cierran su conexión anterior en su siguiente consulta
+        for attempt in range(SWAP_ATTEMPTS):
+            try:
+                os.replace(rebuild_path, db_path)
+                break
+            except PermissionError:
+                if attempt == SWAP_ATTEMPTS - 1:
+                    raise
+                time.sleep(SWAP_RETRY_SECONDS)
+
+        for suffix in ('-wal', '-shm'):
+            try:
+                os.remove(db_path + suffix)
+            except FileNotFoundError:
+                pass
+            except PermissionError:
+                # Aún abierto en otro proceso; tras el checkpoint no tiene datos
+                logging.warning(f"No se pudo eliminar {db_path + suffix} tras el intercambio")
+    finally:
+        os.remove(lock_path)
+        connection_manager.close_all(db_path)
+
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrucción de la base de datos consular")
+    parser.add_argument('--db', default=None, help='Ruta de la base de datos')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos de lectura')
+    parser.add_argument('--skip-missing', action='store_true',
+                        help='Reconstruir sin los archivos cuya fuente no se encuentra')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    result = rebuild_database(args.db, args.workers, args.skip_missing,
+                              lambda done, total, filename: logging.info(f"[{done}/{total}] {filename}"))
+    for phase, seconds in result['timings'].items():
+        logging.info(f"{phase:13}: {seconds:8.2f} s")
+    if result['success']:
+        logging.info(result['message'])
+    else:
+        logging.error(result['message'])
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,105 @@
+import copy
+import functools
+import inspect
+import logging
+import os
+import threading
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from typing import List, Optional, Dict, Any
-from database_manager import DatabaseManager
+from datetime import datetime, date
+from typing import List, Optional, Dict, Any, Tuple
+from database_manager import ROLLUP_SUM_COLUMNS, DatabaseManager
 from data_processor import MayoDataProcessor
+from query_engine import QueryEngine
+from result_cache import result_cache
+
+# Servicios excluidos de todos los análisis
+EXCLUDED_SERVICE_PATTERN = 'COMPULSA'
+
+# Mapeo de agrupación temporal a columna del DataFrame
+TEMPORAL_GROUP_COLUMNS = {
+    'dia': 'fecha_emision',
+    'mes': 'mes_año',
+    'trimestre': 'trimestre',
+    'año': 'año'
+}
+
+# Agrupaciones temporales de las gráficas; cada una tiene una clave entera
+# por fila calculada al cargar (días desde 1970, meses desde 1970 y año)
+PERIOD_GROUPINGS = ('Diaria', 'Mensual', 'Anual')
+
+# Columnas de texto que el modo compacto guarda como categorías
+CATEGORICAL_COLUMNS = ['servicio', 'categoria', 'archivo_origen', 'fecha_carga', 'dia_semana']
+
+# Conteos que el modo compacto guarda como int32 (sus sumas por grupo
+# conservan el tipo, así que int16 podría desbordarse) y componentes de
+# fecha que caben en int16
+COUNT_COLUMNS = ['id', 'num_tramites', 'formas_canceladas']
+DATE_PART_COLUMNS = ['año', 'mes', 'trimestre']
+
+# Montos que pueden guardarse como float32 si no pierden precisión; los
+# ingresos se suman en todos los análisis y sus totales superan 2**24, así
+# que se conservan en float64
+FLOAT32_COLUMNS = ['costo_unitario']
+
+def memoized(method):
+    """
+    Guarda el resultado del método en la caché compartida de resultados.
+    
+    La clave combina el método, sus argumentos normalizados y el rango con el
+    que se inicializó el procesador; la caché se invalida cuando cambia la
+    versión de datos de la base.
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = self._cache_key(method.__name__, signature, args, kwargs)
+        if key is None:
+            return method(self, *args, **kwargs)
+        
+        found, value = result_cache.get(key)
+        if found:
+            return value
+        
+        value = method(self, *args, **kwargs)
+        result_cache.put(key, value)
+        return value
+    
+    return wrapper
+
+# Procesadores con el histórico completo, compartidos por todas las sesiones
+# del proceso (uno por base de datos)
+_shared_processors: Dict[str, 'EnhancedDataProcessor'] = {}
+_load_lock = threading.Lock()
+
+def get_shared_processor(db_path: Optional[str] = None) -> 'EnhancedDataProcessor':
+    """
+    Obtiene el procesador compartido de una base de datos.
+    
+    El histórico completo se carga una sola vez por proceso y se vuelve a leer
+    solo cuando cambia la versión de datos. Las páginas deben pedir su rango
+    con with_date_range en lugar de reinicializar el procesador compartido.
+    
+    Args:
+        db_path: Ruta de la base de datos (por defecto la del DatabaseManager)
+        
+    Returns:
+        Procesador con el histórico completo cargado
+    """
+    processor = EnhancedDataProcessor(db_path, compact=True)
+    key = os.path.abspath(processor.db_manager.db_path)
+    
+    with _load_lock:
+        processor = _shared_processors.setdefault(key, processor)
+    
+    processor.refresh_if_stale()
+    return processor
+
+def clear_shared_processors():
+    """Descarta los procesadores compartidos; el siguiente acceso recarga la base"""
+    with _load_lock:
+        _shared_processors.clear()
 
 class EnhancedDataProcessor:
     """
@@ -10,16 +107,45 @@ class EnhancedDataProcessor:
     para análisis históricos y gestión centralizada de datos.
     """
     
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_path: Optional[str] = None, compact: bool = False):
+        self.db_manager = DatabaseManager(db_path)
         self.df = None
+        # Modo compacto: categorías, enteros pequeños y mes_año como entero AAAAMM
+        self.compact = compact
         self._cached_data = None
+        # Las agregaciones se resuelven en SQL; pandas queda como respaldo
+        self.query_engine = QueryEngine(self.db_manager)
+        self.use_sql_pushdown = True
+        # Resultados memorizados en result_cache mientras self.df sea el cargado
+        self.use_result_cache = True
+        self._loaded_df = None
+        # Rango de fechas de la última inicialización; las consultas al
+        # resumen diario lo usan por defecto para coincidir con self.df
+        self.start_date = None
+        self.end_date = None
+        # Claves ordenadas de fecha_emision para filtrar por rango sin copiar
+        self._date_keys = None
+        self._indexed_df = None
+        # Histórico completo procesado y versión de datos con la que se leyó;
+        # los cambios de rango se resuelven cortando este DataFrame
+        self._full_df = None
+        self._full_date_keys = None
+        self._loaded_version = None
+        # Claves enteras de período por agrupación, alineadas con self.df
+        self._full_period_keys = None
+        self._period_keys = None
+        self._period_df = None
+        # Máscaras de los filtros de texto de get_period_series sobre self.df
+        self._period_masks = {}
         
     def initialize_from_database(self, start_date: Optional[str] = None, 
                                end_date: Optional[str] = None) -> bool:
         """
         Inicializa el procesador con datos de la base de datos.
         
+        El histórico completo se lee solo la primera vez o cuando cambió la
+        versión de datos; el rango se aplica como un corte en memoria.
+        
         Args:
             start_date: Fecha inicio en formato YYYY-MM-DD
             end_date: Fecha fin en formato YYYY-MM-DD
@@ -28,32 +154,124 @@ class EnhancedDataProcessor:
             True si se cargaron datos exitosamente
         """
         try:
-            self.df = self.db_manager.get_all_data(start_date, end_date)
-            
-            if not self.df.empty:
-                # Aplicar filtros de exclusión y agrupación
-                self._apply_service_filters_and_grouping()
-                # Procesar fechas y columnas adicionales
-                self._process_temporal_columns()
-                self._cached_data = None  # Limpiar cache
-                return True
-            
-            return False
+            self.refresh_if_stale()
+            self._apply_date_range(start_date, end_date)
+            return not self.df.empty
             
         except Exception as e:
-            print(f"Error inicializando desde base de datos: {e}")
+            logging.error(f"Error inicializando desde base de datos: {e}")
             return False
     
+    def refresh_if_stale(self) -> bool:
+        """
+        Vuelve a leer el histórico si la versión de datos de la base cambió.
+        
+        Returns:
+            True si se recargaron los datos
+        """
+        if self._full_df is not None and self._loaded_version == self.db_manager.get_data_version():
+            return False
+        
+        with _load_lock:
+            # Otra sesión pudo recargar mientras se esperaba el candado
+            if self._full_df is not None and self._loaded_version == self.db_manager.get_data_version():
+                return False
+            self._load_full_dataset()
+        
+        self._apply_date_range(self.start_date, self.end_date)
+        return True
+    
+    def _load_full_dataset(self):
+        """Lee y procesa el histórico completo de la base de datos"""
+        # La versión se lee antes que los datos: una escritura concurrente
+        # deja la versión desfasada y provoca otra recarga, nunca datos viejos
+        version = self.db_manager.get_data_version()
+        self.df = self.db_manager.get_all_data()
+        
+        if not self.df.empty:
+            # Aplicar filtros de exclusión y agrupación
+            self._apply_service_filters_and_grouping()
+            # Procesar fechas y columnas adicionales
+            self._process_temporal_columns()
+            if self.compact:
+                self.df = self._compact_frame(self.df)
+            self._build_date_index()
+        
+        self._full_df = self.df
+        self._full_date_keys = self._date_keys if not self.df.empty else None
+        self._full_period_keys = self._compute_period_keys(self.df) if not self.df.empty else None
+        self._loaded_version = version
+        self._cached_data = None  # Limpiar cache
+    
+    def _apply_date_range(self, start_date: Optional[str], end_date: Optional[str]):
+        """
+        Deja en self.df el corte del histórico completo para el rango dado.
+        
+        Args:
+            start_date: Fecha inicio en formato YYYY-MM-DD
+            end_date: Fecha fin en formato YYYY-MM-DD
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        
+        if self._full_df is None or self._full_df.empty:
+            self.df = self._full_df
+            self._date_keys = None
+            self._indexed_df = None
+            self._period_keys = None
+        else:
+            first, last = self._date_bounds(self._full_date_keys, start_date, end_date)
+            self.df = self._full_df.iloc[first:last]
+            self._date_keys = self._full_date_keys[first:last]
+            self._indexed_df = self.df
+            self._period_keys = {grouping: keys[first:last]
+                                 for grouping, keys in self._full_period_keys.items()}
+        
+        self._period_df = self.df
+        self._period_masks = {}
+        self._loaded_df = self.df
+        self._cached_data = None
+    
+    def with_date_range(self, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None) -> 'EnhancedDataProcessor':
+        """
+        Crea una vista del procesador limitada a un rango de fechas.
+        
+        La vista comparte el histórico completo en memoria (no copia datos ni
+        consulta la base) y puede modificarse sin afectar al procesador original.
+        
+        Args:
+            start_date: Fecha inicio en formato YYYY-MM-DD
+            end_date: Fecha fin en formato YYYY-MM-DD
+            
+        Returns:
+            Nuevo procesador con self.df igual al corte del rango
+        """
+        view = copy.copy(self)
+        view._apply_date_range(start_date, end_date)
+        return view
+    
     def _apply_service_filters_and_grouping(self):
-        """Aplica filtros de exclusión y agrupación de servicios"""
+        """
+        Aplica filtros de exclusión y agrupación de servicios.
+        
+        Las reglas se evalúan una vez por nombre distinto (factorize) y el
+        resultado se propaga a las filas por código, en una sola pasada que
+        también descarta los servicios COMPULSA.
+        """
         if self.df is None or self.df.empty:
             return
-            
-        # Excluir servicios COMPULSA
-        self.df = self.df[~self.df['servicio'].str.contains('COMPULSA', case=False, na=False)]
         
-        # Aplicar agrupación de servicios
-        self.df['servicio'] = self.df['servicio'].apply(self._group_service_name)
+        codes, services = self.df['servicio'].factorize()
+        excluded = np.asarray(services.str.contains(EXCLUDED_SERVICE_PATTERN, case=False, regex=False), dtype=bool)
+        grouped = pd.Index([self._group_service_name(name) for name in services], dtype=services.dtype)
+        
+        # Los nulos tienen código -1: se conservan y take los deja como nulos
+        keep = ~np.append(excluded, False)[codes]
+        codes = codes[keep]
+        
+        self.df = self.df[keep]
+        self.df['servicio'] = grouped.array.take(codes, allow_fill=True)
     
     def _group_service_name(self, service_name: str) -> str:
         """Agrupa nombres de servicios según reglas definidas"""
@@ -79,15 +297,525 @@ class EnhancedDataProcessor:
             
         # Convertir fecha si es necesario
         if 'fecha_emision' in self.df.columns:
-            self.df['fecha_emision'] = pd.to_datetime(self.df['fecha_emision'])
+            self._add_temporal_columns(self.df)
+    
+    @staticmethod
+    def _add_temporal_columns(df: pd.DataFrame):
+        """Convierte fecha_emision a datetime y agrega año, mes, mes_año, dia_semana y trimestre"""
+        df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
+        df['año'] = df['fecha_emision'].dt.year
+        df['mes'] = df['fecha_emision'].dt.month
+        df['mes_año'] = df['fecha_emision'].dt.to_period('M')
+        df['dia_semana'] = df['fecha_emision'].dt.day_name()
+        df['trimestre'] = df['fecha_emision'].dt.quarter
+    
+    @staticmethod
+    def _compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduce la memoria del DataFrame cargado.
+        
+        Las columnas de texto pasan a categorías, los conteos a int32, año, mes
+        y trimestre a int16, costo_unitario a float32 solo si no cambia ningún
+        valor y mes_año a un entero AAAAMM.
+        
+        Args:
+            df: DataFrame procesado (con columnas temporales)
+            
+        Returns:
+            DataFrame con tipos compactos
+        """
+        columns = {}
+        
+        for column in CATEGORICAL_COLUMNS:
+            if column in df.columns:
+                columns[column] = df[column].astype('category')
+        
+        for dtype, names in ((np.int32, COUNT_COLUMNS), (np.int16, DATE_PART_COLUMNS)):
+            info = np.iinfo(dtype)
+            for column in names:
+                if column in df.columns and pd.api.types.is_integer_dtype(df[column]):
+                    values = df[column]
+                    if values.min() >= info.min and values.max() <= info.max:
+                        columns[column] = values.astype(dtype)
+        
+        for column in FLOAT32_COLUMNS:
+            if column in df.columns and pd.api.types.is_float_dtype(df[column]):
+                values = df[column]
+                reduced = values.astype(np.float32)
+                if reduced.astype(np.float64).equals(values):
+                    columns[column] = reduced
+        
+        if {'mes_año', 'año', 'mes'}.issubset(df.columns):
+            columns['mes_año'] = df['año'].astype(np.int32) * 100 + df['mes'].astype(np.int32)
+        
+        return df.assign(**columns)
+    
+    @staticmethod
+    def _restore_dtypes(result: pd.DataFrame) -> pd.DataFrame:
+        """
+        Devuelve un resultado agregado en modo compacto a los tipos públicos.
+        
+        Las categorías vuelven al tipo de sus valores, mes_año vuelve a Period
+        mensual, año y trimestre a int32 y las métricas a int64/float64, igual
+        que en el modo normal y en las consultas SQL.
+        
+        Args:
+            result: DataFrame agregado
+            
+        Returns:
+            El mismo DataFrame con las columnas convertidas
+        """
+        for column in result.columns:
+            dtype = result[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                result[column] = result[column].astype(dtype.categories.dtype)
+            elif column == 'mes_año' and pd.api.types.is_integer_dtype(dtype):
+                result[column] = pd.to_datetime(
+                    result[column].astype(str), format='%Y%m'
+                ).dt.to_period('M')
+            elif column in DATE_PART_COLUMNS and dtype == np.int16:
+                result[column] = result[column].astype(np.int32)
+            elif column not in DATE_PART_COLUMNS and dtype in (np.int16, np.int32):
+                result[column] = result[column].astype(np.int64)
+            elif dtype == np.float32:
+                result[column] = result[column].astype(np.float64)
+        
+        return result
+    
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """
+        Reporta la memoria del histórico cargado en el procesador.
+        
+        Returns:
+            Diccionario con filas, bytes totales, bytes por columna y modo
+        """
+        df = self._full_df if self._full_df is not None else self.df
+        
+        if df is None:
+            return {'compact': self.compact, 'rows': 0, 'total_bytes': 0, 'columns': {}}
+        
+        usage = df.memory_usage(deep=True, index=True)
+        return {
+            'compact': self.compact,
+            'rows': len(df),
+            'total_bytes': int(usage.sum()),
+            'columns': {column: int(size) for column, size in usage.items()}
+        }
+    
+    @staticmethod
+    def _normalize_cache_argument(name: str, value: Any) -> Tuple[bool, Any]:
+        """Normaliza un argumento para la clave de caché; (False, None) si no es memorizable"""
+        if isinstance(value, (datetime, date)):
+            return True, pd.Timestamp(value).strftime('%Y-%m-%d')
+        if isinstance(value, str) and 'date' in name:
+            return True, pd.Timestamp(value).strftime('%Y-%m-%d')
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return True, value
+        if isinstance(value, (list, tuple)) and all(
+                item is None or isinstance(item, (str, int, float, bool)) for item in value):
+            return True, tuple(value)
+        return False, None
+    
+    def _cache_key(self, method_name: str, signature: inspect.Signature,
+                   args: tuple, kwargs: dict) -> Optional[tuple]:
+        """
+        Construye la clave de caché de una llamada.
+        
+        Returns:
+            Tupla (ruta de BD, método, rango inicial, modo SQL, argumentos) o None
+            si la llamada no debe memorizarse (p. ej. recibe un DataFrame o
+            self.df fue reemplazado desde fuera del procesador)
+        """
+        scope = self.cache_scope()
+        if scope is None:
+            return None
+        
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = []
+        for name, value in list(bound.arguments.items())[1:]:
+            cacheable, normalized = self._normalize_cache_argument(name, value)
+            if not cacheable:
+                return None
+            arguments.append((name, normalized))
+        
+        namespace, version, initial_range = scope
+        result_cache.sync_version(namespace, version)
+        return (namespace, method_name, initial_range, self.use_sql_pushdown, tuple(arguments))
+    
+    def cache_scope(self) -> Optional[Tuple[str, int, tuple]]:
+        """
+        Identifica los datos de self.df para las cachés de resultados y de figuras.
+        
+        Returns:
+            Tupla (ruta de BD, versión de datos, rango inicial) o None si
+            self.df fue reemplazado desde fuera del procesador o la caché
+            está desactivada
+        """
+        if not self.use_result_cache or not self._uses_loaded_data():
+            return None
+        
+        initial_range = tuple(
+            self._normalize_cache_argument('date', d)[1] for d in (self.start_date, self.end_date)
+        )
+        return (os.path.abspath(self.db_manager.db_path), self.db_manager.get_data_version(), initial_range)
+    
+    def _uses_loaded_data(self) -> bool:
+        """
+        Indica si self.df es el corte que cargó el procesador.
+        
+        Las consultas a la base de datos (resumen diario y agregaciones SQL)
+        solo describen ese corte; si self.df se reemplazó desde fuera (p. ej.
+        filtrado por categoría) los resultados se calculan en pandas.
+        """
+        return self.df is not None and self.df is self._loaded_df
+    
+    @staticmethod
+    def period_key(fechas: pd.Series, grouping: str) -> pd.Series:
+        """
+        Calcula la clave de período de cada fecha sin modificar el DataFrame origen.
+        
+        Args:
+            fechas: Serie datetime (fecha_emision)
+            grouping: 'Diaria', 'Mensual' o 'Anual'
+            
+        Returns:
+            Serie llamada 'periodo' alineada con fechas
+        """
+        if grouping == 'Mensual':
+            key = fechas.dt.to_period('M').astype(str)
+        elif grouping == 'Anual':
+            key = fechas.dt.year
+        else:
+            key = fechas.dt.date
+        return key.rename('periodo')
+    
+    def aggregate_by_period(self, data: pd.DataFrame, grouping: str,
+                            columns: List[str]) -> pd.DataFrame:
+        """
+        Suma columnas por período ('Diaria', 'Mensual', 'Anual') sin agregar
+        columnas a data; admite las vistas de solo lectura de _get_filtered_data.
+        
+        Args:
+            data: DataFrame con fecha_emision (datetime)
+            grouping: 'Diaria', 'Mensual' o 'Anual'
+            columns: Columnas a sumar
+            
+        Returns:
+            DataFrame con 'periodo' y las columnas sumadas, ordenado por período
+        """
+        if data.empty:
+            return pd.DataFrame(columns=['periodo'] + columns)
+        
+        key = self.period_key(data['fecha_emision'], grouping)
+        return data.groupby(key)[columns].sum().reset_index()
+    
+    @staticmethod
+    def _compute_period_keys(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Calcula una vez las claves enteras de período de cada fila.
+        
+        Args:
+            df: DataFrame con fecha_emision (datetime)
+            
+        Returns:
+            Diccionario agrupación -> arreglo alineado con df: días desde
+            1970-01-01 (Diaria), meses desde 1970-01 (Mensual) y año (Anual)
+        """
+        days = df['fecha_emision'].to_numpy(dtype='datetime64[D]')
+        months = days.astype('datetime64[M]').astype(np.int32)
+        return {
+            'Diaria': days.astype(np.int32),
+            'Mensual': months,
+            'Anual': (months // 12 + 1970).astype(np.int32)
+        }
+    
+    @staticmethod
+    def _period_labels(keys: np.ndarray, grouping: str) -> np.ndarray:
+        """Etiquetas de las claves de período, iguales a las de period_key"""
+        if grouping == 'Mensual':
+            return keys.astype('datetime64[M]').astype(str)
+        if grouping == 'Anual':
+            return keys
+        return keys.astype('datetime64[D]').astype(object)
+    
+    def _text_mask(self, column: str, kind: str, value: str) -> np.ndarray:
+        """
+        Evalúa un filtro de texto sobre una columna de self.df; el resultado
+        se reutiliza en las demás agrupaciones mientras self.df no cambie.
+        
+        En modo compacto el filtro se evalúa una vez por categoría y se
+        propaga a las filas por código.
+        
+        Args:
+            column: 'categoria' o 'servicio'
+            kind: 'contains' (texto), 'equals' o 'pattern' (regex sin mayúsculas)
+            value: Texto o expresión del filtro
+        """
+        cached = self._period_masks.get((column, kind, value))
+        if cached is not None:
+            return cached
+        
+        def predicate(values):
+            if kind == 'equals':
+                return values == value
+            if kind == 'pattern':
+                return values.str.contains(value, case=False, regex=True, na=False)
+            return values.str.contains(value, regex=False, na=False)
+        
+        values = self.df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            matches = np.asarray(predicate(pd.Series(values.cat.categories)), dtype=bool)
+            # Los nulos tienen código -1 y no cumplen el filtro
+            mask = np.append(matches, False)[values.cat.codes.to_numpy()]
+        else:
+            mask = np.asarray(predicate(values), dtype=bool)
+        self._period_masks[(column, kind, value)] = mask
+        return mask
+    
+    @memoized
+    def get_period_series(self, grouping: str = 'Diaria',
+                          metrics: Tuple[str, ...] = ('ingresos_totales',),
+                          categoria_contains: Optional[str] = None,
+                          servicio: Optional[str] = None,
+                          servicio_pattern: Optional[str] = None) -> pd.DataFrame:
+        """
+        Serie temporal de métricas por período, para las gráficas de la página
+        de análisis.
+        
+        Usa las claves de período calculadas al cargar: agrupar es contar por
+        clave entera (bincount), sin convertir fechas ni copiar self.df.
+        
+        Args:
+            grouping: 'Diaria', 'Mensual' o 'Anual'
+            metrics: Columnas a sumar
+            categoria_contains: Texto que debe contener la categoría (con mayúsculas)
+            servicio: Nombre exacto del servicio
+            servicio_pattern: Expresión regular sobre el servicio (sin distinguir mayúsculas)
+            
+        Returns:
+            DataFrame con 'periodo' y las métricas sumadas, ordenado por período
+            (mismo resultado que aggregate_by_period sobre las filas filtradas)
+        """
+        metrics = list(metrics)
+        if self.df is None or self.df.empty:
+            return pd.DataFrame(columns=['periodo'] + metrics)
+        
+        if grouping not in PERIOD_GROUPINGS:
+            grouping = 'Diaria'
+        
+        # self.df pudo reemplazarse desde fuera del procesador
+        if self._period_df is not self.df:
+            self._period_keys = self._compute_period_keys(self.df)
+            self._period_df = self.df
+            self._period_masks = {}
+        keys = self._period_keys[grouping]
+        
+        mask = np.ones(len(self.df), dtype=bool)
+        if categoria_contains is not None:
+            mask &= self._text_mask('categoria', 'contains', categoria_contains)
+        if servicio is not None:
+            mask &= self._text_mask('servicio', 'equals', servicio)
+        if servicio_pattern is not None:
+            mask &= self._text_mask('servicio', 'pattern', servicio_pattern)
+        
+        if not mask.any():
+            return pd.DataFrame(columns=['periodo'] + metrics)
+        
+        filtered = not mask.all()
+        if filtered:
+            keys = keys[mask]
+        periods, positions = np.unique(keys, return_inverse=True)
+        
+        result = {'periodo': self._period_labels(periods, grouping)}
+        for metric in metrics:
+            values = self.df[metric].to_numpy()
+            if filtered:
+                values = values[mask]
+            if np.issubdtype(values.dtype, np.integer):
+                sums = np.bincount(positions, weights=values, minlength=len(periods))
+                result[metric] = np.rint(sums).astype(np.int64)
+            else:
+                values = np.nan_to_num(values.astype(np.float64))
+                result[metric] = np.bincount(positions, weights=values, minlength=len(periods))
+        
+        return pd.DataFrame(result)
+    
+    def _resolve_date_range(self, start_date: Optional[str],
+                            end_date: Optional[str]):
+        """
+        Intersecta el rango pedido con el de la última inicialización, igual que
+        filtrar self.df, para que las consultas SQL vean los mismos días.
+        """
+        starts = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in (start_date, self.start_date) if d]
+        ends = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in (end_date, self.end_date) if d]
+        return (max(starts) if starts else None), (min(ends) if ends else None)
+    
+    def _run_pushdown(self, group_by: List[str], metrics: Dict[str, str],
+                      start_date: Optional[str] = None,
+                      end_date: Optional[str] = None,
+                      **filters) -> Optional[pd.DataFrame]:
+        """
+        Ejecuta una agregación en SQL sobre el resumen diario.
+        
+        Args:
+            group_by: Dimensiones de agrupación
+            metrics: Alias de columna -> métrica
+            start_date, end_date: Filtros de fecha
+            **filters: categoria, order_by, limit
+            
+        Returns:
+            DataFrame agregado, o None si la consulta no se pudo resolver en SQL
+            o si self.df se reemplazó desde fuera (la base no lo describe)
+        """
+        if not self.use_sql_pushdown:
+            return None
+        
+        if self.df is None or self.df.empty:
+            return pd.DataFrame()
+        
+        if not self._uses_loaded_data():
+            return None
+        
+        start_date, end_date = self._resolve_date_range(start_date, end_date)
+        try:
+            return self.query_engine.aggregate(
+                group_by, metrics,
+                start_date=start_date,
+                end_date=end_date,
+                exclude_pattern=EXCLUDED_SERVICE_PATTERN,
+                **filters
+            )
+        except Exception as e:
+            logging.warning(f"Error en consulta SQL, usando pandas: {e}")
+            return None
+    
+    @memoized
+    def get_daily_rollup(self, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Obtiene el resumen diario por servicio agrupado y categoría desde la base de datos.
+        
+        Equivale a agrupar self.df por (fecha_emision, servicio, categoria), pero sin
+        cargar ni procesar los registros individuales.
+        
+        Args:
+            start_date: Fecha inicio (por defecto, la de la inicialización)
+            end_date: Fecha fin (por defecto, la de la inicialización)
+            
+        Returns:
+            DataFrame con fecha_emision (datetime), servicio, categoria, sumas y registros
+        """
+        if self.df is not None and not self._uses_loaded_data():
+            df = self._get_filtered_data(start_date, end_date)
+            if df.empty:
+                return pd.DataFrame(columns=['fecha_emision', 'servicio', 'categoria',
+                                             *ROLLUP_SUM_COLUMNS, 'registros'])
+            rollup = df.groupby(['fecha_emision', 'servicio', 'categoria'], observed=True, dropna=False).agg(
+                **{column: (column, 'sum') for column in ROLLUP_SUM_COLUMNS},
+                registros=('servicio', 'size')
+            ).reset_index()
+            return self._restore_dtypes(rollup)
+        
+        start_date, end_date = self._resolve_date_range(start_date, end_date)
+        rollup = self.db_manager.get_daily_rollup(start_date, end_date, EXCLUDED_SERVICE_PATTERN)
+        rollup['fecha_emision'] = pd.to_datetime(rollup['fecha_emision'])
+        return rollup
+    
+    @memoized
+    def get_daily_totals(self, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Obtiene los totales diarios (ingresos, trámites, cancelaciones, registros).
+        
+        Args:
+            start_date: Fecha inicio (por defecto, la de la inicialización)
+            end_date: Fecha fin (por defecto, la de la inicialización)
             
-            # Agregar columnas derivadas
-            self.df['año'] = self.df['fecha_emision'].dt.year
-            self.df['mes'] = self.df['fecha_emision'].dt.month
-            self.df['mes_año'] = self.df['fecha_emision'].dt.to_period('M')
-            self.df['dia_semana'] = self.df['fecha_emision'].dt.day_name()
-            self.df['trimestre'] = self.df['fecha_emision'].dt.quarter
+        Returns:
+            DataFrame con una fila por fecha, ordenado por fecha
+        """
+        if self.df is not None and not self._uses_loaded_data():
+            df = self._get_filtered_data(start_date, end_date)
+            if df.empty:
+                return pd.DataFrame(columns=['fecha_emision', *ROLLUP_SUM_COLUMNS,
+                                             'registros', 'servicios_unicos'])
+            totals = df.groupby('fecha_emision').agg(
+                **{column: (column, 'sum') for column in ROLLUP_SUM_COLUMNS},
+                registros=('servicio', 'size'),
+                servicios_unicos=('servicio', 'nunique')
+            ).reset_index()
+            return self._restore_dtypes(totals)
+        
+        start_date, end_date = self._resolve_date_range(start_date, end_date)
+        totals = self.db_manager.get_daily_totals(start_date, end_date, EXCLUDED_SERVICE_PATTERN)
+        totals['fecha_emision'] = pd.to_datetime(totals['fecha_emision'])
+        return totals
+
+    @memoized
+    def get_data_page(self, search: Optional[str] = None, sort_by: str = 'fecha_emision',
+                      descending: bool = True, page: int = 1, page_size: int = 50,
+                      categoria: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Obtiene una página de los registros del rango (servicios agrupados y sin
+        COMPULSA, como self.df), paginada, buscada y ordenada en SQL.
+
+        La consulta no ve los filtros aplicados reemplazando self.df: el filtro
+        de categoría del análisis se pasa en categoria.
+
+        Args:
+            search: Texto a buscar en servicio y categoría
+            sort_by: Columna por la que se ordena
+            descending: Orden descendente
+            page: Número de página, desde 1
+            page_size: Registros por página
+            categoria: Categoría exacta a mostrar (None = todas)
+
+        Returns:
+            Diccionario con data, total, page y pages (ver DatabaseManager.get_data_page)
+        """
+        start_date, end_date = self._resolve_date_range(None, None)
+        return self.db_manager.get_data_page(start_date, end_date, EXCLUDED_SERVICE_PATTERN,
+                                             categoria=categoria, search=search, sort_by=sort_by, descending=descending,
+                                             page=page, page_size=page_size)
+
+    @memoized
+    def get_kpis(self, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Calcula los KPIs principales desde el resumen diario.
+        
+        Args:
+            start_date: Fecha inicio (por defecto, la de la inicialización)
+            end_date: Fecha fin (por defecto, la de la inicialización)
+            
+        Returns:
+            Diccionario con totales y promedio/desviación estándar de ingresos diarios
+        """
+        daily = self.get_daily_totals(start_date, end_date)
+        
+        if daily.empty:
+            return {
+                'total_ingresos': 0.0,
+                'total_tramites': 0,
+                'total_canceladas': 0,
+                'total_registros': 0,
+                'dias_con_datos': 0,
+                'ingreso_diario_promedio': 0.0,
+                'ingreso_diario_std': 0.0
+            }
+        
+        return {
+            'total_ingresos': daily['ingresos_totales'].sum(),
+            'total_tramites': daily['num_tramites'].sum(),
+            'total_canceladas': daily['formas_canceladas'].sum(),
+            'total_registros': daily['registros'].sum(),
+            'dias_con_datos': len(daily),
+            'ingreso_diario_promedio': daily['ingresos_totales'].mean(),
+            'ingreso_diario_std': daily['ingresos_totales'].std() if len(daily) > 1 else 0.0
+        }
     
+    @memoized
     def get_summary_stats(self, filtered_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """
         Obtiene estadísticas resumen, con opción de usar datos filtrados.
@@ -100,6 +828,10 @@ class EnhancedDataProcessor:
         """
         df = filtered_data if filtered_data is not None else self.df
         
+        if df is not None and not df.empty and filtered_data is None and self._uses_loaded_data():
+            # Sin filtro explícito: responder desde el resumen diario
+            return self._get_summary_stats_from_rollup()
+        
         if df is None or df.empty:
             return {
                 'total_registros': 0,
@@ -139,25 +871,84 @@ class EnhancedDataProcessor:
         
         return stats
     
+    def _get_summary_stats_from_rollup(self) -> Dict[str, Any]:
+        """Estadísticas resumen del rango inicializado calculadas desde el resumen diario"""
+        rollup = self.get_daily_rollup()
+        ingresos_diarios = rollup.groupby('fecha_emision')['ingresos_totales'].sum()
+        
+        return {
+            'total_registros': int(rollup['registros'].sum()),
+            'fecha_inicio': rollup['fecha_emision'].min() if not rollup.empty else None,
+            'fecha_fin': rollup['fecha_emision'].max() if not rollup.empty else None,
+            'total_ingresos': rollup['ingresos_totales'].sum(),
+            'total_tramites': rollup['num_tramites'].sum(),
+            'categorias_unicas': rollup['categoria'].nunique(),
+            'servicios_unicos': rollup['servicio'].nunique(),
+            'archivos_origen': self.df['archivo_origen'].nunique() if 'archivo_origen' in self.df.columns else 0,
+            'ingreso_diario_promedio': ingresos_diarios.mean() if len(ingresos_diarios) > 0 else 0.0,
+            'ingreso_diario_std': ingresos_diarios.std() if len(ingresos_diarios) > 1 else 0.0
+        }
+    
+    @memoized
     def get_data_by_category(self, start_date: Optional[str] = None, 
                            end_date: Optional[str] = None) -> pd.DataFrame:
         """Agrupa datos por categoría con filtros opcionales de fecha"""
+        result = self._run_pushdown(
+            ['categoria'],
+            {
+                'ingresos_totales': 'ingresos_totales',
+                'num_tramites': 'num_tramites',
+                'formas_canceladas': 'formas_canceladas',
+                'registros': 'registros'
+            },
+            start_date, end_date
+        )
+        if result is not None:
+            return result
+        
+        return self._get_data_by_category_pandas(start_date, end_date)
+    
+    def _get_data_by_category_pandas(self, start_date: Optional[str] = None, 
+                                     end_date: Optional[str] = None) -> pd.DataFrame:
+        """Versión en pandas de get_data_by_category (respaldo)"""
         df = self._get_filtered_data(start_date, end_date)
         
         if df.empty:
             return pd.DataFrame()
         
-        return df.groupby('categoria').agg({
+        result = df.groupby('categoria', observed=True).agg({
             'ingresos_totales': 'sum',
             'num_tramites': 'sum',
             'formas_canceladas': 'sum',
             'id': 'count'  # Contar registros
         }).rename(columns={'id': 'registros'}).reset_index()
+        
+        return self._restore_dtypes(result)
     
+    @memoized
     def get_data_by_service(self, categoria: Optional[str] = None,
                           start_date: Optional[str] = None, 
                           end_date: Optional[str] = None) -> pd.DataFrame:
         """Agrupa datos por servicio con filtros opcionales"""
+        result = self._run_pushdown(
+            ['categoria', 'servicio'],
+            {
+                'ingresos_totales': 'ingresos_totales',
+                'num_tramites': 'num_tramites',
+                'registros': 'registros'
+            },
+            start_date, end_date,
+            categoria=categoria
+        )
+        if result is not None:
+            return result
+        
+        return self._get_data_by_service_pandas(categoria, start_date, end_date)
+    
+    def _get_data_by_service_pandas(self, categoria: Optional[str] = None,
+                                    start_date: Optional[str] = None, 
+                                    end_date: Optional[str] = None) -> pd.DataFrame:
+        """Versión en pandas de get_data_by_service (respaldo)"""
         df = self._get_filtered_data(start_date, end_date)
         
         if categoria:
@@ -166,57 +957,58 @@ class EnhancedDataProcessor:
         if df.empty:
             return pd.DataFrame()
         
-        return df.groupby(['categoria', 'servicio']).agg({
+        result = df.groupby(['categoria', 'servicio'], observed=True).agg({
             'ingresos_totales': 'sum',
             'num_tramites': 'sum',
             'id': 'count'
         }).rename(columns={'id': 'registros'}).reset_index()
+        
+        return self._restore_dtypes(result)
     
+    @memoized
     def get_temporal_data(self, group_by: str = 'mes',
                          start_date: Optional[str] = None, 
                          end_date: Optional[str] = None) -> pd.DataFrame:
         """
-        Obtiene datos agrupados temporalmente.
+        Obtiene datos agrupados temporalmente desde el resumen diario.
         
         Args:
             group_by: 'dia', 'mes', 'trimestre', 'año'
             start_date: Fecha inicio
             end_date: Fecha fin
         """
-        df = self._get_filtered_data(start_date, end_date)
-        
-        if df.empty:
+        if self.df is None or self.df.empty:
             return pd.DataFrame()
         
-        # Mapeo de agrupación temporal
-        group_mapping = {
-            'dia': 'fecha_emision',
-            'mes': 'mes_año',
-            'trimestre': 'trimestre',
-            'año': 'año'
-        }
-        
-        group_col = group_mapping.get(group_by, 'mes_año')
+        return self._aggregate_daily_by_period(self.get_daily_totals(start_date, end_date), group_by)
+    
+    def _aggregate_daily_by_period(self, daily: pd.DataFrame, group_by: str) -> pd.DataFrame:
+        """
+        Agrupa totales diarios del resumen por el período solicitado.
         
-        if group_col not in df.columns:
+        Args:
+            daily: DataFrame con fecha_emision y columnas de sumas por día
+            group_by: 'dia', 'mes', 'trimestre', 'año'
+            
+        Returns:
+            DataFrame ordenado por período con ingresos, trámites, cancelaciones y registros
+        """
+        if daily.empty:
             return pd.DataFrame()
         
-        result = df.groupby(group_col).agg({
+        daily = daily.copy()
+        self._add_temporal_columns(daily)
+        group_col = TEMPORAL_GROUP_COLUMNS.get(group_by, 'mes_año')
+        
+        # groupby ya ordena por la clave de período
+        return daily.groupby(group_col).agg({
             'ingresos_totales': 'sum',
             'num_tramites': 'sum',
-            'id': 'count'
-        }).rename(columns={'id': 'registros'}).reset_index()
-        
-        # Ordenar por fecha
-        if group_by == 'mes':
-            result = result.sort_values('mes_año')
-        elif group_by == 'año':
-            result = result.sort_values('año')
-        elif group_by == 'dia':
-            result = result.sort_values('fecha_emision')
-        
-        return result
+            'formas_canceladas': 'sum',
+            'registros': 'sum'
+        }).reset_index()
     
+    @memoized
     def get_comparative_analysis(self, compare_by: str = 'mes',
                                periods: int = 12) -> Dict[str, pd.DataFrame]:
         """
@@ -259,6 +1051,7 @@ class EnhancedDataProcessor:
             }
         }
     
+    @memoized
     def get_top_services(self, by: str = 'ingresos', top_n: int = 10,
                         start_date: Optional[str] = None, 
                         end_date: Optional[str] = None) -> pd.DataFrame:
@@ -270,11 +1063,6 @@ class EnhancedDataProcessor:
             top_n: Número de servicios a retornar
             start_date, end_date: Filtros de fecha
         """
-        df = self._get_filtered_data(start_date, end_date)
-        
-        if df.empty:
-            return pd.DataFrame()
-        
         # Mapeo de criterios
         criteria_mapping = {
             'ingresos': 'ingresos_totales',
@@ -283,13 +1071,40 @@ class EnhancedDataProcessor:
         
         sort_column = criteria_mapping.get(by, 'ingresos_totales')
         
-        services_data = df.groupby(['servicio', 'categoria']).agg({
+        # Los empates se resuelven por servicio y categoría, como nlargest
+        result = self._run_pushdown(
+            ['servicio', 'categoria'],
+            {
+                'ingresos_totales': 'ingresos_totales',
+                'num_tramites': 'num_tramites'
+            },
+            start_date, end_date,
+            order_by=[(sort_column, True), ('servicio', False), ('categoria', False)],
+            limit=top_n
+        )
+        if result is not None:
+            return result
+        
+        return self._get_top_services_pandas(sort_column, top_n, start_date, end_date)
+    
+    def _get_top_services_pandas(self, sort_column: str, top_n: int,
+                                 start_date: Optional[str] = None, 
+                                 end_date: Optional[str] = None) -> pd.DataFrame:
+        """Versión en pandas de get_top_services (respaldo)"""
+        df = self._get_filtered_data(start_date, end_date)
+        
+        if df.empty:
+            return pd.DataFrame()
+        
+        services_data = df.groupby(['servicio', 'categoria'], observed=True).agg({
             'ingresos_totales': 'sum',
             'num_tramites': 'sum'
         }).reset_index()
+        services_data = self._restore_dtypes(services_data)
         
-        return services_data.nlargest(top_n, sort_column)
+        return services_data.nlargest(top_n, sort_column).reset_index(drop=True)
     
+    @memoized
     def get_services_count_over_time(self, group_by: str = 'mes',
                                    start_date: Optional[str] = None, 
                                    end_date: Optional[str] = None) -> pd.DataFrame:
@@ -301,6 +1116,19 @@ class EnhancedDataProcessor:
             start_date: Fecha inicio
             end_date: Fecha fin
         """
+        group_col = TEMPORAL_GROUP_COLUMNS.get(group_by, 'mes_año')
+        result = self._run_pushdown(
+            [group_col], {'servicios_unicos': 'servicios_unicos'}, start_date, end_date
+        )
+        if result is not None:
+            return result
+        
+        return self._get_services_count_over_time_pandas(group_by, start_date, end_date)
+    
+    def _get_services_count_over_time_pandas(self, group_by: str = 'mes',
+                                             start_date: Optional[str] = None, 
+                                             end_date: Optional[str] = None) -> pd.DataFrame:
+        """Versión en pandas de get_services_count_over_time (respaldo)"""
         df = self._get_filtered_data(start_date, end_date)
         
         if df.empty:
@@ -322,6 +1150,7 @@ class EnhancedDataProcessor:
         # Contar servicios únicos por período
         result = df.groupby(group_col)['servicio'].nunique().reset_index()
         result.columns = [group_col, 'servicios_unicos']
+        result = self._restore_dtypes(result)
         
         # Ordenar por fecha
         if group_by == 'mes':
@@ -333,58 +1162,31 @@ class EnhancedDataProcessor:
         
         return result
     
+    @memoized
     def get_service_temporal_data(self, service_name: str, group_by: str = 'mes',
                                 start_date: Optional[str] = None, 
                                 end_date: Optional[str] = None) -> pd.DataFrame:
         """
-        Obtiene datos temporales para un servicio específico.
+        Obtiene datos temporales para un servicio específico desde el resumen diario.
         
         Args:
-            service_name: Nombre del servicio
+            service_name: Nombre del servicio (ya agrupado)
             group_by: 'dia', 'mes', 'trimestre', 'año'
             start_date: Fecha inicio
             end_date: Fecha fin
         """
-        df = self._get_filtered_data(start_date, end_date)
-        
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Filtrar por servicio específico
-        df_service = df[df['servicio'] == service_name]
-        
-        if df_service.empty:
+        if self.df is None or self.df.empty:
             return pd.DataFrame()
         
-        # Mapeo de agrupación temporal
-        group_mapping = {
-            'dia': 'fecha_emision',
-            'mes': 'mes_año',
-            'trimestre': 'trimestre',
-            'año': 'año'
-        }
-        
-        group_col = group_mapping.get(group_by, 'mes_año')
+        rollup = self.get_daily_rollup(start_date, end_date)
+        service_rollup = rollup[rollup['servicio'] == service_name]
         
-        if group_col not in df_service.columns:
+        if service_rollup.empty:
             return pd.DataFrame()
         
-        result = df_service.groupby(group_col).agg({
-            'ingresos_totales': 'sum',
-            'num_tramites': 'sum',
-            'id': 'count'
-        }).rename(columns={'id': 'registros'}).reset_index()
-        
-        # Ordenar por fecha
-        if group_by == 'mes':
-            result = result.sort_values('mes_año')
-        elif group_by == 'año':
-            result = result.sort_values('año')
-        elif group_by == 'dia':
-            result = result.sort_values('fecha_emision')
-        
-        return result
+        return self._aggregate_daily_by_period(service_rollup, group_by)
     
+    @memoized
     def get_period_timeline_data(self, metric: str, group_by: str = 'dia',
                                start_date: Optional[str] = None, 
                                end_date: Optional[str] = None) -> pd.DataFrame:
@@ -397,6 +1199,23 @@ class EnhancedDataProcessor:
             start_date: Fecha inicio
             end_date: Fecha fin
         """
+        group_col = TEMPORAL_GROUP_COLUMNS.get(group_by)
+        
+        if group_col is None:
+            return pd.DataFrame()
+        
+        result = self._run_pushdown([group_col], {'value': metric}, start_date, end_date)
+        if result is None:
+            return self._get_period_timeline_data_pandas(metric, group_by, start_date, end_date)
+        
+        if not result.empty:
+            self._add_date_label(result, group_by, group_col)
+        return result
+    
+    def _get_period_timeline_data_pandas(self, metric: str, group_by: str = 'dia',
+                                         start_date: Optional[str] = None, 
+                                         end_date: Optional[str] = None) -> pd.DataFrame:
+        """Versión en pandas de get_period_timeline_data (respaldo)"""
         df = self._get_filtered_data(start_date, end_date)
         
         if df.empty:
@@ -424,6 +1243,8 @@ class EnhancedDataProcessor:
             result = df.groupby(group_col)[metric].sum().reset_index()
             result.columns = [group_col, 'value']
         
+        result = self._restore_dtypes(result)
+        
         # Ordenar por fecha
         if group_by == 'mes':
             result = result.sort_values('mes_año')
@@ -432,42 +1253,44 @@ class EnhancedDataProcessor:
         elif group_by == 'dia':
             result = result.sort_values('fecha_emision')
         
-        # Convertir fechas para mejor visualización
+        self._add_date_label(result, group_by, group_col)
+        return result
+    
+    @staticmethod
+    def _add_date_label(result: pd.DataFrame, group_by: str, group_col: str):
+        """Agrega la etiqueta de fecha usada en las gráficas de línea temporal"""
         if group_by == 'dia':
             result['date_label'] = pd.to_datetime(result[group_col]).dt.strftime('%Y-%m-%d')
         elif group_by == 'mes':
             result['date_label'] = result[group_col].astype(str)
         else:
             result['date_label'] = result[group_col].astype(str)
-        
-        return result
     
+    @memoized
     def get_efficiency_metrics(self, start_date: Optional[str] = None, 
                              end_date: Optional[str] = None) -> Dict[str, Any]:
         """Calcula métricas de eficiencia y rendimiento (sin cancelaciones)"""
-        df = self._get_filtered_data(start_date, end_date)
+        if self.df is None or self.df.empty:
+            return {}
         
-        if df.empty:
+        rollup = self.get_daily_rollup(start_date, end_date)
+        
+        if rollup.empty:
             return {}
         
-        total_tramites = df['num_tramites'].sum()
-        total_ingresos = df['ingresos_totales'].sum()
+        total_tramites = rollup['num_tramites'].sum()
+        total_ingresos = rollup['ingresos_totales'].sum()
         
         # Evitar división por cero
         ingreso_promedio_por_tramite = total_ingresos / max(total_tramites, 1)
         
         # Calcular métricas de ingresos diarios
-        ingreso_diario_promedio = 0.0
-        ingreso_diario_std = 0.0
-        
-        if 'fecha_emision' in df.columns:
-            ingresos_diarios = df.groupby('fecha_emision')['ingresos_totales'].sum()
-            if len(ingresos_diarios) > 0:
-                ingreso_diario_promedio = ingresos_diarios.mean()
-                ingreso_diario_std = ingresos_diarios.std() if len(ingresos_diarios) > 1 else 0.0
+        ingresos_diarios = rollup.groupby('fecha_emision')['ingresos_totales'].sum()
+        ingreso_diario_promedio = ingresos_diarios.mean()
+        ingreso_diario_std = ingresos_diarios.std() if len(ingresos_diarios) > 1 else 0.0
         
         # Eficiencia por servicio
-        servicio_efficiency = df.groupby('servicio').agg({
+        servicio_efficiency = rollup.groupby('servicio').agg({
             'num_tramites': 'sum',
             'ingresos_totales': 'sum'
         })
@@ -488,21 +1311,74 @@ class EnhancedDataProcessor:
             'servicio_metrics': servicio_efficiency.to_dict('index')
         }
     
+    def _build_date_index(self):
+        """
+        Prepara el índice de fechas usado por _get_filtered_data.
+        
+        self.df se mantiene en orden descendente de fecha_emision (el orden de
+        get_all_data); las claves son las fechas negadas en nanosegundos, que
+        quedan en orden ascendente para usar searchsorted.
+        """
+        if not self.df['fecha_emision'].is_monotonic_decreasing:
+            self.df = self.df.sort_values('fecha_emision', ascending=False, kind='stable')
+        
+        fechas = self.df['fecha_emision'].to_numpy(dtype='datetime64[ns]')
+        self._date_keys = -fechas.astype(np.int64)
+        self._indexed_df = self.df
+    
     def _get_filtered_data(self, start_date: Optional[str] = None, 
                           end_date: Optional[str] = None) -> pd.DataFrame:
-        """Obtiene datos filtrados por fecha"""
+        """
+        Obtiene datos filtrados por fecha sin copiar self.df.
+        
+        El rango se localiza con searchsorted sobre las fechas ordenadas y se
+        devuelve un corte posicional de self.df. El resultado debe tratarse como
+        de solo lectura: para derivar columnas use métodos que no lo modifiquen
+        (por ejemplo aggregate_by_period).
+        
+        Args:
+            start_date: Fecha inicio
+            end_date: Fecha fin
+            
+        Returns:
+            Vista de self.df con las filas del rango
+        """
         if self.df is None or self.df.empty:
             return pd.DataFrame()
         
-        df = self.df.copy()
+        # self.df pudo reemplazarse desde fuera del procesador
+        if self._indexed_df is not self.df:
+            self._build_date_index()
         
-        if start_date:
-            df = df[df['fecha_emision'] >= start_date]
+        first, last = self._date_bounds(self._date_keys, start_date, end_date)
+        return self.df.iloc[first:last]
+    
+    @staticmethod
+    def _date_bounds(date_keys: np.ndarray, start_date: Optional[str],
+                     end_date: Optional[str]) -> Tuple[int, int]:
+        """
+        Localiza un rango de fechas en las claves de _build_date_index.
+        
+        Args:
+            date_keys: Fechas negadas en nanosegundos, en orden ascendente
+            start_date: Fecha inicio
+            end_date: Fecha fin
+            
+        Returns:
+            Tupla (primera, última) de posiciones para iloc
+        """
+        # Con fechas descendentes, el rango [start, end] empieza en la última
+        # fecha <= end y termina en la primera fecha < start
+        first = 0
+        last = len(date_keys)
         
         if end_date:
-            df = df[df['fecha_emision'] <= end_date]
+            first = int(np.searchsorted(date_keys, -pd.Timestamp(end_date).value, side='left'))
+        
+        if start_date:
+            last = int(np.searchsorted(date_keys, -pd.Timestamp(start_date).value, side='right'))
         
-        return df
+        return first, max(first, last)
     
     def filter_by_date(self, start_date: str, end_date: str) -> pd.DataFrame:
         """Filtra datos por rango de fechas (compatible con versión anterior)"""
@@ -523,8 +1399,10 @@ class EnhancedDataProcessor:
     
     def refresh_data(self):
         """Refresca los datos desde la base de datos"""
+        self._full_df = None
         self.initialize_from_database()
     
+    @memoized
     def get_file_sources(self) -> pd.DataFrame:
         """Obtiene información de archivos fuente en los datos actuales"""
         if self.df is None or self.df.empty:
@@ -533,7 +1411,7 @@ class EnhancedDataProcessor:
         if 'archivo_origen' not in self.df.columns:
             return pd.DataFrame()
         
-        file_stats = self.df.groupby('archivo_origen').agg({
+        file_stats = self.df.groupby('archivo_origen', observed=True).agg({
             'id': 'count',
             'ingresos_totales': 'sum',
             'num_tramites': 'sum',
@@ -544,7 +1422,7 @@ class EnhancedDataProcessor:
         file_stats.columns = ['archivo_origen', 'registros', 'ingresos_totales', 
                              'num_tramites', 'fecha_min', 'fecha_max']
         
-        return file_stats
+        return self._restore_dtypes(file_stats)
     
     def export_current_data(self, file_path: str, format: str = 'excel'):
         """
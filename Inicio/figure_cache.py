@@ -0,0 +1,128 @@
+"""
+Caché de figuras plotly ya construidas.
+
+Construir una figura (trazas, layout y su serialización a JSON) se repetía en
+cada rerun de Streamlit aunque el widget que cambió no tuviera relación con
+la gráfica. Las figuras se guardan como JSON con la gráfica, sus parámetros
+y el alcance de los datos (base de datos, versión de datos y filtros) como
+clave; al cambiar la versión de datos se descartan.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import plotly.graph_objects as go
+
+from result_cache import ResultCache
+
+# Límites por defecto de la caché compartida de figuras
+DEFAULT_MAX_FIGURES = 128
+DEFAULT_MAX_FIGURE_BYTES = 64 * 1024 * 1024   # 64 MB
+
+
+def _normalize_param(value: Any) -> Tuple[bool, Hashable]:
+    """Normaliza un parámetro para la clave; (False, None) si no se puede usar como clave"""
+    if isinstance(value, (list, tuple)):
+        items = [_normalize_param(item) for item in value]
+        if not all(ok for ok, _ in items):
+            return False, None
+        return True, tuple(item for _, item in items)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return True, value
+    return False, None
+
+
+class FigureCache:
+    """
+    Caché LRU de figuras serializadas, con límite de entradas y de bytes, y
+    tiempos de construcción por gráfica.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_FIGURES,
+                 max_bytes: int = DEFAULT_MAX_FIGURE_BYTES):
+        self._figures = ResultCache(max_entries, max_bytes)
+        self._lock = threading.Lock()
+        self.chart_stats: Dict[str, Dict[str, float]] = {}
+
+    def get_figure(self, chart: str, build: Callable[[], Optional[go.Figure]],
+                   scope: Optional[tuple], **params) -> Optional[go.Figure]:
+        """
+        Devuelve la figura de una gráfica desde la caché o la construye.
+
+        Args:
+            chart: Nombre de la gráfica
+            build: Función que construye la figura
+            scope: Tupla (base de datos, versión de datos, filtros) que
+                identifica los datos de la gráfica; None para no usar la caché
+            **params: Parámetros de la gráfica (agrupación, métrica, servicio...)
+
+        Returns:
+            Figura plotly, o None si build no generó una figura
+        """
+        key = self._key(chart, scope, params)
+        if key is not None:
+            found, payload = self._figures.get(key)
+            if found:
+                self._record(chart, hit=True)
+                # El JSON lo generó plotly desde una figura ya validada
+                return go.Figure(json.loads(payload), _validate=False)
+
+        start = time.perf_counter()
+        fig = build()
+        payload = fig.to_json() if key is not None and fig is not None else None
+        elapsed = time.perf_counter() - start
+        self._record(chart, hit=False, seconds=elapsed)
+        logging.info(f"Figura {chart}: construida en {elapsed * 1000:.1f} ms")
+
+        if payload is not None:
+            self._figures.put(key, payload)
+        return fig
+
+    def _key(self, chart: str, scope: Optional[tuple], params: Dict[str, Any]) -> Optional[tuple]:
+        if scope is None:
+            return None
+        namespace, version, filters = scope
+        normalized = []
+        for name, value in sorted(params.items()):
+            ok, value = _normalize_param(value)
+            if not ok:
+                return None
+            normalized.append((name, value))
+        self._figures.sync_version(namespace, version)
+        return (namespace, chart, filters, tuple(normalized))
+
+    def _record(self, chart: str, hit: bool, seconds: float = 0.0):
+        with self._lock:
+            stats = self.chart_stats.setdefault(chart, {'hits': 0, 'builds': 0, 'build_seconds': 0.0})
+            if hit:
+                stats['hits'] += 1
+            else:
+                stats['builds'] += 1
+                stats['build_seconds'] += seconds
+
+    def clear(self):
+        """Vacía la caché (las estadísticas se conservan)"""
+        self._figures.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de la caché y, por gráfica, aciertos, construcciones y
+        tiempo promedio de construcción en milisegundos.
+        """
+        with self._lock:
+            charts = {
+                chart: {
+                    'hits': stats['hits'],
+                    'builds': stats['builds'],
+                    'avg_build_ms': stats['build_seconds'] * 1000 / stats['builds'] if stats['builds'] else 0.0
+                }
+                for chart, stats in self.chart_stats.items()
+            }
+        return {**self._figures.get_stats(), 'charts': charts}
+
+
+# Instancia compartida por todo el proceso; sobrevive a los reruns de Streamlit
+figure_cache = FigureCache()
@@ -1,22 +1,135 @@
 import os
+import math
+import multiprocessing
+import shutil
 import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import islice
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
 import streamlit as st
 import logging
 from pathlib import Path
 from data_processor import MayoDataProcessor
 from database_manager import DatabaseManager
-from robust_data_processor import RobustDataProcessor
+from html_stream_parser import CHUNK_ROWS
+from parquet_cache import parquet_cache
+from robust_data_processor import RobustDataProcessor, file_content_hash
+
+# Filas por transacción al cargar un archivo; cada bloque confirmado queda
+# registrado en cargas_pendientes para poder reanudar
+INGEST_CHUNK_ROWS = CHUNK_ROWS
+
+# Carpeta, junto a la base de datos, con una copia de cada archivo cargado
+# (nombrada por su hash de contenido) para poder reconstruir la base
+SOURCE_ARCHIVE_DIRNAME = 'fuentes'
+
+# Firmas calculadas en este proceso por ruta: un archivo con el mismo tamaño y
+# fecha de modificación no se vuelve a leer en búsquedas posteriores
+_scanned_signatures: Dict[str, Dict[str, Any]] = {}
+
+def get_file_signature(file_path, stat_result: Optional[os.stat_result] = None,
+                       known_signature: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Obtiene tamaño, fecha de modificación y SHA-256 de un archivo.
+    
+    El hash solo se calcula si el archivo cambió desde la última búsqueda y no
+    coincide con la firma registrada al cargarlo.
+    
+    Args:
+        file_path: Ruta del archivo
+        stat_result: Resultado de os.stat si ya se obtuvo
+        known_signature: Firma registrada en archivos_cargados para el mismo nombre
+        
+    Returns:
+        Diccionario con tamaño_bytes, fecha_modificacion y hash_contenido
+    """
+    if stat_result is None:
+        stat_result = os.stat(file_path)
+    key = os.path.abspath(file_path)
+    
+    for candidate in (_scanned_signatures.get(key), known_signature):
+        if (candidate is not None
+                and candidate['tamaño_bytes'] == stat_result.st_size
+                and candidate['fecha_modificacion'] == stat_result.st_mtime):
+            signature = candidate
+            break
+    else:
+        signature = {
+            'tamaño_bytes': stat_result.st_size,
+            'fecha_modificacion': stat_result.st_mtime,
+            'hash_contenido': file_content_hash(file_path)
+        }
+    
+    _scanned_signatures[key] = signature
+    return dict(signature)
+
+def parse_file_for_load(file_path: str, content_hash: Optional[str] = None,
+                        chunk_rows: int = INGEST_CHUNK_ROWS, skip_chunks: int = 0
+                        ) -> Tuple[Optional[str], Optional[List[int]], Optional[List[pd.DataFrame]]]:
+    """
+    Valida, lee y limpia un archivo sin tocar la base de datos.
+
+    Se ejecuta en los procesos de la carga en lote en paralelo; el proceso
+    principal es el único que escribe. Los datos limpios quedan en
+    parquet_cache y solo se devuelven los límites de sus bloques, así el
+    proceso principal los lee de a uno (ver iter_loaded_chunks).
+
+    Args:
+        file_path: Ruta del archivo
+        content_hash: SHA-256 del contenido si ya se calculó
+        chunk_rows: Filas por bloque
+        skip_chunks: Bloques ya confirmados por una carga interrumpida
+
+    Returns:
+        Tupla (mensaje de error de validación o None, límites de los bloques en
+        parquet_cache o None, bloques limpios o None). Sin caché, los archivos
+        pequeños se devuelven en bloques y los que se leen por bloques no se
+        devuelven: el proceso principal los recorre
+    """
+    robust_processor = RobustDataProcessor(file_path, content_hash)
+    validation = robust_processor.validate_structure()
+    if not validation['is_valid']:
+        return validation['error_message'], None, None
+    chunk_offsets = robust_processor.cached_chunk_offsets(chunk_rows)
+    if chunk_offsets is not None or robust_processor.parse()['streamed']:
+        return None, chunk_offsets, None
+    return None, None, list(robust_processor.iter_clean_chunks(chunk_rows, skip_chunks))
+
+def iter_loaded_chunks(file_path: str, content_hash: str, chunk_offsets: Optional[List[int]],
+                       chunks: Optional[List[pd.DataFrame]], chunk_rows: int = INGEST_CHUNK_ROWS,
+                       skip_chunks: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Bloques limpios de un archivo leído con parse_file_for_load.
+
+    Args:
+        file_path: Ruta del archivo
+        content_hash: SHA-256 del contenido
+        chunk_offsets: Límites devueltos por parse_file_for_load
+        chunks: Bloques devueltos por parse_file_for_load
+        chunk_rows: Filas por bloque
+        skip_chunks: Bloques ya confirmados por una carga interrumpida
+
+    Returns:
+        Iterador de DataFrames limpios
+    """
+    if chunk_offsets is not None:
+        return parquet_cache.iter_frames(content_hash, chunk_offsets, skip_chunks)
+    if chunks is not None:
+        return iter(chunks)
+    # Archivo grande sin caché, ya validado: se vuelve a recorrer por bloques
+    return MayoDataProcessor(file_path).iter_clean_chunks(chunk_rows, skip_chunks)
 
 class FileManager:
     """
     Gestor de archivos para carga y validación de datos consulares.
     """
     
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_manager = DatabaseManager(db_path)
         self.supported_extensions = ['.xls', '.xlsx', '.html', '.htm']
+        self.archive_dir = Path(self.db_manager.db_path).resolve().parent / SOURCE_ARCHIVE_DIRNAME
         
     def get_available_files(self, directory: str = ".") -> List[Dict[str, Any]]:
         """
@@ -31,28 +144,53 @@ class FileManager:
         files_info = []
         
         try:
+            # Una sola consulta del historial por búsqueda
+            loaded = self.db_manager.get_loaded_files_index()
+            
             for file_path in Path(directory).rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in self.supported_extensions:
-                    file_info = {
-                        'nombre': file_path.name,
-                        'ruta_completa': str(file_path),
-                        'ruta_relativa': str(file_path.relative_to(Path(directory))),
-                        'tamaño': file_path.stat().st_size,
-                        'fecha_modificacion': datetime.fromtimestamp(file_path.stat().st_mtime),
-                        'extension': file_path.suffix.lower(),
-                        'ya_cargado': self._is_file_loaded(file_path.name)
-                    }
-                    files_info.append(file_info)
+                if file_path.suffix.lower() not in self.supported_extensions or not file_path.is_file():
+                    continue
+                
+                stat_result = file_path.stat()
+                signature = get_file_signature(file_path, stat_result,
+                                               loaded['signatures'].get(file_path.name))
+                
+                # Cargado con este nombre o, renombrado, con el mismo contenido
+                if file_path.name in loaded['names']:
+                    loaded_as = file_path.name
+                else:
+                    loaded_as = loaded['hashes'].get(signature['hash_contenido'])
+                
+                file_info = {
+                    'nombre': file_path.name,
+                    'ruta_completa': str(file_path),
+                    'ruta_relativa': str(file_path.relative_to(Path(directory))),
+                    'tamaño': stat_result.st_size,
+                    'fecha_modificacion': datetime.fromtimestamp(stat_result.st_mtime),
+                    'extension': file_path.suffix.lower(),
+                    'ya_cargado': loaded_as is not None,
+                    'cargado_como': loaded_as,
+                    'hash': signature['hash_contenido']
+                }
+                files_info.append(file_info)
                     
         except Exception as e:
             logging.error(f"Error buscando archivos: {e}")
             
         return sorted(files_info, key=lambda x: x['fecha_modificacion'], reverse=True)
     
-    def _is_file_loaded(self, filename: str) -> bool:
-        """Verifica si un archivo ya fue cargado en la base de datos"""
-        history = self.db_manager.get_files_history()
-        return filename in history['nombre_archivo'].values
+    def _is_file_loaded(self, filename: str, content_hash: Optional[str] = None) -> bool:
+        """Verifica si un archivo (por nombre o por contenido) ya fue cargado en la base de datos"""
+        return self.db_manager.find_loaded_file(filename, content_hash) is not None
+    
+    def _already_loaded_message(self, filename: str, signature: Dict[str, Any]) -> Optional[str]:
+        """Mensaje de rechazo si el archivo o su contenido ya fue cargado; None si no"""
+        loaded_as = self.db_manager.find_loaded_file(filename, signature['hash_contenido'])
+        if loaded_as is None:
+            return None
+        if loaded_as == filename:
+            return f'El archivo {filename} ya fue cargado. Use la opción de sobrescribir si desea actualizarlo.'
+        return f'El contenido de {filename} ya fue cargado como {loaded_as}. Use la opción de sobrescribir si desea actualizarlo.'
     
     def validate_file_structure(self, file_path: str) -> Dict[str, Any]:
         """
@@ -70,7 +208,8 @@ class FileManager:
             'warnings': [],
             'preview_data': None,
             'columns_found': [],
-            'rows_count': 0
+            'rows_count': 0,
+            'engine': None
         }
         
         try:
@@ -85,6 +224,7 @@ class FileManager:
             result['preview_data'] = validation_result.get('preview_data', None)
             result['columns_found'] = validation_result.get('columns_found', [])
             result['rows_count'] = validation_result.get('rows_count', 0)
+            result['engine'] = validation_result.get('engine')
             
         except Exception as e:
             result['error_message'] = f'Error al validar archivo: {str(e)}'
@@ -92,13 +232,19 @@ class FileManager:
         return result
     
     def load_file_to_database(self, file_path: str, 
-                             overwrite_duplicates: bool = False) -> Dict[str, Any]:
+                             overwrite_duplicates: bool = False,
+                             progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
         Carga un archivo validado a la base de datos.
         
+        La carga se confirma por bloques de INGEST_CHUNK_ROWS filas; si se
+        interrumpe, volver a cargar el mismo contenido continúa desde el último
+        bloque confirmado.
+        
         Args:
             file_path: Ruta del archivo a cargar
             overwrite_duplicates: Si True, sobrescribe duplicados existentes
+            progress_callback: Función (bloques confirmados, bloques totales)
             
         Returns:
             Diccionario con resultado de la carga
@@ -111,8 +257,20 @@ class FileManager:
         }
         
         try:
-            # Usar el procesador robusto
-            robust_processor = RobustDataProcessor(file_path)
+            filename = Path(file_path).name
+            signature = get_file_signature(file_path)
+            
+            # Si el archivo (o una copia renombrada) ya está en la base de datos
+            # y no queremos sobrescribir, no hace falta leerlo
+            if not overwrite_duplicates:
+                already_loaded = self._already_loaded_message(filename, signature)
+                if already_loaded:
+                    result['message'] = already_loaded
+                    return result
+            
+            # Usar el procesador robusto; validación y carga comparten una
+            # sola lectura del archivo
+            robust_processor = RobustDataProcessor(file_path, signature['hash_contenido'])
             
             # Validar archivo primero
             validation = robust_processor.validate_structure()
@@ -120,31 +278,24 @@ class FileManager:
                 result['message'] = f'Archivo no válido: {validation["error_message"]}'
                 return result
             
-            # Cargar y limpiar datos en una operación
-            df = robust_processor.load_and_clean_data()
+            # Datos limpios del mismo artefacto de la validación; los reportes
+            # grandes se vuelven a leer por bloques y se insertan a medida que
+            # se limpian, sin tener el archivo completo en memoria. Una carga
+            # interrumpida salta los bloques ya confirmados.
+            checkpoint = self._ingest_checkpoint(signature, overwrite_duplicates)
+            chunks = robust_processor.iter_clean_chunks(checkpoint['filas_por_bloque'],
+                                                        checkpoint['ultimo_bloque'] + 1)
             
-            if df is None or df.empty:
-                result['message'] = 'No se pudieron procesar los datos del archivo'
-                return result
-            
-            # Si hay duplicados en base de datos y no queremos sobrescribir
-            if not overwrite_duplicates:
-                filename = Path(file_path).name
-                if self._is_file_loaded(filename):
-                    result['message'] = f'El archivo {filename} ya fue cargado. Use la opción de sobrescribir si desea actualizarlo.'
-                    return result
+            report = None
+            if progress_callback is not None:
+                total_chunks = max(1, math.ceil(validation['rows_count'] / checkpoint['filas_por_bloque']))
+                report = lambda done: progress_callback(min(done, total_chunks), total_chunks)
             
             # Cargar a base de datos
-            filename = Path(file_path).name
-            stats = self.db_manager.insert_data_from_dataframe(df, filename)
-            
-            result['success'] = True
-            result['stats'] = stats
-            result['message'] = f'''Archivo cargado exitosamente:
-                - {stats['inserted']} registros insertados
-                - {stats['duplicates']} registros duplicados omitidos
-                - {stats['errors']} errores
-                - {stats['total_processed']} registros procesados'''
+            result.update(self._write_chunks(chunks, filename, overwrite_duplicates, signature,
+                                             checkpoint, report))
+            if result['success']:
+                self._archive_source(file_path, signature)
             
         except Exception as e:
             result['message'] = f'Error al cargar archivo: {str(e)}'
@@ -153,14 +304,129 @@ class FileManager:
             
         return result
     
+    def _archive_source(self, file_path: str, signature: Dict[str, Any]):
+        """
+        Guarda una copia del archivo cargado en archive_dir, una por contenido.
+        
+        Si la copia falla la carga no se revierte; solo se registra el error
+        (reconstruir la base usará entonces la caché Parquet, si existe).
+        """
+        if self.find_archived_source(signature['hash_contenido']) is not None:
+            return
+        archived = self.archive_dir / f"{signature['hash_contenido']}{Path(file_path).suffix.lower() or '.xls'}"
+        temp_path = archived.with_name(f'{archived.name}.{os.getpid()}.tmp')
+        try:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, temp_path)
+            os.replace(temp_path, archived)
+        except OSError as e:
+            logging.warning(f"No se pudo archivar {file_path}: {e}")
+            temp_path.unlink(missing_ok=True)
+    
+    def find_archived_source(self, content_hash: Optional[str]) -> Optional[Path]:
+        """
+        Busca la copia archivada de un contenido.
+        
+        Args:
+            content_hash: SHA-256 del contenido
+            
+        Returns:
+            Ruta de la copia, o None si no se archivó
+        """
+        if not content_hash or not self.archive_dir.is_dir():
+            return None
+        return next((path for path in self.archive_dir.glob(f'{content_hash}.*')
+                     if path.suffix != '.tmp'), None)
+    
+    def _ingest_checkpoint(self, signature: Dict[str, Any], overwrite_duplicates: bool) -> Dict[str, Any]:
+        """Punto de control de una carga interrumpida del mismo contenido, o uno nuevo"""
+        mode = 'upsert' if overwrite_duplicates else 'insert'
+        checkpoint = self.db_manager.get_ingest_checkpoint(signature['hash_contenido'], mode)
+        if checkpoint is None:
+            checkpoint = {'filas_por_bloque': INGEST_CHUNK_ROWS, 'ultimo_bloque': -1, 'stats': {}}
+        return checkpoint
+    
+    def _write_chunks(self, chunks, filename: str, overwrite_duplicates: bool,
+                      signature: Optional[Dict[str, Any]] = None,
+                      checkpoint: Optional[Dict[str, Any]] = None,
+                      progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Inserta los bloques limpios de un archivo, confirmando cada uno.
+        
+        Args:
+            chunks: Iterable de DataFrames limpios
+            filename: Nombre con el que se registra el archivo
+            overwrite_duplicates: Si True, sobrescribe duplicados existentes
+            signature: Firma del archivo para archivos_cargados
+            checkpoint: Punto de control de _ingest_checkpoint
+            progress_callback: Función llamada con los bloques confirmados
+            
+        Returns:
+            Diccionario con success, stats y message
+        """
+        resumed_from = None
+        if checkpoint is not None and checkpoint['ultimo_bloque'] >= 0:
+            resumed_from = checkpoint['ultimo_bloque'] + 1
+            # Los registros ya confirmados llevan el nombre de la carga original
+            filename = checkpoint.get('nombre_archivo', filename)
+        
+        if overwrite_duplicates:
+            # Fusión con staging: actualiza los registros existentes que cambiaron
+            stats = self.db_manager.upsert_data_from_chunks(chunks, filename, signature,
+                                                            checkpoint, progress_callback)
+            message = f'''Archivo cargado exitosamente (sobrescribir):
+                - {stats['inserted']} registros insertados
+                - {stats['updated']} registros actualizados
+                - {stats['unchanged']} registros sin cambios
+                - {stats['duplicates']} registros duplicados dentro del archivo
+                - {stats['errors']} errores
+                - {stats['total_processed']} registros procesados'''
+        else:
+            stats = self.db_manager.insert_data_from_chunks(chunks, filename, signature,
+                                                            checkpoint, progress_callback)
+            message = f'''Archivo cargado exitosamente:
+                - {stats['inserted']} registros insertados
+                - {stats['duplicates']} registros duplicados omitidos
+                - {stats['errors']} errores
+                - {stats['total_processed']} registros procesados'''
+        
+        if 'interrupted_at' in stats:
+            return {
+                'success': False,
+                'stats': stats,
+                'message': f'''Carga interrumpida en el bloque {stats['interrupted_at'] + 1}:
+                - {stats['inserted']} registros confirmados
+                - Vuelva a cargar el archivo para continuar desde ese bloque'''
+            }
+        
+        if resumed_from is not None:
+            message += f'''
+                - Carga reanudada desde el bloque {resumed_from + 1}'''
+        
+        return {'success': True, 'stats': stats, 'message': message}
+    
     def batch_load_files(self, file_paths: List[str], 
-                        overwrite_duplicates: bool = False) -> Dict[str, Any]:
+                        overwrite_duplicates: bool = False,
+                        max_workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
         """
         Carga múltiples archivos en lote.
         
+        Con más de un proceso, los archivos se leen y limpian en paralelo y el
+        proceso actual escribe cada uno, en el orden recibido, confirmando
+        por bloques; el resultado es el mismo que cargarlos uno tras otro. Los
+        procesos dejan los datos limpios en la caché Parquet y este proceso
+        los lee bloque por bloque al escribirlos. A lo sumo max_workers
+        archivos se leen a la vez: el siguiente se envía al empezar a
+        escribir uno.
+        
         Args:
             file_paths: Lista de rutas de archivos
             overwrite_duplicates: Si True, sobrescribe duplicados existentes
+            max_workers: Procesos de lectura (por defecto uno por núcleo);
+                con 1 los archivos se procesan en secuencia
+            progress_callback: Función (archivos terminados, total, nombre)
+                llamada al terminar cada archivo
             
         Returns:
             Diccionario con resultados de la carga en lote
@@ -170,6 +436,7 @@ class FileManager:
             'failed_files': [],
             'total_stats': {
                 'inserted': 0,
+                'updated': 0,
                 'duplicates': 0,
                 'errors': 0,
                 'total_processed': 0
@@ -177,9 +444,18 @@ class FileManager:
             'summary_message': ''
         }
         
-        for file_path in file_paths:
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(file_paths))
+        
+        if max_workers > 1:
+            load_results = self._parallel_load(file_paths, overwrite_duplicates, max_workers)
+        else:
+            load_results = (self.load_file_to_database(file_path, overwrite_duplicates)
+                            for file_path in file_paths)
+        
+        for done, (file_path, load_result) in enumerate(zip(file_paths, load_results), start=1):
             filename = Path(file_path).name
-            load_result = self.load_file_to_database(file_path, overwrite_duplicates)
             
             if load_result['success']:
                 results['successful_files'].append({
@@ -196,6 +472,9 @@ class FileManager:
                     'filename': filename,
                     'error': load_result['message']
                 })
+            
+            if progress_callback is not None:
+                progress_callback(done, len(file_paths), filename)
         
         # Crear mensaje resumen
         successful_count = len(results['successful_files'])
@@ -209,6 +488,83 @@ class FileManager:
         
         return results
     
+    def _parallel_load(self, file_paths: List[str], overwrite_duplicates: bool,
+                       max_workers: int):
+        """
+        Lee y limpia los archivos en un pool de procesos y los escribe aquí.
+        
+        Los procesos se crean con 'spawn' para no heredar los hilos de
+        Streamlit ni las conexiones SQLite abiertas.
+        
+        Returns:
+            Generador con el resultado de cada archivo, en el orden de file_paths
+        """
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            def submit(file_path: str):
+                # Firma antes de leer: los archivos ya cargados se rechazan sin leerlos
+                try:
+                    signature = get_file_signature(file_path)
+                    rejected = None if overwrite_duplicates else self._already_loaded_message(
+                        Path(file_path).name, signature)
+                except OSError as e:
+                    signature, rejected = None, f'Error al cargar archivo: {str(e)}'
+                checkpoint = future = None
+                if not rejected:
+                    checkpoint = self._ingest_checkpoint(signature, overwrite_duplicates)
+                    future = executor.submit(parse_file_for_load, file_path, signature['hash_contenido'],
+                                             checkpoint['filas_por_bloque'], checkpoint['ultimo_bloque'] + 1)
+                return signature, checkpoint, rejected, future
+            
+            # Ventana de max_workers archivos en vuelo, en el orden de file_paths
+            upcoming = iter(file_paths)
+            pending = deque(submit(file_path) for file_path in islice(upcoming, max_workers))
+            
+            for file_path in file_paths:
+                filename = Path(file_path).name
+                signature, checkpoint, rejected, future = pending.popleft()
+                next_path = next(upcoming, None)
+                if next_path is not None:
+                    pending.append(submit(next_path))
+                result = {
+                    'success': False,
+                    'message': '',
+                    'stats': {},
+                    'error_details': None
+                }
+                
+                try:
+                    # Se vuelve a comprobar: el mismo contenido puede repetirse en el lote
+                    if rejected is None and not overwrite_duplicates:
+                        rejected = self._already_loaded_message(filename, signature)
+                    if rejected:
+                        if future is not None:
+                            future.cancel()
+                        result['message'] = rejected
+                        yield result
+                        continue
+                    
+                    error_message, chunk_offsets, chunks = future.result()
+                    if error_message is not None:
+                        result['message'] = f'Archivo no válido: {error_message}'
+                    else:
+                        chunks = iter_loaded_chunks(file_path, signature['hash_contenido'], chunk_offsets,
+                                                    chunks, checkpoint['filas_por_bloque'],
+                                                    checkpoint['ultimo_bloque'] + 1)
+                        result.update(self._write_chunks(chunks, filename, overwrite_duplicates,
+                                                         signature, checkpoint))
+                        if result['success']:
+                            self._archive_source(file_path, signature)
+                        
+                except Exception as e:
+                    result['message'] = f'Error al cargar archivo: {str(e)}'
+                    result['error_details'] = str(e)
+                    logging.error(f"Error cargando archivo {file_path}: {e}")
+                
+                # Soltar las referencias para liberar los bloques ya escritos
+                future = chunks = None
+                yield result
+    
     def get_database_summary(self) -> Dict[str, Any]:
         """Obtiene resumen del estado actual de la base de datos"""
         return {
@@ -5,6 +5,7 @@ import os
 from pathlib import Path
 import time
 from file_manager import FileManager
+from database_rebuild import rebuild_database
 
 def show_file_upload_page():
     """Página principal para gestión de archivos"""
@@ -115,6 +116,8 @@ def show_file_search_tab(file_manager):
                     status_text = "[CARGADO]" if file_info['ya_cargado'] else "[PENDIENTE]"
                     st.write(f"{status_text} **{file_info['nombre']}**")
                     st.caption(file_info['ruta_relativa'])
+                    if file_info.get('cargado_como') not in (None, file_info['nombre']):
+                        st.caption(f"Mismo contenido que {file_info['cargado_como']}")
                 
                 with col3:
                     st.write(f"{tamaño_mb:.2f} MB")
@@ -184,6 +187,9 @@ def show_file_upload_tab(file_manager):
                 with col2:
                     st.metric("Columnas encontradas", len(validation['columns_found']))
                 
+                if validation.get('engine'):
+                    st.caption(f"Lector utilizado: {validation['engine']}")
+                
                 # Mostrar advertencias
                 if validation['warnings']:
                     st.warning("Advertencias:")
@@ -204,8 +210,15 @@ def show_file_upload_tab(file_manager):
                 
                 with col2:
                     if st.button("💾 Cargar a Base de Datos", type="primary"):
+                        progress_bar = st.progress(0)
+                        
+                        def report_progress(done, total):
+                            progress_bar.progress(done / total)
+                        
                         with st.spinner("Cargando datos a la base de datos..."):
-                            result = file_manager.load_file_to_database(temp_path, overwrite_duplicates)
+                            result = file_manager.load_file_to_database(temp_path, overwrite_duplicates,
+                                                                        progress_callback=report_progress)
+                        progress_bar.empty()
                         
                         if result['success']:
                             st.success(result['message'])
@@ -309,6 +322,35 @@ def show_admin_tab(file_manager):
         except Exception as e:
             st.error(f"Error creando backup: {str(e)}")
     
+    # Reconstrucción completa desde los archivos cargados
+    st.markdown("<h3 style='text-align: center;'>Reconstruir Base de Datos</h3>", unsafe_allow_html=True)
+    st.caption("Vuelve a leer todos los archivos cargados con la limpieza actual y reemplaza la base "
+               "(deshace modificaciones como la agrupación permanente)")
+    skip_missing = st.checkbox("Omitir archivos sin fuente disponible")
+    if st.button("🔄 Reconstruir Base de Datos"):
+        progress_bar = st.progress(0)
+        
+        def report_progress(done, total, filename):
+            progress_bar.progress(done / total, text=f"{filename} ({done}/{total})")
+        
+        try:
+            with st.spinner("Reconstruyendo base de datos..."):
+                result = rebuild_database(file_manager.db_manager.db_path, skip_missing=skip_missing,
+                                          progress_callback=report_progress)
+            progress_bar.empty()
+            
+            if result['success']:
+                st.success(result['message'])
+            else:
+                st.error(result['message'])
+            if result['timings']:
+                st.dataframe(pd.DataFrame({
+                    'Fase': list(result['timings']),
+                    'Segundos': [round(seconds, 2) for seconds in result['timings'].values()]
+                }), hide_index=True)
+        except Exception as e:
+            st.error(f"Error reconstruyendo la base de datos: {str(e)}")
+    
     # Exportar datos
     st.markdown("<h3 style='text-align: center;'>Exportar Datos</h3>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
@@ -365,6 +407,9 @@ def show_file_preview(file_manager, file_path):
             with col2:
                 st.metric("Columnas", len(validation['columns_found']))
             
+            if validation.get('engine'):
+                st.caption(f"Lector utilizado: {validation['engine']}")
+            
             # Preview de datos
             if validation['preview_data'] is not None:
                 st.dataframe(validation['preview_data'])
@@ -382,8 +427,13 @@ def load_selected_files(file_manager, selected_files, overwrite):
     progress_bar = st.progress(0)
     status_text = st.empty()
     
+    def report_progress(done, total, filename):
+        progress_bar.progress(done / total)
+        status_text.text(f"Cargado ({done}/{total}): {filename}")
+    
     with st.spinner("Cargando archivos seleccionados..."):
-        result = file_manager.batch_load_files(file_paths, overwrite)
+        result = file_manager.batch_load_files(file_paths, overwrite,
+                                               progress_callback=report_progress)
     
     progress_bar.progress(1.0)
     status_text.text("¡Carga completada!")
@@ -580,49 +630,43 @@ def load_all_uploaded_files(file_manager, uploaded_files, overwrite_duplicates):
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    successful_files = []
-    failed_files = []
-    total_stats = {'inserted': 0, 'duplicates': 0, 'errors': 0, 'total_processed': 0}
+    # Guardar todos los archivos y cargarlos en lote: se leen en paralelo
+    # y se escriben uno por uno en el orden recibido
+    temp_paths = [f"temp_load_{uploaded_file.name}" for uploaded_file in uploaded_files]
+    display_names = dict(zip(temp_paths, (uploaded_file.name for uploaded_file in uploaded_files)))
     
-    for idx, uploaded_file in enumerate(uploaded_files):
-        # Actualizar progreso
-        progress = (idx + 1) / len(uploaded_files)
-        progress_bar.progress(progress)
-        status_text.text(f"Procesando: {uploaded_file.name}")
-        
-        temp_path = f"temp_load_{uploaded_file.name}"
-        
-        try:
-            # Guardar temporalmente
+    def report_progress(done, total, filename):
+        progress_bar.progress(done / total)
+        status_text.text(f"Cargado ({done}/{total}): {display_names.get(filename, filename)}")
+    
+    try:
+        for uploaded_file, temp_path in zip(uploaded_files, temp_paths):
             with open(temp_path, "wb") as f:
                 f.write(uploaded_file.getbuffer())
-            
-            # Cargar archivo
-            result = file_manager.load_file_to_database(temp_path, overwrite_duplicates)
-            
-            if result['success']:
-                successful_files.append({
-                    'filename': uploaded_file.name,
-                    'stats': result['stats']
-                })
-                
-                # Acumular estadísticas
-                for key in total_stats:
-                    total_stats[key] += result['stats'].get(key, 0)
-            else:
-                failed_files.append({
-                    'filename': uploaded_file.name,
-                    'error': result['message']
-                })
         
-        except Exception as e:
-            failed_files.append({
-                'filename': uploaded_file.name,
-                'error': f"Error procesando archivo: {str(e)}"
-            })
+        status_text.text(f"Procesando {len(temp_paths)} archivos...")
+        batch_result = file_manager.batch_load_files(temp_paths, overwrite_duplicates,
+                                                     progress_callback=report_progress)
         
-        finally:
-            # Limpiar archivo temporal
+        successful_files = [
+            {**file_result, 'filename': display_names.get(file_result['filename'], file_result['filename'])}
+            for file_result in batch_result['successful_files']
+        ]
+        failed_files = [
+            {**file_result, 'filename': display_names.get(file_result['filename'], file_result['filename'])}
+            for file_result in batch_result['failed_files']
+        ]
+        total_stats = batch_result['total_stats']
+    
+    except Exception as e:
+        successful_files = []
+        failed_files = [{'filename': uploaded_file.name, 'error': f"Error procesando archivo: {str(e)}"}
+                        for uploaded_file in uploaded_files]
+        total_stats = {'inserted': 0, 'updated': 0, 'duplicates': 0, 'errors': 0, 'total_processed': 0}
+    
+    finally:
+        # Limpiar archivos temporales
+        for temp_path in temp_paths:
             if os.path.exists(temp_path):
                 os.remove(temp_path)
     
@@ -636,6 +680,7 @@ def load_all_uploaded_files(file_manager, uploaded_files, overwrite_duplicates):
         - {len(successful_files)} archivos cargados exitosamente
         - {len(failed_files)} archivos fallaron
         - {total_stats['inserted']:,} registros insertados
+        - {total_stats['updated']:,} registros actualizados
         - {total_stats['duplicates']:,} duplicados omitidos
         """)
         
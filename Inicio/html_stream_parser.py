@@ -0,0 +1,148 @@
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional
+from lxml import etree
+
+# Filas por bloque emitido al pipeline de limpieza e inserción
+CHUNK_ROWS = 50_000
+
+CELL_TAGS = ('td', 'th')
+
+# Números con ',' como separador de miles (1,234.50); otras comas, como en
+# listas de folios, no se eliminan
+THOUSANDS_PATTERN = r'[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?'
+
+
+def _cell_text(cell) -> str:
+    """Texto visible de una celda con los espacios colapsados, como read_html"""
+    return ' '.join(''.join(cell.itertext()).split())
+
+
+def iter_html_table_rows(file_path: str) -> Iterator[List[str]]:
+    """
+    Recorre las filas de la primera tabla de un documento HTML sin construir
+    el árbol completo.
+
+    Cada fila procesada se libera junto con sus hermanas anteriores, así que la
+    memoria no crece con el tamaño del archivo. Las filas de tablas anidadas se
+    ignoran.
+
+    Args:
+        file_path: Ruta del archivo HTML
+
+    Returns:
+        Iterador de tuplas (is_header, textos de las celdas de la fila)
+    """
+    table = None
+
+    with open(file_path, 'rb') as f:
+        for event, elem in etree.iterparse(f, events=('start', 'end'), html=True,
+                                           tag=('table', 'tr')):
+            if elem.tag == 'table':
+                if event == 'start' and table is None:
+                    table = elem
+                elif event == 'end' and elem is table:
+                    return
+                continue
+
+            if event != 'end' or table is None:
+                continue
+
+            if next(elem.iterancestors('table'), None) is not table:
+                continue
+
+            cells = [cell for cell in elem if cell.tag in CELL_TAGS]
+            is_header = bool(cells) and all(cell.tag == 'th' for cell in cells)
+            yield is_header, [_cell_text(cell) for cell in cells]
+
+            # Liberar la fila y las ya procesadas
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
+def _to_numeric(values: pd.Series) -> pd.Series:
+    """Convierte textos a número; lo que no es numérico queda nulo"""
+    grouped = values.str.fullmatch(THOUSANDS_PATTERN).fillna(False).astype(bool)
+    if grouped.any():
+        values = values.where(~grouped, values.str.replace(',', '', regex=False))
+    return pd.to_numeric(values, errors='coerce')
+
+
+def _rows_to_frame(rows: List[List[str]], columns: List,
+                   numeric_columns: Dict[Any, bool]) -> pd.DataFrame:
+    """
+    Convierte filas de texto en un DataFrame con los tipos que infiere read_html.
+
+    Las celdas vacías quedan como nulos. El tipo de cada columna se decide en
+    el primer bloque donde tiene valores (numérica si todos lo son, con ','
+    como separador de miles) y se mantiene en los bloques siguientes, para
+    que todos los bloques tengan el mismo esquema.
+
+    Args:
+        rows: Filas de texto
+        columns: Nombres de columna
+        numeric_columns: Decisiones de tipo por columna; se actualiza aquí
+    """
+    width = len(columns)
+    rows = [row[:width] + [''] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(rows, columns=columns, dtype=object)
+    df = df.where(df != '', None)
+
+    for position, column in enumerate(columns):
+        values = df.iloc[:, position]
+        non_null = values.notna().sum()
+
+        if column not in numeric_columns:
+            if non_null == 0:
+                df.isetitem(position, values.astype(float))
+                continue
+            numeric_columns[column] = _to_numeric(values).notna().sum() == non_null
+
+        if numeric_columns[column]:
+            df.isetitem(position, _to_numeric(values))
+        else:
+            df.isetitem(position, values.astype(str).where(values.notna(), None))
+
+    return df
+
+
+def iter_html_table_chunks(file_path: str, chunk_size: int = CHUNK_ROWS,
+                           skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Lee la primera tabla de un reporte HTML en bloques de filas.
+
+    Equivale a pd.read_html(file_path)[0] partido en bloques, pero la memoria
+    máxima depende de chunk_size y no del tamaño del archivo.
+
+    Args:
+        file_path: Ruta del archivo HTML
+        chunk_size: Filas por bloque
+        skip_rows: Filas de datos a saltar sin convertirlas (para reanudar una carga)
+
+    Returns:
+        Iterador de DataFrames con las mismas columnas
+    """
+    columns: Optional[List] = None
+    numeric_columns: Dict[Any, bool] = {}
+    rows: List[List[str]] = []
+    data_rows = 0
+
+    for is_header, cells in iter_html_table_rows(file_path):
+        if columns is None:
+            if is_header:
+                columns = cells
+                continue
+            # Sin fila de encabezados: columnas numeradas, como read_html
+            columns = list(range(len(cells)))
+
+        data_rows += 1
+        if data_rows <= skip_rows:
+            continue
+
+        rows.append(cells)
+        if len(rows) >= chunk_size:
+            yield _rows_to_frame(rows, columns, numeric_columns)
+            rows = []
+
+    if rows:
+        yield _rows_to_frame(rows, columns, numeric_columns)
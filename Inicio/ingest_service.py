@@ -0,0 +1,224 @@
+"""
+Servicio de carga automática de reportes consulares.
+
+Vigila una carpeta de entrada y carga cada archivo nuevo con el mismo flujo de
+validación y carga de la página "Gestión de Archivos". Cada carga que modifica
+datos incrementa la versión de datos de la base, así que el dashboard refresca
+sus cachés en el siguiente render sin pulsar "Actualizar".
+
+Uso (desde la carpeta Inicio, junto al dashboard):
+    python -m ingest_service --dir entrada
+    python -m ingest_service --dir entrada --once
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_manager import FileManager
+
+try:
+    # watchdog usa inotify en Linux; es opcional
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Intervalo entre revisiones de la carpeta
+POLL_SECONDS = 2.0
+
+# Tiempo que un archivo debe permanecer sin cambios (tamaño y fecha de
+# modificación) antes de cargarlo; evita leer archivos a medio copiar
+SETTLE_SECONDS = 5.0
+
+
+class _DropFolderHandler(FileSystemEventHandler):
+    """Avisa al servicio de cada archivo creado, modificado o movido a la carpeta"""
+
+    def __init__(self, service: 'IngestService'):
+        self.service = service
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.service.notify(getattr(event, 'dest_path', '') or event.src_path)
+
+
+class IngestService:
+    """
+    Carga automáticamente los reportes que aparecen en una carpeta.
+    """
+
+    def __init__(self, watch_dir: str, db_path: Optional[str] = None,
+                 overwrite_duplicates: bool = False,
+                 settle_seconds: float = SETTLE_SECONDS,
+                 poll_seconds: float = POLL_SECONDS,
+                 use_events: bool = True):
+        """
+        Args:
+            watch_dir: Carpeta de entrada a vigilar
+            db_path: Ruta de la base de datos (por defecto la del dashboard)
+            overwrite_duplicates: Si True, sobrescribe registros existentes
+            settle_seconds: Segundos sin cambios antes de cargar un archivo
+            poll_seconds: Segundos entre revisiones
+            use_events: Si False, usa sondeo aunque watchdog esté instalado
+        """
+        self.watch_dir = Path(watch_dir)
+        self.file_manager = FileManager(db_path)
+        self.overwrite_duplicates = overwrite_duplicates
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.use_events = use_events and Observer is not None
+        self.mode = 'eventos' if self.use_events else 'sondeo'
+
+        # ruta -> (tamaño, mtime, momento desde el que no cambia)
+        self._observed: Dict[str, Tuple[int, float, float]] = {}
+        # ruta -> (tamaño, mtime) ya procesado, con éxito o no
+        self._processed: Dict[str, Tuple[int, float]] = {}
+        self._notified = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def notify(self, path: str):
+        """Marca una ruta para revisarla en la siguiente pasada"""
+        with self._lock:
+            self._notified.add(os.path.abspath(path))
+
+    def _is_candidate(self, path: Path) -> bool:
+        """Archivos con extensión soportada, sin temporales ni ocultos"""
+        return (path.suffix.lower() in self.file_manager.supported_extensions
+                and not path.name.startswith(('.', '~$')))
+
+    def _candidates(self, full_scan: bool) -> List[str]:
+        """Rutas a revisar: toda la carpeta o solo las notificadas y las que esperan"""
+        with self._lock:
+            paths = set(self._notified) | set(self._observed)
+            self._notified.clear()
+
+        if full_scan and self.watch_dir.is_dir():
+            paths.update(os.path.abspath(entry) for entry in self.watch_dir.iterdir() if entry.is_file())
+
+        return sorted(path for path in paths if self._is_candidate(Path(path)))
+
+    def process_pending(self, full_scan: bool = False,
+                        now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Revisa los archivos pendientes y carga los que ya no cambian.
+
+        Args:
+            full_scan: Si True, revisa toda la carpeta
+            now: Momento actual (time.monotonic); parámetro para pruebas
+
+        Returns:
+            Resultado de FileManager.batch_load_files, o None si no se cargó nada
+        """
+        now = time.monotonic() if now is None else now
+        ready = []
+
+        for path in self._candidates(full_scan):
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                self._observed.pop(path, None)
+                continue
+
+            signature = (stat_result.st_size, stat_result.st_mtime)
+            if self._processed.get(path) == signature:
+                self._observed.pop(path, None)
+                continue
+
+            observed = self._observed.get(path)
+            if observed is None or observed[:2] != signature:
+                # Archivo nuevo o todavía escribiéndose
+                self._observed[path] = (*signature, now)
+                continue
+
+            if stat_result.st_size > 0 and now - observed[2] >= self.settle_seconds:
+                ready.append(path)
+
+        if not ready:
+            return None
+
+        result = self.file_manager.batch_load_files(ready, self.overwrite_duplicates)
+
+        for path in ready:
+            self._processed[path] = self._observed.pop(path)[:2]
+        for file_result in result['successful_files']:
+            stats = file_result['stats']
+            logging.info(f"Cargado {file_result['filename']}: {stats.get('inserted', 0)} insertados, "
+                         f"{stats.get('updated', 0)} actualizados, {stats.get('duplicates', 0)} duplicados")
+        for file_result in result['failed_files']:
+            logging.warning(f"No se cargó {file_result['filename']}: {file_result['error']}")
+
+        return result
+
+    def run(self):
+        """Vigila la carpeta hasta que se llame a stop() o se interrumpa el proceso"""
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+
+        observer = None
+        if self.use_events:
+            observer = Observer()
+            observer.schedule(_DropFolderHandler(self), str(self.watch_dir), recursive=False)
+            observer.start()
+
+        logging.info(f"Vigilando {self.watch_dir.resolve()} ({self.mode}) "
+                     f"-> {self.file_manager.db_manager.db_path}")
+
+        full_scan = True
+        try:
+            while not self._stop.is_set():
+                self.process_pending(full_scan=full_scan)
+                # Con eventos basta la revisión inicial; el resto llega notificado
+                full_scan = observer is None
+                self._stop.wait(self.poll_seconds)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """Carga los archivos que ya están en la carpeta y termina"""
+        self.process_pending(full_scan=True)
+        time.sleep(self.settle_seconds)
+        return self.process_pending(full_scan=True)
+
+    def stop(self):
+        """Detiene run() al terminar la pasada actual"""
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga automática de reportes consulares")
+    parser.add_argument('--dir', default='entrada', help='Carpeta de entrada a vigilar')
+    parser.add_argument('--db', default=None, help='Ruta de la base de datos')
+    parser.add_argument('--overwrite', action='store_true', help='Sobrescribir registros existentes')
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS,
+                        help='Segundos sin cambios antes de cargar un archivo')
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS,
+                        help='Segundos entre revisiones')
+    parser.add_argument('--polling', action='store_true', help='Usar sondeo aunque watchdog esté instalado')
+    parser.add_argument('--once', action='store_true', help='Cargar lo que haya en la carpeta y salir')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    service = IngestService(args.dir, args.db, args.overwrite, args.settle,
+                            args.interval, use_events=not args.polling)
+    if args.once:
+        service.run_once()
+        return
+
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        logging.info("Servicio detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Secciones de página que solo calculan su contenido cuando se ven.
+
+Streamlit ejecuta todo el script en cada rerun, incluidas las pestañas no
+seleccionadas. Con pestañas con estado (on_change="rerun", Streamlit 1.50 o
+posterior) cada pestaña indica si está abierta y la sección que no se ve no
+calcula nada. Las secciones con
+controles propios se ejecutan como fragmentos: cambiar un control vuelve a
+ejecutar solo su sección. Los resultados de cada sección se memorizan en la
+caché de resultados por filtros y versión de datos.
+
+Con versiones anteriores de Streamlit las secciones se calculan siempre, como
+antes.
+"""
+
+import inspect
+from typing import Any, Callable, List, Optional, Tuple
+
+import streamlit as st
+
+from result_cache import result_cache
+
+# Pestañas con estado (propiedad .open)
+STATEFUL_CONTAINERS = 'on_change' in inspect.signature(st.tabs).parameters
+
+# Fragmentos: los controles de una sección solo vuelven a ejecutar esa sección
+fragment = getattr(st, 'fragment', lambda func: func)
+
+
+def lazy_tabs(labels: List[str], key: str) -> List[Tuple[Any, bool]]:
+    """
+    Crea pestañas en las que solo la seleccionada calcula su contenido.
+
+    Args:
+        labels: Títulos de las pestañas
+        key: Clave del control (conserva la pestaña seleccionada)
+
+    Returns:
+        Lista de (contenedor, está abierta) por pestaña
+    """
+    if not STATEFUL_CONTAINERS:
+        return [(tab, True) for tab in st.tabs(labels)]
+    tabs = st.tabs(labels, key=key, on_change='rerun')
+    return [(tab, bool(tab.open)) for tab in tabs]
+
+
+def memoize_section(name: str, compute: Callable[[], Any], scope: Optional[tuple], **params) -> Any:
+    """
+    Calcula los datos de una sección o los toma de la caché de resultados.
+
+    Args:
+        name: Nombre de la sección
+        compute: Función que calcula los datos
+        scope: Alcance de los datos (processor.cache_scope()); None para no memorizar
+        **params: Controles de la sección (valores simples)
+
+    Returns:
+        Resultado de compute; None no se memoriza (p. ej. un error ya mostrado)
+    """
+    if scope is None:
+        return compute()
+
+    namespace, version, filters = scope
+    result_cache.sync_version(namespace, version)
+    key = (namespace, f'seccion:{name}', filters, tuple(sorted(params.items())))
+
+    found, value = result_cache.get(key)
+    if found:
+        return value
+
+    value = compute()
+    if value is not None:
+        result_cache.put(key, value)
+    return value
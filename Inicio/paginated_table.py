@@ -0,0 +1,139 @@
+"""
+Tabla paginada de registros detallados.
+
+La tabla de datos detallados formateaba los montos de todas las filas con
+.apply y enviaba el DataFrame completo a st.dataframe. Aquí la búsqueda, el
+orden y la paginación se resuelven en SQL (LIMIT/OFFSET con el total de la
+misma consulta) y solo se formatean, de forma vectorizada, las filas de la
+página visible; abrir la tabla cuesta lo mismo con mil registros que con
+medio millón.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from lazy_sections import fragment
+
+# Registros por página disponibles
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Columnas ordenables y su etiqueta
+SORT_OPTIONS = {
+    'fecha_emision': 'Fecha',
+    'servicio': 'Servicio',
+    'categoria': 'Categoría',
+    'num_tramites': 'Trámites',
+    'ingresos_totales': 'Ingresos',
+    'costo_unitario': 'Costo unitario'
+}
+
+# Columnas monetarias que se formatean en la página visible
+CURRENCY_COLUMNS = ['costo_unitario', 'ingresos_totales']
+
+
+def format_currency(values: pd.Series) -> pd.Series:
+    """
+    Formatea montos como '$1,234.50' con operaciones vectorizadas.
+
+    Args:
+        values: Serie numérica
+
+    Returns:
+        Serie de texto con el mismo índice; los nulos quedan vacíos
+    """
+    numbers = pd.to_numeric(values, errors='coerce')
+    valid = numbers.notna().to_numpy()
+    result = pd.Series('', index=values.index, dtype=object)
+    if not valid.any():
+        return result
+
+    present = numbers[valid].to_numpy(dtype=np.float64)
+    # '%.2f' redondea como f'{x:.2f}'; las comas se insertan en la parte entera
+    digits = pd.Series(np.char.mod('%.2f', np.abs(present)))
+    digits = digits.str.replace(r'\B(?=(\d{3})+(?!\d))', ',', regex=True)
+    sign = np.where(np.signbit(present), '-', '')
+
+    result[valid] = ('$' + sign + digits).to_numpy()
+    return result
+
+
+def format_page(data: pd.DataFrame) -> pd.DataFrame:
+    """Copia de la página con las columnas monetarias formateadas"""
+    display_data = data.copy()
+    for column in CURRENCY_COLUMNS:
+        if column in display_data.columns:
+            display_data[column] = format_currency(display_data[column])
+    return display_data
+
+
+def _reset_page(page_key: str):
+    """Vuelve a la primera página cuando cambian la búsqueda, el orden o el tamaño"""
+    st.session_state[page_key] = 1
+
+
+@fragment
+def show_paginated_table(fetch_page: Callable[..., Dict[str, Any]], key: str,
+                         filters: Optional[Dict[str, Any]] = None):
+    """
+    Muestra una tabla paginada con búsqueda y orden resueltos por fetch_page.
+
+    Se ejecuta como fragmento: buscar, ordenar o cambiar de página solo
+    vuelve a ejecutar la tabla.
+
+    Args:
+        fetch_page: Función (search, sort_by, descending, page, page_size) que
+            devuelve data, total, page y pages (p. ej. processor.get_data_page)
+        key: Prefijo de las claves de los controles
+        filters: Argumentos adicionales de fetch_page, como la categoría
+            filtrada en el análisis
+    """
+    page_key = f'{key}_page'
+    filters = filters or {}
+
+    # Otros filtros: volver a la primera página
+    filters_key = f'{key}_filters'
+    if st.session_state.get(filters_key) != filters:
+        st.session_state[filters_key] = filters
+        _reset_page(page_key)
+
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    with col1:
+        search = st.text_input("Buscar servicio o categoría:", key=f'{key}_search',
+                               on_change=_reset_page, args=(page_key,))
+    with col2:
+        sort_by = st.selectbox("Ordenar por:", options=list(SORT_OPTIONS),
+                               format_func=SORT_OPTIONS.get, key=f'{key}_sort',
+                               on_change=_reset_page, args=(page_key,))
+    with col3:
+        order = st.selectbox("Orden:", options=["Descendente", "Ascendente"], key=f'{key}_order',
+                             on_change=_reset_page, args=(page_key,))
+    with col4:
+        page_size = st.selectbox("Filas:", options=PAGE_SIZES, index=1, key=f'{key}_size',
+                                 on_change=_reset_page, args=(page_key,))
+
+    try:
+        result = fetch_page(search=search, sort_by=sort_by, descending=order == "Descendente",
+                            page=int(st.session_state.get(page_key, 1)), page_size=page_size, **filters)
+    except Exception as e:
+        st.error(f"Error consultando los datos detallados: {str(e)}")
+        return
+
+    if result['total'] == 0:
+        st.info("No hay registros que coincidan con la búsqueda")
+        return
+
+    st.dataframe(format_page(result['data']), use_container_width=True, hide_index=True)
+
+    # La página pedida puede haber pasado de la última (p. ej. tras una carga)
+    st.session_state[page_key] = result['page']
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        st.number_input(f"Página (de {result['pages']:,}):", min_value=1, max_value=result['pages'],
+                        step=1, key=page_key)
+    with col2:
+        first = (result['page'] - 1) * page_size + 1
+        last = first + len(result['data']) - 1
+        st.caption(f"Mostrando {first:,}–{last:,} de {result['total']:,} registros")
@@ -0,0 +1,300 @@
+"""
+Caché en disco de los datos limpios de cada archivo leído.
+
+Leer un reporte .xls/HTML es lo más lento de validar o cargar un archivo; los
+datos limpios se guardan en Parquet junto con los metadatos de la lectura,
+con el hash del contenido y la versión de la limpieza como clave. Volver a
+validar, recargar después de un cambio de esquema o reconstruir la base lee
+el Parquet en lugar del archivo original.
+
+Requiere pyarrow; sin él la caché queda desactivada y todo se lee del archivo.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from data_processor import PROCESSOR_VERSION
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Carpeta de la caché (configurable con MAYO_CACHE_DIR)
+PARQUET_CACHE_DIR = os.environ.get(
+    'MAYO_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'archivos'))
+
+# Tamaño máximo de la carpeta; se eliminan primero los archivos usados hace más tiempo
+MAX_PARQUET_CACHE_BYTES = 1024 * 1024 * 1024   # 1 GB
+
+
+class _FrameWriter:
+    """
+    Escribe un archivo Parquet por bloques; cada bloque queda en su propio
+    grupo de filas para poder leerlo otra vez con los mismos límites.
+    """
+
+    def __init__(self, cache: 'ParquetFrameCache', content_hash: str):
+        self.cache = cache
+        self.content_hash = content_hash
+        self.temp_path = cache.data_path(content_hash).with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        self._writer = None
+        self._failed = False
+
+    def write(self, df: pd.DataFrame):
+        """Agrega un bloque limpio; si no se puede escribir, la caché de este archivo se descarta"""
+        if self._failed or df.empty:
+            return
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self.temp_path.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = pq.ParquetWriter(self.temp_path, table.schema)
+            elif not table.schema.equals(self._writer.schema):
+                # Un bloque con otros tipos (p. ej. una columna vacía) se ajusta al primero
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table, row_group_size=len(df))
+        except (pa.ArrowException, OSError, ValueError, TypeError) as e:
+            logging.warning(f"No se pudo guardar en caché {self.content_hash[:12]}: {e}")
+            self._failed = True
+
+    def commit(self, metadata: Dict[str, Any]) -> bool:
+        """
+        Publica el Parquet y sus metadatos. Los metadatos se escriben al final:
+        una entrada sin ellos no se usa.
+
+        Args:
+            metadata: Metadatos de la lectura (serializables como JSON)
+
+        Returns:
+            True si la entrada quedó guardada
+        """
+        self._close()
+        if self._failed or not self.temp_path.exists():
+            self.discard()
+            return False
+        try:
+            os.replace(self.temp_path, self.cache.data_path(self.content_hash))
+            self.cache._write_metadata(self.content_hash, metadata)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"No se pudo guardar en caché {self.content_hash[:12]}: {e}")
+            self.discard()
+            return False
+        self.cache.evict()
+        return True
+
+    def discard(self):
+        """Abandona la escritura"""
+        self._close()
+        self.temp_path.unlink(missing_ok=True)
+
+    def _close(self):
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except (pa.ArrowException, OSError) as e:
+                logging.warning(f"No se pudo cerrar la caché {self.content_hash[:12]}: {e}")
+                self._failed = True
+            self._writer = None
+
+
+class ParquetFrameCache:
+    """
+    Caché de DataFrames limpios en archivos Parquet, por hash de contenido y
+    versión de la limpieza, con límite de tamaño en disco.
+    """
+
+    def __init__(self, cache_dir: str = PARQUET_CACHE_DIR,
+                 max_bytes: int = MAX_PARQUET_CACHE_BYTES,
+                 version: int = PROCESSOR_VERSION):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.enabled = pq is not None
+
+    def data_path(self, content_hash: str) -> Path:
+        """Archivo Parquet de un contenido"""
+        return self.cache_dir / f'{content_hash}.v{self.version}.parquet'
+
+    def metadata_path(self, content_hash: str) -> Path:
+        """Metadatos de un contenido"""
+        return self.cache_dir / f'{content_hash}.v{self.version}.json'
+
+    def get_metadata(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca los metadatos de un contenido y marca la entrada como usada.
+
+        Args:
+            content_hash: SHA-256 del contenido del archivo
+
+        Returns:
+            Metadatos guardados con la entrada, o None si no está en caché
+        """
+        if not self.enabled:
+            return None
+
+        metadata_path = self.metadata_path(content_hash)
+        data_path = self.data_path(content_hash)
+        try:
+            with open(metadata_path, encoding='utf-8') as f:
+                metadata = json.load(f)
+            os.utime(data_path)
+            os.utime(metadata_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Entrada de caché ilegible {content_hash[:12]}: {e}")
+            self.remove(content_hash)
+            return None
+        return metadata
+
+    def read_frame(self, content_hash: str) -> pd.DataFrame:
+        """Lee los datos limpios completos de un contenido en caché"""
+        return pq.read_table(self.data_path(content_hash)).to_pandas()
+
+    def read_head(self, content_hash: str, rows: int) -> pd.DataFrame:
+        """Lee las primeras filas de un contenido en caché (vista previa)"""
+        parquet_file = pq.ParquetFile(self.data_path(content_hash))
+        if parquet_file.metadata.num_row_groups == 0:
+            return parquet_file.schema_arrow.empty_table().to_pandas()
+        return parquet_file.read_row_group(0).slice(0, rows).to_pandas()
+
+    def iter_frames(self, content_hash: str, chunk_offsets: List[int],
+                    skip_chunks: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Lee los datos limpios por bloques, con los mismos límites con que se
+        escribieron (un grupo de filas por bloque no vacío).
+
+        Args:
+            content_hash: SHA-256 del contenido del archivo
+            chunk_offsets: Fila inicial de cada bloque más el total de filas
+            skip_chunks: Bloques iniciales a omitir
+
+        Returns:
+            Iterador de DataFrames limpios
+        """
+        parquet_file = pq.ParquetFile(self.data_path(content_hash))
+        empty = parquet_file.schema_arrow.empty_table()
+        row_group = sum(1 for start, end in zip(chunk_offsets[:skip_chunks], chunk_offsets[1:]) if end > start)
+
+        for start, end in zip(chunk_offsets[skip_chunks:], chunk_offsets[skip_chunks + 1:]):
+            if end == start:
+                # Bloque sin filas limpias: se entrega vacío para no mover los índices
+                yield empty.to_pandas()
+                continue
+            yield parquet_file.read_row_group(row_group).to_pandas()
+            row_group += 1
+
+    def writer(self, content_hash: str) -> Optional[_FrameWriter]:
+        """Escritor por bloques para un contenido, o None si la caché está desactivada"""
+        if not self.enabled or self.max_bytes <= 0:
+            return None
+        return _FrameWriter(self, content_hash)
+
+    def put(self, content_hash: str, df: pd.DataFrame, metadata: Dict[str, Any],
+            chunk_rows: Optional[int] = None) -> bool:
+        """
+        Guarda los datos limpios completos de un contenido.
+
+        Args:
+            content_hash: SHA-256 del contenido del archivo
+            df: Datos limpios
+            metadata: Metadatos de la lectura
+            chunk_rows: Filas por grupo de filas (cada bloque de una carga se
+                lee después con iter_frames); None guarda un solo grupo
+
+        Returns:
+            True si la entrada quedó guardada
+        """
+        writer = self.writer(content_hash)
+        if writer is None:
+            return False
+        step = chunk_rows or max(len(df), 1)
+        chunk_offsets = list(range(0, len(df), step)) + [len(df)]
+        for start, end in zip(chunk_offsets, chunk_offsets[1:]):
+            writer.write(df.iloc[start:end])
+        if chunk_rows is not None:
+            metadata = dict(metadata, chunk_rows=chunk_rows)
+        return writer.commit(dict(metadata, chunk_offsets=chunk_offsets))
+
+    def _write_metadata(self, content_hash: str, metadata: Dict[str, Any]):
+        metadata_path = self.metadata_path(content_hash)
+        temp_path = metadata_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(temp_path, metadata_path)
+
+    def remove(self, content_hash: str):
+        """Elimina la entrada de un contenido"""
+        self.metadata_path(content_hash).unlink(missing_ok=True)
+        self.data_path(content_hash).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        """
+        Elimina las entradas de versiones anteriores y, si la carpeta supera
+        max_bytes, las usadas hace más tiempo.
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        if not self.cache_dir.is_dir():
+            return 0
+
+        entries = {}
+        for path in self.cache_dir.iterdir():
+            if path.suffix not in ('.parquet', '.json'):
+                continue
+            try:
+                stat_result = path.stat()
+            except FileNotFoundError:
+                continue
+            content_hash, version = path.stem.rsplit('.v', 1) if '.v' in path.stem else (path.stem, '')
+            entry = entries.setdefault((content_hash, version), {'bytes': 0, 'used': 0.0, 'paths': []})
+            entry['bytes'] += stat_result.st_size
+            entry['used'] = max(entry['used'], stat_result.st_mtime)
+            entry['paths'].append(path)
+
+        current = str(self.version)
+        removed = 0
+        total_bytes = sum(entry['bytes'] for key, entry in entries.items() if key[1] == current)
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['used']):
+            if key[1] == current:
+                if total_bytes <= self.max_bytes:
+                    continue
+                total_bytes -= entry['bytes']
+            for path in entry['paths']:
+                path.unlink(missing_ok=True)
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        if not self.cache_dir.is_dir():
+            return
+        for path in self.cache_dir.iterdir():
+            if path.suffix in ('.parquet', '.json', '.tmp'):
+                path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entradas y bytes ocupados en disco"""
+        if not self.cache_dir.is_dir():
+            return {'enabled': self.enabled, 'entries': 0, 'bytes': 0}
+        paths = [path for path in self.cache_dir.iterdir() if path.suffix in ('.parquet', '.json')]
+        return {
+            'enabled': self.enabled,
+            'entries': sum(1 for path in paths if path.suffix == '.json'),
+            'bytes': sum(path.stat().st_size for path in paths)
+        }
+
+
+# Instancia compartida
+parquet_cache = ParquetFrameCache()
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from enhanced_data_processor import EnhancedDataProcessor
+from enhanced_data_processor import get_shared_processor
+from figure_cache import figure_cache
 from datetime import date, datetime
 import numpy as np
 import plotly.io as pio
@@ -55,6 +56,8 @@ def show_period_comparison_page():
                 # Guardar datos en session_state para mantener persistencia
                 st.session_state.year_comparison_data = execute_year_comparison(processor, comparison_config)
                 st.session_state.comparison_config = comparison_config
+                # Datos con los que se calculó la comparación (clave de la caché de figuras)
+                st.session_state.comparison_scope = processor.cache_scope()
         else:
             st.error("Por favor seleccione al menos 2 años para comparar")
     
@@ -66,12 +69,11 @@ def show_period_comparison_page():
             processor
         )
 
-@st.cache_data
 def initialize_processor():
-    """Inicializa el procesador de datos"""
+    """Obtiene el procesador compartido (se recarga solo si cambió la versión de datos)"""
     try:
-        processor = EnhancedDataProcessor()
-        if processor.initialize_from_database():
+        processor = get_shared_processor()
+        if processor.df is not None and not processor.df.empty:
             return processor
         return None
     except Exception as e:
@@ -82,8 +84,8 @@ def get_available_years_and_periods(processor):
     """Obtiene años y períodos disponibles en los datos"""
     try:
         if processor.df is not None and not processor.df.empty:
-            df = processor.df.copy()
-            df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
+            # Una fila por día con datos basta para conocer años y meses
+            df = processor.get_daily_totals()
             
             # Obtener años disponibles (convertir a int para compatibilidad con Streamlit)
             years = sorted([int(year) for year in df['fecha_emision'].dt.year.unique()])
@@ -195,11 +197,8 @@ def get_year_period_data(processor, year, period_value):
         if processor.df is None or processor.df.empty:
             return None
         
-        df = processor.df.copy()
-        df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
-        
-        # Filtrar por año
-        year_data = df[df['fecha_emision'].dt.year == year]
+        # Resumen diario por servicio del año (mismas columnas que processor.df)
+        year_data = processor.get_daily_rollup(f'{year}-01-01', f'{year}-12-31')
         
         if year_data.empty:
             return None
@@ -386,7 +385,16 @@ def show_year_timeline_chart(year_data, comparison_config):
     if 'chart_config' not in st.session_state:
         st.session_state.chart_config = {}
     
-    fig = create_year_comparison_chart(year_data, selected_metric, selected_grouping, metric_label, comparison_config)
+    fig = figure_cache.get_figure(
+        'comparacion_anual',
+        lambda: create_year_comparison_chart(year_data, selected_metric, selected_grouping, metric_label, comparison_config),
+        st.session_state.get('comparison_scope'),
+        metric=selected_metric,
+        grouping=selected_grouping,
+        years=sorted(year_data.keys()),
+        period_value=comparison_config['period_value'],
+        period_name=comparison_config['period_name']
+    )
     
     if fig:
         st.session_state.chart_config = {
@@ -0,0 +1,141 @@
+import pandas as pd
+from typing import Dict, List, Optional, Any, Tuple
+from database_manager import DatabaseManager
+
+# Dimensiones de agrupación: columna del resultado -> expresión SQL sobre daily_service_rollup
+DIMENSIONS = {
+    'fecha_emision': 'fecha',
+    'mes_año': 'SUBSTR(fecha, 1, 7)',
+    'trimestre': '(CAST(SUBSTR(fecha, 6, 2) AS INTEGER) + 2) / 3',
+    'año': 'CAST(SUBSTR(fecha, 1, 4) AS INTEGER)',
+    'categoria': "NULLIF(categoria, '')",
+    'servicio': 'servicio_agrupado'
+}
+
+# Métricas disponibles: nombre -> agregación SQL
+METRICS = {
+    'ingresos_totales': 'SUM(ingresos_totales)',
+    'num_tramites': 'SUM(num_tramites)',
+    'formas_canceladas': 'SUM(formas_canceladas)',
+    'registros': 'SUM(registros)',
+    'servicios_unicos': 'COUNT(DISTINCT servicio_agrupado)'
+}
+
+
+def compile_aggregation(group_by: List[str], metrics: Dict[str, str],
+                        start_date: Optional[str] = None,
+                        end_date: Optional[str] = None,
+                        categoria: Optional[str] = None,
+                        exclude_pattern: Optional[str] = None,
+                        order_by: Optional[List[Tuple[str, bool]]] = None,
+                        limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    Compila una agregación a SQL parametrizado sobre daily_service_rollup.
+
+    Args:
+        group_by: Dimensiones de agrupación (claves de DIMENSIONS)
+        metrics: Alias de columna -> métrica (claves de METRICS)
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        categoria: Filtro opcional por categoría
+        exclude_pattern: Texto de servicios a excluir (p. ej. 'COMPULSA')
+        order_by: Lista de (columna, descendente); por defecto las dimensiones
+        limit: Número máximo de filas (top-N)
+
+    Returns:
+        Tupla (consulta SQL, parámetros)
+    """
+    unknown = [dim for dim in group_by if dim not in DIMENSIONS]
+    unknown += [metric for metric in metrics.values() if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Dimensiones o métricas no soportadas: {unknown}")
+
+    select = [f'{DIMENSIONS[dim]} AS "{dim}"' for dim in group_by]
+    select += [f'{METRICS[metric]} AS "{alias}"' for alias, metric in metrics.items()]
+
+    where = ["1=1"]
+    params = []
+
+    if start_date:
+        where.append("fecha >= ?")
+        params.append(start_date)
+
+    if end_date:
+        where.append("fecha <= ?")
+        params.append(end_date)
+
+    if categoria:
+        where.append("categoria = ?")
+        params.append(categoria)
+
+    if 'categoria' in group_by:
+        # pandas descarta las claves nulas al agrupar
+        where.append("categoria <> ''")
+
+    if exclude_pattern:
+        where.append("servicio_agrupado NOT LIKE ?")
+        params.append(f'%{exclude_pattern}%')
+
+    query = f"SELECT {', '.join(select)} FROM daily_service_rollup WHERE {' AND '.join(where)}"
+
+    if group_by:
+        query += " GROUP BY " + ', '.join(f'"{dim}"' for dim in group_by)
+
+    order_by = order_by if order_by is not None else [(dim, False) for dim in group_by]
+    if order_by:
+        query += " ORDER BY " + ', '.join(
+            f'"{column}" {"DESC" if descending else "ASC"}' for column, descending in order_by
+        )
+
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+
+    return query, params
+
+
+class QueryEngine:
+    """
+    Capa de consultas que resuelve agregaciones en SQLite.
+
+    Solo el resultado agregado cruza a Python; las columnas de dimensión se
+    convierten a los mismos tipos que produce EnhancedDataProcessor en pandas.
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+
+    def aggregate(self, group_by: List[str], metrics: Dict[str, str],
+                  **filters) -> pd.DataFrame:
+        """
+        Ejecuta una agregación compilada con compile_aggregation.
+
+        Args:
+            group_by: Dimensiones de agrupación
+            metrics: Alias de columna -> métrica
+            **filters: start_date, end_date, categoria, exclude_pattern, order_by, limit
+
+        Returns:
+            DataFrame agregado, o DataFrame vacío si no hay datos
+        """
+        query, params = compile_aggregation(group_by, metrics, **filters)
+
+        with self.db_manager.get_connection() as conn:
+            result = pd.read_sql_query(query, conn, params=params)
+
+        if result.empty:
+            return pd.DataFrame()
+
+        return self._convert_dimensions(result)
+
+    @staticmethod
+    def _convert_dimensions(result: pd.DataFrame) -> pd.DataFrame:
+        """Convierte las dimensiones temporales a los tipos usados en pandas"""
+        if 'fecha_emision' in result.columns:
+            result['fecha_emision'] = pd.to_datetime(result['fecha_emision'])
+        if 'mes_año' in result.columns:
+            result['mes_año'] = pd.to_datetime(result['mes_año'], format='%Y-%m').dt.to_period('M')
+        for column in ('año', 'trimestre'):
+            if column in result.columns:
+                result[column] = result[column].astype('int32')
+        return result
@@ -0,0 +1,178 @@
+import copy
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+import pandas as pd
+
+# Límites por defecto de la caché compartida
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024   # 128 MB
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estima el tamaño en bytes de un resultado cacheado.
+
+    Args:
+        value: DataFrame, Serie, diccionario, lista o valor simple
+
+    Returns:
+        Tamaño aproximado en bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def copy_value(value: Any) -> Any:
+    """Copia un resultado para que quien lo recibe no altere la entrada cacheada"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class ResultCache:
+    """
+    Caché LRU de resultados con límite de entradas y de bytes.
+
+    Las claves empiezan con un espacio de nombres (la ruta de la base de datos);
+    cuando cambia la versión de datos de un espacio, sus entradas se descartan.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, copy_values: bool = True):
+        """
+        Args:
+            max_entries: Número máximo de entradas
+            max_bytes: Tamaño máximo estimado de las entradas en bytes
+            copy_values: Si False, get y put no copian los valores: quien los
+                recibe los comparte con la caché y debe tratarlos como de solo
+                lectura (para artefactos grandes que se leen varias veces)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.copy_values = copy_values
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._versions: Dict[Hashable, Any] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Busca un resultado.
+
+        Args:
+            key: Clave (tupla cuyo primer elemento es el espacio de nombres)
+
+        Returns:
+            Tupla (encontrado, copia del valor —o el valor si copy_values es
+            False— o None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            value = entry[0]
+
+        return True, copy_value(value) if self.copy_values else value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Guarda una copia del resultado y desaloja las entradas menos usadas
+        hasta respetar los límites.
+
+        Args:
+            key: Clave (tupla cuyo primer elemento es el espacio de nombres)
+            value: Resultado a guardar
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        if self.copy_values:
+            value = copy_value(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def sync_version(self, namespace: Hashable, version: Any):
+        """
+        Registra la versión de datos de un espacio de nombres y descarta sus
+        entradas si la versión cambió.
+
+        Args:
+            namespace: Espacio de nombres (ruta de la base de datos)
+            version: Versión de datos actual
+        """
+        with self._lock:
+            known = self._versions.get(namespace)
+            if known == version:
+                return
+
+            self._versions[namespace] = version
+            if known is None:
+                return
+
+            stale = [key for key in self._entries if key[0] == namespace]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Vacía la caché (las estadísticas se conservan)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def reset_stats(self):
+        """Reinicia los contadores de aciertos, fallos y desalojos"""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas de uso de la caché"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+            }
+
+
+# Instancia compartida por todo el proceso; sobrevive a los reruns de Streamlit
+result_cache = ResultCache()
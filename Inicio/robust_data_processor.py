@@ -1,140 +1,423 @@
 import pandas as pd
 from datetime import datetime
+import hashlib
+import logging
 import os
-from data_processor import MayoDataProcessor
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional
+from column_schema import describe_missing, resolve_columns
+from data_processor import MayoDataProcessor, detect_file_format
+from html_stream_parser import CHUNK_ROWS, iter_html_table_chunks
+from parquet_cache import parquet_cache
+from result_cache import ResultCache
+
+# Artefactos de lectura y limpieza por hash de contenido: validar y cargar el
+# mismo archivo (aunque se guarde con otro nombre temporal) lo lee una sola vez.
+# Los artefactos se comparten sin copiarse y son de solo lectura.
+MAX_PARSED_FILES = 8
+MAX_PARSED_BYTES = 512 * 1024 * 1024   # 512 MB
+parsed_file_cache = ResultCache(max_entries=MAX_PARSED_FILES, max_bytes=MAX_PARSED_BYTES,
+                                copy_values=False)
+
+# Reportes HTML desde este tamaño se leen por bloques con el parser incremental;
+# el artefacto guarda solo columnas, conteos y vista previa, y los datos se
+# vuelven a leer por bloques al cargarlos
+STREAMING_MIN_BYTES = 64 * 1024 * 1024   # 64 MB
+STREAMING_CHUNK_ROWS = CHUNK_ROWS
+
+# Clave de un registro en la base de datos
+RECORD_KEY_COLUMNS = ['servicio', 'fecha_emision', 'categoria']
+
+def file_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Calcula el SHA-256 del contenido de un archivo.
+
+    Args:
+        file_path: Ruta del archivo
+        chunk_size: Tamaño de lectura en bytes
+
+    Returns:
+        Hash hexadecimal del contenido
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 class RobustDataProcessor:
     """
     Procesador de datos más robusto que maneja errores de carga mejor
     """
-    
-    def __init__(self, file_path):
+
+    def __init__(self, file_path, content_hash=None):
         self.file_path = file_path
         self.df = None
         self.original_processor = None
-        
-    def load_and_clean_data(self):
+        # Hash ya calculado por quien llama (evita leer el archivo otra vez)
+        self.content_hash = content_hash
+
+    def parse(self) -> Dict[str, Any]:
         """
-        Carga y limpia datos en una sola operación más robusta
+        Lee y limpia el archivo una sola vez por contenido.
+
+        El resultado (columnas originales, filas, datos limpios y errores) se
+        guarda en parsed_file_cache con el hash del contenido; validate_structure
+        y load_and_clean_data lo comparten. Los datos limpios de los archivos
+        válidos se guardan además en parquet_cache, así que en otra sesión o
+        en otro proceso el archivo original no se vuelve a leer.
+
+        Returns:
+            Diccionario con raw_columns, rows_count, cleaned_df, engine, load_error,
+            clean_error y streamed; es el mismo objeto para todas las llamadas
+            y no debe modificarse
         """
+        if self.content_hash is None:
+            self.content_hash = file_content_hash(self.file_path)
+        key = ('archivo', self.content_hash)
+
+        found, artifact = parsed_file_cache.get(key)
+        if found:
+            return artifact
+
+        artifact = self._load_cached_artifact()
+        if artifact is None:
+            artifact = self._parse_file()
+            if not artifact['streamed'] and artifact['cleaned_df'] is not None:
+                # Los archivos leídos por bloques se guardan mientras se recorren
+                parquet_cache.put(self.content_hash, artifact['cleaned_df'], {
+                    'raw_columns': artifact['raw_columns'],
+                    'rows_count': artifact['rows_count'],
+                    'engine': artifact['engine'],
+                    'streamed': False
+                }, chunk_rows=STREAMING_CHUNK_ROWS)
+        parsed_file_cache.put(key, artifact)
+        return artifact
+
+    def _load_cached_artifact(self) -> Optional[Dict[str, Any]]:
+        """Artefacto a partir de la caché Parquet, o None si el contenido no está guardado"""
+        metadata = parquet_cache.get_metadata(self.content_hash)
+        if metadata is None:
+            return None
+
+        artifact = {
+            'raw_columns': metadata['raw_columns'],
+            'rows_count': metadata['rows_count'],
+            'cleaned_df': None,
+            'engine': metadata['engine'],
+            'load_error': None,
+            'clean_error': None,
+            'streamed': metadata['streamed']
+        }
+        try:
+            if artifact['streamed']:
+                artifact.update({
+                    'preview_data': parquet_cache.read_head(self.content_hash, 10),
+                    'duplicate_rows': metadata['duplicate_rows'],
+                    'chunk_rows': metadata['chunk_rows'],
+                    'chunk_offsets': metadata['chunk_offsets']
+                })
+            else:
+                artifact['cleaned_df'] = parquet_cache.read_frame(self.content_hash)
+        except Exception as e:
+            logging.warning(f"Caché Parquet inválida para {self.file_path}: {e}")
+            parquet_cache.remove(self.content_hash)
+            return None
+
+        return artifact
+
+    def _parse_file(self) -> Dict[str, Any]:
+        """Lee y limpia el archivo sin consultar la caché"""
+        artifact = {
+            'raw_columns': [],
+            'rows_count': 0,
+            'cleaned_df': None,
+            'engine': None,
+            'load_error': None,
+            'clean_error': None,
+            'streamed': False
+        }
+
+        try:
+            if self._should_stream():
+                return self._parse_streaming(artifact)
+        except Exception as e:
+            artifact['load_error'] = f"Error al cargar el archivo: {str(e)}"
+            return artifact
+
         try:
             # Usar el procesador original
             self.original_processor = MayoDataProcessor(self.file_path)
-            
-            # Intentar cargar datos
             raw_df = self.original_processor.load_data()
-            
-            if raw_df is None or raw_df.empty:
+        except Exception as e:
+            artifact['load_error'] = str(e)
+            return artifact
+
+        artifact['engine'] = self.original_processor.engine
+
+        if raw_df is None or raw_df.empty:
+            return artifact
+
+        artifact['raw_columns'] = list(raw_df.columns)
+        artifact['rows_count'] = len(raw_df)
+
+        # Verificar que self.df esté asignado
+        if self.original_processor.df is None:
+            self.original_processor.df = raw_df
+
+        try:
+            artifact['cleaned_df'] = self.original_processor.clean_data()
+        except Exception as e:
+            artifact['clean_error'] = str(e)
+
+        return artifact
+
+    def _should_stream(self) -> bool:
+        """Indica si el archivo es un reporte HTML lo bastante grande para leerlo por bloques"""
+        return (os.path.getsize(self.file_path) >= STREAMING_MIN_BYTES
+                and detect_file_format(self.file_path) == 'html')
+
+    def _parse_streaming(self, artifact: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Recorre el archivo por bloques y guarda solo lo que necesita la
+        validación: columnas, conteos, duplicados y vista previa. Los bloques
+        limpios se escriben en parquet_cache, un grupo de filas por bloque.
+
+        Args:
+            artifact: Artefacto vacío a completar
+
+        Returns:
+            Artefacto con streamed=True y sin cleaned_df
+        """
+        artifact.update({
+            'engine': 'html-stream',
+            'streamed': True,
+            'preview_data': None,
+            'duplicate_rows': 0
+        })
+        key_hashes = []
+        # Fila limpia inicial de cada bloque, para leerlos del Parquet con los
+        # mismos límites (una carga reanudada cuenta los bloques igual)
+        chunk_offsets = [0]
+        writer = parquet_cache.writer(self.content_hash)
+
+        try:
+            for chunk in iter_html_table_chunks(self.file_path, STREAMING_CHUNK_ROWS):
+                if artifact['rows_count'] == 0:
+                    artifact['raw_columns'] = list(chunk.columns)
+                artifact['rows_count'] += len(chunk)
+
+                if artifact['clean_error'] is not None:
+                    continue
+                try:
+                    cleaned = MayoDataProcessor.clean_frame(chunk)
+                except Exception as e:
+                    artifact['clean_error'] = str(e)
+                    continue
+
+                if artifact['preview_data'] is None:
+                    artifact['preview_data'] = cleaned.head(10)
+                # 8 bytes por registro para contar duplicados entre bloques
+                key_hashes.append(pd.util.hash_pandas_object(cleaned[RECORD_KEY_COLUMNS], index=False).to_numpy())
+                chunk_offsets.append(chunk_offsets[-1] + len(cleaned))
+                if writer is not None:
+                    writer.write(cleaned)
+        except Exception:
+            if writer is not None:
+                writer.discard()
+            raise
+
+        if key_hashes:
+            all_hashes = np.concatenate(key_hashes)
+            artifact['duplicate_rows'] = int(len(all_hashes) - len(np.unique(all_hashes)))
+
+        if writer is not None:
+            if artifact['clean_error'] is not None or artifact['rows_count'] == 0:
+                writer.discard()
+            elif writer.commit({
+                'raw_columns': artifact['raw_columns'],
+                'rows_count': artifact['rows_count'],
+                'engine': artifact['engine'],
+                'streamed': True,
+                'duplicate_rows': artifact['duplicate_rows'],
+                'chunk_rows': STREAMING_CHUNK_ROWS,
+                'chunk_offsets': chunk_offsets
+            }):
+                artifact['chunk_rows'] = STREAMING_CHUNK_ROWS
+                artifact['chunk_offsets'] = chunk_offsets
+
+        return artifact
+
+    def iter_clean_chunks(self, chunk_rows: int = None, skip_chunks: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Entrega los datos limpios por bloques, listos para insertar.
+
+        Los archivos leídos por bloques en la validación se leen del Parquet
+        en caché, o se vuelven a recorrer con el parser incremental si ya no
+        está; los demás salen del artefacto compartido, sin volver a leer el
+        archivo.
+
+        Args:
+            chunk_rows: Filas por bloque; None entrega el artefacto en un solo
+                bloque (o en bloques de STREAMING_CHUNK_ROWS si es incremental)
+            skip_chunks: Bloques iniciales a omitir (para reanudar una carga)
+
+        Returns:
+            Iterador de DataFrames limpios
+        """
+        artifact = self.parse()
+        if not artifact['streamed']:
+            cleaned_df = self.load_and_clean_data()
+            if chunk_rows is None:
+                yield cleaned_df
+                return
+            for start in range(skip_chunks * chunk_rows, len(cleaned_df), chunk_rows):
+                yield cleaned_df.iloc[start:start + chunk_rows]
+            return
+
+        if artifact['load_error'] is not None or artifact['clean_error'] is not None:
+            raise Exception(f"Error procesando archivo {self.file_path}: "
+                            f"{artifact['load_error'] or artifact['clean_error']}")
+
+        chunk_rows = chunk_rows or STREAMING_CHUNK_ROWS
+        if (artifact.get('chunk_rows') == chunk_rows
+                and parquet_cache.get_metadata(self.content_hash) is not None):
+            yield from parquet_cache.iter_frames(self.content_hash, artifact['chunk_offsets'], skip_chunks)
+            return
+
+        self.original_processor = MayoDataProcessor(self.file_path)
+        yield from self.original_processor.iter_clean_chunks(chunk_rows, skip_chunks)
+
+    def cached_chunk_offsets(self, chunk_rows: int) -> Optional[List[int]]:
+        """
+        Límites de los bloques de chunk_rows filas en parquet_cache, para que
+        otro proceso los lea con parquet_cache.iter_frames.
+
+        Args:
+            chunk_rows: Filas por bloque de la carga
+
+        Returns:
+            Fila inicial de cada bloque más el total, o None si el contenido no
+            está en caché con esos bloques
+        """
+        self.parse()
+        metadata = parquet_cache.get_metadata(self.content_hash)
+        if metadata is None or metadata.get('chunk_rows') != chunk_rows:
+            return None
+        return metadata['chunk_offsets']
+
+    def load_and_clean_data(self):
+        """
+        Carga y limpia datos en una sola operación más robusta
+        """
+        try:
+            artifact = self.parse()
+
+            if artifact['load_error'] is not None:
+                raise Exception(artifact['load_error'])
+
+            if artifact['rows_count'] == 0:
                 raise Exception(f"No se pudieron cargar datos del archivo: {self.file_path}")
-            
-            # Verificar que self.df esté asignado
-            if self.original_processor.df is None:
-                # Si por alguna razón no se asignó, asignarlo manualmente
-                self.original_processor.df = raw_df
-            
-            # Limpiar datos
-            cleaned_df = self.original_processor.clean_data()
-            
+
+            if artifact['clean_error'] is not None:
+                raise Exception(artifact['clean_error'])
+
+            if artifact['streamed']:
+                # Los datos no se guardaron: concatenar los bloques
+                cleaned_df = pd.concat(list(self.iter_clean_chunks()), ignore_index=True)
+            else:
+                # Copia superficial: quien la recibe puede agregar o reemplazar
+                # columnas sin alterar el artefacto compartido
+                cleaned_df = artifact['cleaned_df']
+                if cleaned_df is not None:
+                    cleaned_df = cleaned_df.copy(deep=False)
+
             if cleaned_df is None or cleaned_df.empty:
                 raise Exception("No se pudieron limpiar los datos del archivo")
-            
+
             # Asignar a nuestra instancia también
             self.df = cleaned_df
-            
+
             return cleaned_df
-            
+
         except Exception as e:
             raise Exception(f"Error procesando archivo {self.file_path}: {str(e)}")
-    
+
     def validate_structure(self):
         """
         Valida que el archivo tenga la estructura esperada
         """
         try:
-            # Cargar solo para validación
-            temp_processor = MayoDataProcessor(self.file_path)
-            raw_df = temp_processor.load_data()
-            
-            if raw_df is None or raw_df.empty:
+            artifact = self.parse()
+
+            if artifact['load_error'] is not None:
+                raise Exception(artifact['load_error'])
+
+            if artifact['rows_count'] == 0:
                 return {
                     'is_valid': False,
                     'error_message': 'El archivo no contiene datos válidos',
                     'columns_found': [],
                     'rows_count': 0
                 }
-            
-            # Validar columnas requeridas con flexibilidad para codificación
-            required_patterns = {
-                'Servicio': ['Servicio'],
-                'Articulo': ['Articulo', 'Artículo'], 
-                'Derechos': ['Derechos'],
-                'Tramites': ['No. de trámites', 'No. de tramites', 'No. de tr�mites'],
-                'Importe': ['Importe USD'],
-                'Fecha': ['Fecha recaudación', 'Fecha recaudacion', 'Fecha recaudaci�n']
-            }
-            
-            column_mapping = {}
-            missing_columns = []
-            
-            for key, patterns in required_patterns.items():
-                found = False
-                for pattern in patterns:
-                    if pattern in raw_df.columns:
-                        column_mapping[key] = pattern
-                        found = True
-                        break
-                if not found:
-                    missing_columns.append(f'{key} (buscado: {", ".join(patterns)})')
-            
+
+            raw_columns = artifact['raw_columns']
+
+            # Validar columnas requeridas con la misma resolución que usa la limpieza
+            missing_columns = describe_missing(resolve_columns(raw_columns).missing)
+
             if missing_columns:
                 return {
                     'is_valid': False,
                     'error_message': f'Columnas faltantes: {", ".join(missing_columns)}',
-                    'columns_found': list(raw_df.columns),
-                    'rows_count': len(raw_df)
+                    'columns_found': raw_columns,
+                    'rows_count': artifact['rows_count']
                 }
-            
-            # Intentar limpiar datos para validación completa
-            try:
-                if temp_processor.df is None:
-                    temp_processor.df = raw_df
-                    
-                cleaned_df = temp_processor.clean_data()
-                
-                warnings = []
-                
+
+            # Validación completa sobre los datos limpios del artefacto
+            if artifact['clean_error'] is not None:
+                return {
+                    'is_valid': False,
+                    'error_message': f'Error al limpiar datos: {artifact["clean_error"]}',
+                    'columns_found': raw_columns,
+                    'rows_count': artifact['rows_count']
+                }
+
+            warnings = []
+
+            if artifact['streamed']:
+                preview_data = artifact['preview_data']
+                duplicates = artifact['duplicate_rows']
+            else:
+                cleaned_df = artifact['cleaned_df']
+                preview_data = cleaned_df.head(10)
+
                 # Verificar fechas válidas
                 if 'fecha_emision' in cleaned_df.columns:
                     invalid_dates = cleaned_df[cleaned_df['fecha_emision'].isna()].shape[0]
                     if invalid_dates > 0:
                         warnings.append(f'{invalid_dates} registros con fechas inválidas')
-                
+
                 # Verificar duplicados internos
-                duplicates = cleaned_df.duplicated(['servicio', 'fecha_emision', 'categoria']).sum()
-                if duplicates > 0:
-                    warnings.append(f'{duplicates} registros duplicados dentro del archivo')
-                
-                return {
-                    'is_valid': True,
-                    'error_message': '',
-                    'warnings': warnings,
-                    'preview_data': cleaned_df.head(10),
-                    'columns_found': list(raw_df.columns),
-                    'rows_count': len(raw_df)
-                }
-                
-            except Exception as clean_error:
-                return {
-                    'is_valid': False,
-                    'error_message': f'Error al limpiar datos: {str(clean_error)}',
-                    'columns_found': list(raw_df.columns),
-                    'rows_count': len(raw_df)
-                }
-            
+                duplicates = cleaned_df.duplicated(RECORD_KEY_COLUMNS).sum()
+
+            if duplicates > 0:
+                warnings.append(f'{duplicates} registros duplicados dentro del archivo')
+
+            return {
+                'is_valid': True,
+                'error_message': '',
+                'warnings': warnings,
+                'preview_data': preview_data,
+                'columns_found': raw_columns,
+                'rows_count': artifact['rows_count'],
+                'engine': artifact['engine']
+            }
+
         except Exception as e:
             return {
                 'is_valid': False,
                 'error_message': f'Error al validar archivo: {str(e)}',
                 'columns_found': [],
                 'rows_count': 0
-            }
\ No newline at end of file
+            }
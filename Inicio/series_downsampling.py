@@ -0,0 +1,137 @@
+"""
+Reducción de puntos de las series temporales antes de graficarlas.
+
+Con varios años de datos diarios, una traza tiene miles de puntos y el
+tamaño del JSON de la figura (serializarlo, enviarlo y dibujarlo en el
+navegador) domina el tiempo de la página. Cuando una serie supera el
+presupuesto de puntos se conserva un subconjunto que mantiene su forma:
+
+    minmax: divide la serie en cubetas y conserva el mínimo y el máximo de
+            cada una, así ningún pico ni valle se pierde
+    lttb:   Largest-Triangle-Three-Buckets, conserva en cada cubeta el punto
+            que forma el triángulo de mayor área con sus vecinos; se le
+            agregan el máximo y el mínimo globales
+
+El primer y el último punto se conservan siempre.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Puntos máximos por traza (configurable con MAYO_MAX_CHART_POINTS)
+MAX_CHART_POINTS = int(os.environ.get('MAYO_MAX_CHART_POINTS', 1500))
+
+# Método por defecto
+DOWNSAMPLING_METHOD = 'minmax'
+
+
+def _minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Posiciones del mínimo y el máximo de cada cubeta, más los extremos de la serie"""
+    n = len(y)
+    buckets = max(1, (max_points - 2) // 2)
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    starts = np.unique(edges[:-1])
+
+    # Cubeta de cada punto interior y su mínimo/máximo (fmin/fmax ignoran nulos)
+    interior = y[1:n - 1]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n - 1)))
+    selected = [np.array([0, n - 1])]
+    for reduce, values in ((np.fmin.reduceat, interior), (np.fmax.reduceat, interior)):
+        extremes = reduce(values, starts - 1)
+        hits = np.flatnonzero(values == extremes[bucket])
+        # Primera aparición del extremo en cada cubeta
+        _, first = np.unique(bucket[hits], return_index=True)
+        selected.append(hits[first] + 1)
+
+    return np.unique(np.concatenate(selected))
+
+
+def _lttb_indices(y: np.ndarray, x: np.ndarray, max_points: int) -> np.ndarray:
+    """Posiciones elegidas por Largest-Triangle-Three-Buckets"""
+    n = len(y)
+    y = np.nan_to_num(y)
+    buckets = max_points - 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+    selected = np.empty(buckets + 2, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(buckets):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Vértice siguiente: promedio de la cubeta siguiente (o el último punto)
+        if i + 1 < buckets:
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    extremes = [np.nanargmax(y), np.nanargmin(y)]
+    return np.unique(np.concatenate([selected, extremes]))
+
+
+def downsample_indices(y, max_points: int = MAX_CHART_POINTS, x=None,
+                       method: str = DOWNSAMPLING_METHOD) -> np.ndarray:
+    """
+    Elige las posiciones de una serie a graficar.
+
+    Args:
+        y: Valores de la serie, en el orden del eje X
+        max_points: Presupuesto de puntos (aproximado; mínimo 4)
+        x: Valores numéricos del eje X para 'lttb' (por defecto, la posición)
+        method: 'minmax' o 'lttb'
+
+    Returns:
+        Posiciones ordenadas; todas si la serie cabe en el presupuesto
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    max_points = max(int(max_points), 4)
+    if n <= max_points:
+        return np.arange(n)
+
+    if method == 'lttb':
+        x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+        return _lttb_indices(y, x, max_points)
+    return _minmax_indices(y, max_points)
+
+
+def downsample_frame(data: pd.DataFrame, y_column: str, max_points: int = MAX_CHART_POINTS,
+                     method: str = DOWNSAMPLING_METHOD) -> pd.DataFrame:
+    """
+    Reduce las filas de una serie ordenada por período antes de graficarla.
+
+    Args:
+        data: DataFrame ordenado por el eje X
+        y_column: Columna graficada que define los picos y valles
+        max_points: Presupuesto de puntos
+        method: 'minmax' o 'lttb' (con la posición como eje X)
+
+    Returns:
+        data si cabe en el presupuesto, o un corte con las filas elegidas
+    """
+    if len(data) <= max_points:
+        return data
+    return data.iloc[downsample_indices(data[y_column].to_numpy(), max_points, method=method)]
+
+
+def figure_payload_bytes(fig) -> int:
+    """Tamaño en bytes del JSON que se envía al navegador para una figura plotly"""
+    return len(fig.to_json().encode('utf-8'))
+
+
+def downsampling_caption(shown: int, total: int) -> Optional[str]:
+    """Texto para indicar que la gráfica muestra una serie reducida, o None"""
+    if shown >= total:
+        return None
+    return (f"Mostrando {shown:,} de {total:,} puntos (se conservan picos y valles); "
+            "active 'Resolución completa' para ver todos")
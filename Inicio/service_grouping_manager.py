@@ -1,4 +1,3 @@
-import sqlite3
 import pandas as pd
 from typing import Dict, List, Tuple, Any
 from database_manager import DatabaseManager
@@ -10,8 +9,8 @@ class ServiceGroupingManager:
     Permite crear agrupaciones como RCM → 'Expedición Diaria' y PASAPORTES ORDINARIOS → 'Pasaportes Ordinarios'
     """
     
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_path: str = None):
+        self.db_manager = DatabaseManager(db_path)
         self.grouping_rules = {
             'RCM': {
                 'grouped_name': 'RCM - Expedición Diaria',
@@ -80,12 +79,14 @@ class ServiceGroupingManager:
             True si se creó exitosamente
         """
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Crear tabla temporal para servicios agrupados
+                # Crear tabla temporal para servicios agrupados; la conexión es
+                # persistente, así que se recrea para reflejar los datos actuales
+                cursor.execute('DROP TABLE IF EXISTS temp.grouped_services_view')
                 cursor.execute('''
-                    CREATE TEMPORARY TABLE IF NOT EXISTS grouped_services_view AS
+                    CREATE TEMPORARY TABLE grouped_services_view AS
                     SELECT 
                         id,
                         CASE 
@@ -153,7 +154,7 @@ class ServiceGroupingManager:
                 ORDER BY fecha_emision DESC, ingresos_totales DESC
             '''
             
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.get_connection() as conn:
                 return pd.read_sql_query(query, conn, params=params)
                 
         except Exception as e:
@@ -204,7 +205,7 @@ class ServiceGroupingManager:
                 ORDER BY ingresos_totales DESC
             '''
             
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.get_connection() as conn:
                 return pd.read_sql_query(query, conn, params=params)
                 
         except Exception as e:
@@ -232,7 +233,7 @@ class ServiceGroupingManager:
         try:
             updated_records = 0
             
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Actualizar servicios RCM
@@ -252,6 +253,8 @@ class ServiceGroupingManager:
                 pasaportes_updated = cursor.rowcount
                 
                 updated_records = rcm_updated + pasaportes_updated
+                if updated_records:
+                    self.db_manager.bump_data_version(cursor)
                 conn.commit()
             
             return {
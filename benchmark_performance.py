@@ -0,0 +1,826 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de rendimiento del dashboard consular.
+
+Uso:
+    python benchmark_performance.py insert --rows 1000000
+    python benchmark_performance.py connections
+    python benchmark_performance.py rollup --rows 1000000
+    python benchmark_performance.py memory --rows 1000000
+    python benchmark_performance.py rerun --rows 1000000
+    python benchmark_performance.py grouping --rows 1000000
+    python benchmark_performance.py compact --rows 1000000
+    python benchmark_performance.py ingest --rows 200000
+    python benchmark_performance.py formats --rows 20000
+    python benchmark_performance.py stream --rows 200000
+    python benchmark_performance.py batch --rows 20000 --files 36
+    python benchmark_performance.py parquet --rows 200000
+    python benchmark_performance.py analytics --rows 1000000
+    python benchmark_performance.py payload --days 3650
+    python benchmark_performance.py table --rows 500000
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import argparse
+import atexit
+import logging
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+
+import numpy as np
+import pandas as pd
+
+# La caché Parquet de los benchmarks va a una carpeta temporal (también para
+# los procesos de lectura de la carga en lote)
+if 'MAYO_CACHE_DIR' not in os.environ:
+    os.environ['MAYO_CACHE_DIR'] = tempfile.mkdtemp(prefix='mayo_bench_cache_')
+    atexit.register(shutil.rmtree, os.environ['MAYO_CACHE_DIR'], ignore_errors=True)
+
+from connection_manager import connection_manager
+from data_processor import MayoDataProcessor
+from database_manager import DatabaseManager
+from enhanced_data_processor import EnhancedDataProcessor
+from file_manager import FileManager
+from paginated_table import format_page
+from parquet_cache import parquet_cache
+from robust_data_processor import RobustDataProcessor, parsed_file_cache
+from series_downsampling import MAX_CHART_POINTS, downsample_frame, figure_payload_bytes
+from service_grouping_manager import ServiceGroupingManager
+
+
+def generate_synthetic_data(n_rows, n_services=200, n_categories=5, seed=42):
+    """Genera un DataFrame limpio con la misma estructura que produce MayoDataProcessor"""
+    rng = np.random.default_rng(seed)
+
+    # Combinaciones únicas de (servicio, categoria, fecha) para no generar duplicados
+    n_days = int(np.ceil(n_rows / (n_services * n_categories))) + 1
+    combos = np.arange(n_rows)
+    service_idx = combos % n_services
+    category_idx = (combos // n_services) % n_categories
+    day_idx = combos // (n_services * n_categories)
+
+    servicios = np.array([f'SERVICIO {i:03d}' for i in range(n_services)], dtype=object)
+    categorias = np.array([f'CATEGORIA {i}' for i in range(n_categories)], dtype=object)
+    fechas = pd.Timestamp('2015-01-01') + pd.to_timedelta(day_idx % max(n_days, 1), unit='D')
+
+    costo = rng.choice([0.0, 19.0, 25.0, 40.0, 80.0], size=n_rows)
+    tramites = rng.integers(0, 50, size=n_rows)
+
+    return pd.DataFrame({
+        'servicio': servicios[service_idx],
+        'categoria': categorias[category_idx],
+        'costo_unitario': costo,
+        'num_tramites': tramites,
+        'ingresos_totales': costo * tramites,
+        'fecha_emision': fechas,
+        'formas_canceladas': rng.integers(0, 3, size=n_rows)
+    })
+
+
+def legacy_insert_rowwise(db_path, df, archivo_origen):
+    """Ruta de inserción original (iterrows + execute por fila), como referencia"""
+    inserted = 0
+    duplicates = 0
+
+    with sqlite3.connect(db_path) as conn:
+        for _, row in df.iterrows():
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO consular_data
+                (servicio, categoria, costo_unitario, num_tramites,
+                 ingresos_totales, fecha_emision, formas_canceladas, archivo_origen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                row['servicio'],
+                row['categoria'],
+                row['costo_unitario'],
+                row['num_tramites'],
+                row['ingresos_totales'],
+                row['fecha_emision'].strftime('%Y-%m-%d') if pd.notna(row['fecha_emision']) else None,
+                row.get('formas_canceladas', 0),
+                archivo_origen
+            ))
+            if cursor.rowcount > 0:
+                inserted += 1
+            else:
+                duplicates += 1
+        conn.commit()
+
+    return {'inserted': inserted, 'duplicates': duplicates}
+
+
+def benchmark_insert(rows):
+    """Compara la inserción fila por fila contra la inserción masiva"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_db = DatabaseManager(os.path.join(tmp_dir, 'legacy.db'))
+        start = time.perf_counter()
+        legacy_stats = legacy_insert_rowwise(legacy_db.db_path, df, 'sintetico.xls')
+        legacy_time = time.perf_counter() - start
+
+        bulk_db = DatabaseManager(os.path.join(tmp_dir, 'bulk.db'))
+        start = time.perf_counter()
+        bulk_stats = bulk_db.insert_data_from_dataframe(df, 'sintetico.xls')
+        bulk_time = time.perf_counter() - start
+
+        # Segunda carga del mismo archivo: todo debe contarse como duplicado
+        start = time.perf_counter()
+        reload_stats = bulk_db.insert_data_from_dataframe(df, 'sintetico.xls')
+        reload_time = time.perf_counter() - start
+
+    print(f"Fila por fila : {legacy_time:8.2f} s  ({legacy_stats['inserted']:,} insertados)")
+    print(f"Masiva        : {bulk_time:8.2f} s  ({bulk_stats['inserted']:,} insertados)")
+    print(f"Recarga masiva: {reload_time:8.2f} s  ({reload_stats['duplicates']:,} duplicados)")
+    print(f"Aceleración   : {legacy_time / max(bulk_time, 1e-9):8.1f}x")
+
+
+def simulate_page_render(db_path):
+    """Reproduce las consultas de un render de la página de análisis"""
+    processor = EnhancedDataProcessor(db_path)
+    processor.initialize_from_database()
+    date_range = processor.db_manager.get_date_range()
+    processor.initialize_from_database(date_range['fecha_min'], date_range['fecha_max'])
+    processor.get_categories_list()
+    FileManager(db_path).get_database_summary()
+    ServiceGroupingManager(db_path)
+    DatabaseManager(db_path).get_summary_stats()
+
+
+def benchmark_connections(rows):
+    """Cuenta aperturas de conexión en un render en frío y en uno posterior"""
+    opened = {'count': 0}
+    original_connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        opened['count'] += 1
+        return original_connect(*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'render.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(generate_synthetic_data(rows), 'sintetico.xls')
+
+        connection_manager.close_all()
+        connection_manager.reset_stats()
+        sqlite3.connect = counting_connect
+        try:
+            for label in ('Render en frío', 'Render siguiente'):
+                opened['count'] = 0
+                start = time.perf_counter()
+                # Cada render de Streamlit corre en su propio hilo
+                render = threading.Thread(target=simulate_page_render, args=(db_path,))
+                render.start()
+                render.join()
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"{label:16}: {opened['count']} conexiones abiertas, {elapsed:8.1f} ms")
+        finally:
+            sqlite3.connect = original_connect
+
+        print(f"Creaciones de esquema: {connection_manager.stats['schema_setups']}")
+        connection_manager.close_all()
+
+
+def raw_dashboard_queries(db):
+    """KPIs, serie mensual y promedios por día de la semana agregando filas crudas"""
+    df = db.get_all_data()
+    df = df[~df['servicio'].str.contains('COMPULSA', case=False, na=False)]
+    df['fecha_emision'] = pd.to_datetime(df['fecha_emision'])
+    daily = df.groupby('fecha_emision')[['ingresos_totales', 'num_tramites']].sum()
+    daily['ingresos_totales'].agg(['sum', 'mean', 'std'])
+    daily.groupby(daily.index.to_period('M')).sum()
+    daily.groupby(daily.index.day_name()).mean()
+
+
+def rollup_dashboard_queries(db):
+    """Las mismas consultas respondidas desde daily_service_rollup"""
+    daily = db.get_daily_totals(exclude_pattern='COMPULSA')
+    daily['fecha_emision'] = pd.to_datetime(daily['fecha_emision'])
+    daily = daily.set_index('fecha_emision')
+    daily['ingresos_totales'].agg(['sum', 'mean', 'std'])
+    daily[['ingresos_totales', 'num_tramites']].groupby(daily.index.to_period('M')).sum()
+    daily[['ingresos_totales', 'num_tramites']].groupby(daily.index.day_name()).mean()
+
+
+def benchmark_rollup(rows):
+    """Compara el costo de las consultas del dashboard sobre datos crudos y sobre el resumen"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'rollup.db'))
+        db.insert_data_from_dataframe(df, 'sintetico.xls')
+        stats = db.get_summary_stats()
+
+        timings = {}
+        for label, queries in (('Filas crudas', raw_dashboard_queries),
+                               ('Resumen diario', rollup_dashboard_queries)):
+            start = time.perf_counter()
+            queries(db)
+            timings[label] = time.perf_counter() - start
+            print(f"{label:14}: {timings[label] * 1000:10.1f} ms")
+
+        print(f"Registros     : {stats['total_registros']:,}")
+        print(f"Aceleración   : {timings['Filas crudas'] / max(timings['Resumen diario'], 1e-9):8.1f}x")
+        connection_manager.close_all(db.db_path)
+
+
+def legacy_get_filtered_data(self, start_date=None, end_date=None):
+    """_get_filtered_data original: copia completa de self.df antes de filtrar"""
+    if self.df is None or self.df.empty:
+        return pd.DataFrame()
+
+    df = self.df.copy()
+
+    if start_date:
+        df = df[df['fecha_emision'] >= start_date]
+
+    if end_date:
+        df = df[df['fecha_emision'] <= end_date]
+
+    return df
+
+
+def filtered_data_workload(processor):
+    """Llamadas que pasan por _get_filtered_data durante un render (respaldo en pandas)"""
+    processor.use_sql_pushdown = False
+    processor.get_data_by_category()
+    processor.get_data_by_service()
+    processor.get_top_services(by='ingresos')
+    processor.get_top_services(by='tramites')
+    processor.get_services_count_over_time('mes')
+    processor.get_period_timeline_data('ingresos_totales', 'dia')
+    processor.filter_by_date('2015-01-01', '2015-12-31')
+
+
+def benchmark_memory(rows):
+    """Pico de memoria (tracemalloc) de un render con y sin copias en _get_filtered_data"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'memory.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+        processor = EnhancedDataProcessor(db_path)
+        processor.initialize_from_database()
+        print(f"DataFrame del procesador: {processor.df.memory_usage(deep=True).sum() / 1e6:8.1f} MB")
+
+        variants = (
+            ('Con copia', types.MethodType(legacy_get_filtered_data, processor)),
+            ('Sin copia', processor._get_filtered_data)
+        )
+        for label, implementation in variants:
+            processor._get_filtered_data = implementation
+            tracemalloc.start()
+            start = time.perf_counter()
+            filtered_data_workload(processor)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{label:10}: pico {peak / 1e6:8.1f} MB, {elapsed:6.2f} s")
+
+        connection_manager.close_all(db_path)
+
+
+def legacy_initialize_range(processor, start_date, end_date):
+    """initialize_from_database original: relee y procesa el rango en cada rerun"""
+    processor.df = processor.db_manager.get_all_data(start_date, end_date)
+    if not processor.df.empty:
+        processor._apply_service_filters_and_grouping()
+        processor._process_temporal_columns()
+        processor._build_date_index()
+
+
+def benchmark_rerun(rows):
+    """Latencia de un cambio de rango: relectura completa de la base vs corte en memoria"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+    fechas = df['fecha_emision']
+    ranges = [(str(fecha.date()), str(fechas.max().date()))
+              for fecha in pd.date_range(fechas.min(), fechas.max(), periods=5)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'rerun.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+        processor = EnhancedDataProcessor(db_path)
+
+        start = time.perf_counter()
+        processor.initialize_from_database()
+        print(f"Carga inicial : {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+        timings = {}
+        for label in ('Relectura', 'Corte'):
+            start = time.perf_counter()
+            for start_date, end_date in ranges:
+                if label == 'Relectura':
+                    legacy_initialize_range(EnhancedDataProcessor(db_path), start_date, end_date)
+                else:
+                    processor.with_date_range(start_date, end_date)
+            timings[label] = (time.perf_counter() - start) / len(ranges)
+            print(f"{label:14}: {timings[label] * 1000:10.1f} ms por cambio de rango")
+
+        print(f"Aceleración   : {timings['Relectura'] / max(timings['Corte'], 1e-9):8.1f}x")
+        connection_manager.close_all(db_path)
+
+
+def legacy_service_grouping(processor):
+    """_apply_service_filters_and_grouping original: reglas aplicadas fila por fila"""
+    df = processor.df
+    df = df[~df['servicio'].str.contains('COMPULSA', case=False, na=False)]
+    df['servicio'] = df['servicio'].apply(processor._group_service_name)
+    processor.df = df
+
+
+def benchmark_grouping(rows):
+    """Agrupación de servicios fila por fila vs por nombres distintos"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+    names = np.array(['RCM - DURANGO - ACTAS', 'PASAPORTE ORDINARIO 3 AÑOS',
+                      'COMPULSA DE DOCUMENTOS', 'PASAPORTE COBRADO AL 50 %'], dtype=object)
+    # Un 10% de filas con nombres que activan las reglas de agrupación y exclusión
+    df.loc[::10, 'servicio'] = names[np.arange(len(df.loc[::10])) % len(names)]
+    print(f"Servicios distintos: {df['servicio'].nunique()}")
+
+    processor = EnhancedDataProcessor.__new__(EnhancedDataProcessor)
+    timings = {}
+    results = {}
+    for label, grouping in (('Fila por fila', legacy_service_grouping),
+                            ('Vectorizada', EnhancedDataProcessor._apply_service_filters_and_grouping)):
+        processor.df = df
+        start = time.perf_counter()
+        grouping(processor)
+        timings[label] = time.perf_counter() - start
+        results[label] = processor.df
+        print(f"{label:14}: {timings[label] * 1000:10.1f} ms ({len(processor.df):,} filas)")
+
+    pd.testing.assert_frame_equal(results['Fila por fila'], results['Vectorizada'], check_dtype=False)
+    print(f"Aceleración   : {timings['Fila por fila'] / max(timings['Vectorizada'], 1e-9):8.1f}x")
+
+
+def benchmark_compact(rows):
+    """Memoria del histórico y tiempo de agregaciones en pandas: modo normal vs compacto"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'compact.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+
+        for label, compact in (('Normal', False), ('Compacto', True)):
+            processor = EnhancedDataProcessor(db_path, compact=compact)
+            start = time.perf_counter()
+            processor.initialize_from_database()
+            load_time = time.perf_counter() - start
+            memory = processor.get_memory_usage()
+
+            processor.use_result_cache = False
+            start = time.perf_counter()
+            filtered_data_workload(processor)
+            groupby_time = time.perf_counter() - start
+
+            print(f"{label:9}: {memory['total_bytes'] / 1e6:8.1f} MB, carga {load_time * 1000:8.1f} ms, "
+                  f"agregaciones {groupby_time * 1000:8.1f} ms")
+            top = sorted(memory['columns'].items(), key=lambda item: -item[1])[:4]
+            print("           " + ", ".join(f"{column} {size / 1e6:.1f} MB" for column, size in top))
+
+        connection_manager.close_all(db_path)
+
+
+def write_html_export(path, df):
+    """Escribe un DataFrame limpio con el formato HTML que exporta el sistema consular"""
+    export = pd.DataFrame({
+        'Servicio': df['servicio'],
+        'Concepto': '',
+        'Articulo': df['categoria'],
+        'Derechos': df['costo_unitario'],
+        'No. de trámites': df['num_tramites'],
+        'Importe USD': df['ingresos_totales'],
+        'Fecha recaudación': df['fecha_emision'].dt.strftime('%d/%m/%Y'),
+        'No. cancelados': df['formas_canceladas']
+    })
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<html><head><meta charset="utf-8"></head><body>')
+        f.write(export.to_html(index=False))
+        f.write('</body></html>')
+
+
+def benchmark_ingest(rows):
+    """Validar y luego cargar un reporte HTML: lecturas repetidas vs artefacto compartido"""
+    print(f"Generando reporte HTML de {rows:,} filas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'reporte.xls')
+        write_html_export(path, df)
+        print(f"Tamaño del archivo: {os.path.getsize(path) / 1e6:8.1f} MB")
+
+        max_bytes = parsed_file_cache.max_bytes
+        timings = {}
+        for label, cache_bytes in (('Sin artefacto', 0), ('Con artefacto', max_bytes)):
+            parsed_file_cache.clear()
+            parquet_cache.clear()
+            parsed_file_cache.max_bytes = cache_bytes
+            manager = FileManager(os.path.join(tmp_dir, f'ingest_{cache_bytes}.db'))
+
+            start = time.perf_counter()
+            # Pestaña de carga: validar al subir y cargar al confirmar
+            manager.validate_file_structure(path)
+            result = manager.load_file_to_database(path)
+            timings[label] = time.perf_counter() - start
+            print(f"{label:14}: {timings[label]:8.2f} s ({result['stats'].get('inserted', 0):,} insertados)")
+            connection_manager.close_all(manager.db_manager.db_path)
+
+        parsed_file_cache.max_bytes = max_bytes
+        print(f"Aceleración   : {timings['Sin artefacto'] / max(timings['Con artefacto'], 1e-9):8.1f}x")
+
+
+def legacy_load_data(file_path):
+    """load_data original: xlrd, luego openpyxl y al final HTML, por excepciones"""
+    try:
+        return pd.read_excel(file_path, engine='xlrd')
+    except Exception:
+        try:
+            return pd.read_excel(file_path, engine='openpyxl')
+        except Exception:
+            return pd.read_html(file_path)[0]
+
+
+def benchmark_formats(rows, copies=3):
+    """Lectura de un corpus mixto (HTML .xls, .xlsx y mayo.xls): respaldo por excepciones vs detección"""
+    print(f"Generando corpus con reportes de {rows:,} filas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = [os.path.join(os.path.dirname(__file__), 'Inicio', 'mayo.xls')]
+        for i in range(copies):
+            html_path = os.path.join(tmp_dir, f'reporte_{i}.xls')
+            write_html_export(html_path, df)
+            corpus.append(html_path)
+        xlsx_path = os.path.join(tmp_dir, 'reporte.xlsx')
+        pd.read_html(corpus[1])[0].to_excel(xlsx_path, index=False)
+        corpus.append(xlsx_path)
+
+        engines = {}
+        timings = {}
+        for label in ('Por excepciones', 'Detección'):
+            start = time.perf_counter()
+            for path in corpus:
+                if label == 'Por excepciones':
+                    legacy_load_data(path)
+                else:
+                    processor = MayoDataProcessor(path)
+                    processor.load_data()
+                    engines[os.path.basename(path)] = processor.engine
+            timings[label] = time.perf_counter() - start
+            print(f"{label:15}: {timings[label]:8.2f} s ({len(corpus)} archivos)")
+
+        print("Lectores: " + ", ".join(f"{name} -> {engine}" for name, engine in engines.items()))
+        print(f"Ahorro         : {timings['Por excepciones'] - timings['Detección']:8.2f} s "
+              f"({timings['Por excepciones'] / max(timings['Detección'], 1e-9):.2f}x)")
+
+
+def peak_rss():
+    """RSS máximo del proceso actual en bytes (VmHWM de Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def measure_read(path, mode, queue):
+    """Lee y limpia un reporte en un proceso limpio y reporta filas, tiempo y RSS máximo"""
+    baseline = peak_rss()
+    start = time.perf_counter()
+    if mode == 'read_html':
+        rows = len(MayoDataProcessor.clean_frame(pd.read_html(path)[0]))
+    else:
+        rows = sum(len(chunk) for chunk in MayoDataProcessor(path).iter_clean_chunks())
+    elapsed = time.perf_counter() - start
+    queue.put((rows, elapsed, baseline, peak_rss()))
+
+
+def benchmark_stream(rows):
+    """Memoria máxima al leer reportes HTML de dos tamaños: read_html vs parser incremental"""
+    # lxml reserva memoria fuera del alcance de tracemalloc: se mide el RSS
+    # máximo de un proceso nuevo por lectura
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in (rows, rows * 2):
+            print(f"Generando reporte HTML de {size:,} filas...")
+            path = os.path.join(tmp_dir, f'reporte_{size}.xls')
+            write_html_export(path, generate_synthetic_data(size))
+            print(f"Tamaño del archivo: {os.path.getsize(path) / 1e6:8.1f} MB")
+
+            for mode in ('read_html', 'stream'):
+                queue = context.Queue()
+                process = context.Process(target=measure_read, args=(path, mode, queue))
+                process.start()
+                read_rows, elapsed, baseline, peak = queue.get()
+                process.join()
+                print(f"  {mode:10}: RSS máximo {peak / 1e6:8.1f} MB (base {baseline / 1e6:6.1f} MB), "
+                      f"{elapsed:6.2f} s ({read_rows:,} filas)")
+
+
+def benchmark_batch(rows, files, workers=None):
+    """Carga en lote de varios reportes HTML: en secuencia vs procesos de lectura en paralelo"""
+    print(f"Generando {files} reportes HTML de {rows:,} filas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for month in range(files):
+            # Cada mes en otro año para que ningún registro se repita entre archivos
+            monthly = df.assign(fecha_emision=df['fecha_emision'] + pd.DateOffset(years=month))
+            path = os.path.join(tmp_dir, f'reporte_{month:02d}.xls')
+            write_html_export(path, monthly)
+            paths.append(path)
+
+        workers = workers or os.cpu_count() or 1
+        print(f"Núcleos disponibles: {os.cpu_count()}")
+        timings = {}
+        for label, max_workers in (('Secuencial', 1), (f'Paralelo ({workers})', workers)):
+            parsed_file_cache.clear()
+            parquet_cache.clear()
+            manager = FileManager(os.path.join(tmp_dir, f'batch_{len(timings)}.db'))
+
+            start = time.perf_counter()
+            result = manager.batch_load_files(paths, max_workers=max_workers)
+            timings[label] = time.perf_counter() - start
+            print(f"{label:14}: {timings[label]:8.2f} s "
+                  f"({result['total_stats']['inserted']:,} insertados, {len(result['failed_files'])} fallidos)")
+            connection_manager.close_all(manager.db_manager.db_path)
+
+        sequential, parallel = timings.values()
+        print(f"Aceleración   : {sequential / max(parallel, 1e-9):8.2f}x")
+
+
+def benchmark_parquet(rows):
+    """Volver a validar y limpiar un reporte ya leído: archivo original vs caché Parquet"""
+    print(f"Generando reporte HTML de {rows:,} filas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'reporte.xls')
+        write_html_export(path, df)
+        print(f"Tamaño del archivo: {os.path.getsize(path) / 1e6:8.1f} MB")
+        parquet_cache.clear()
+
+        timings = {}
+        for label in ('Archivo original', 'Caché Parquet'):
+            # Sin la caché en memoria, como en otra sesión del dashboard
+            parsed_file_cache.clear()
+            start = time.perf_counter()
+            processor = RobustDataProcessor(path)
+            processor.validate_structure()
+            cleaned = processor.load_and_clean_data()
+            timings[label] = time.perf_counter() - start
+            print(f"{label:16}: {timings[label]:8.2f} s ({len(cleaned):,} filas)")
+
+        stats = parquet_cache.get_stats()
+        print(f"Caché en disco  : {stats['bytes'] / 1e6:8.1f} MB")
+        print(f"Aceleración     : {timings['Archivo original'] / max(timings['Caché Parquet'], 1e-9):8.1f}x")
+
+
+def legacy_chart_series(processor, grouping, service_name):
+    """Series de las gráficas de análisis como se calculaban antes: filtro y agrupación por gráfica"""
+    df = processor.df
+    processor.aggregate_by_period(processor.get_daily_totals(), grouping, ['ingresos_totales', 'num_tramites'])
+    processor.aggregate_by_period(df[df['categoria'].str.contains('PASAPORTES', na=False)],
+                                  grouping, ['num_tramites'])
+    processor.aggregate_by_period(df[df['servicio'].str.contains('RCM|MATRÍCULA|MATRICULA', na=False, case=False)],
+                                  grouping, ['num_tramites'])
+    processor.aggregate_by_period(df[df['servicio'] == service_name], grouping, ['ingresos_totales'])
+
+
+def engine_chart_series(processor, grouping, service_name):
+    """Series de las gráficas de análisis con las claves de período calculadas al cargar"""
+    processor.get_period_series(grouping, ('ingresos_totales', 'num_tramites'))
+    processor.get_period_series(grouping, ('num_tramites',), categoria_contains='PASAPORTES')
+    processor.get_period_series(grouping, ('num_tramites',), servicio_pattern='RCM|MATRÍCULA|MATRICULA')
+    processor.get_period_series(grouping, ('ingresos_totales',), servicio=service_name)
+
+
+def benchmark_analytics(rows):
+    """Datos de las gráficas temporales de la página de análisis en las tres agrupaciones"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+    # Nombres que reconocen las gráficas de pasaportes y matrículas
+    df['categoria'] = df['categoria'].replace({'CATEGORIA 0': 'PASAPORTES'})
+    df.loc[df['servicio'].isin(['SERVICIO 001', 'SERVICIO 002']), 'servicio'] = 'RCM - DURANGO - ACTAS'
+    service_name = 'SERVICIO 003'
+    groupings = ('Diaria', 'Mensual', 'Anual')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'analytics.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+
+        for compact in (False, True):
+            processor = EnhancedDataProcessor(db_path, compact=compact)
+            processor.initialize_from_database()
+            start = time.perf_counter()
+            processor._compute_period_keys(processor.df)
+            keys_time = time.perf_counter() - start
+            print(f"{'Compacto' if compact else 'Normal'} (claves de período al cargar: {keys_time * 1000:.1f} ms)")
+
+            timings = {}
+            processor.use_result_cache = False
+            for label, workload in (('Por gráfica', legacy_chart_series), ('Motor', engine_chart_series)):
+                start = time.perf_counter()
+                for grouping in groupings:
+                    workload(processor, grouping, service_name)
+                timings[label] = time.perf_counter() - start
+
+            # Rerun con la misma selección: resultados memorizados
+            processor.use_result_cache = True
+            for grouping in groupings:
+                engine_chart_series(processor, grouping, service_name)
+            start = time.perf_counter()
+            for grouping in groupings:
+                engine_chart_series(processor, grouping, service_name)
+            timings['Motor (rerun)'] = time.perf_counter() - start
+
+            for label, elapsed in timings.items():
+                print(f"  {label:14}: {elapsed * 1000:10.1f} ms")
+            print(f"  Aceleración   : {timings['Por gráfica'] / max(timings['Motor'], 1e-9):8.1f}x")
+
+        connection_manager.close_all(db_path)
+
+
+def benchmark_payload(days):
+    """JSON de las gráficas diarias de ingresos con todos los puntos vs reducidas"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # Diez servicios por día: el histórico cubre 'days' días
+    df = generate_synthetic_data(days * 10, n_services=10, n_categories=1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'payload.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+        processor = EnhancedDataProcessor(db_path)
+        processor.initialize_from_database()
+
+        charts = (
+            ('Evolución de ingresos', processor.get_period_series('Diaria', ('ingresos_totales', 'num_tramites')),
+             lambda data: px.line(data, x='periodo', y='ingresos_totales', markers=True)),
+            ('Análisis temporal', processor.get_temporal_data('dia'),
+             lambda data: go.Figure(go.Scatter(x=data.iloc[:, 0].astype(str), y=data['ingresos_totales'])))
+        )
+        print(f"Presupuesto: {MAX_CHART_POINTS:,} puntos por traza")
+        for name, data, build in charts:
+            print(f"{name} ({len(data):,} días)")
+            build(data.head(2)).to_json()   # Calentar plotly
+            sizes = {}
+            for label, plot_data in (('Completa', data), ('Reducida', downsample_frame(data, 'ingresos_totales'))):
+                start = time.perf_counter()
+                fig = build(plot_data)
+                sizes[label] = figure_payload_bytes(fig)
+                elapsed = time.perf_counter() - start
+                print(f"  {label:9}: {len(plot_data):6,} puntos, {sizes[label] / 1024:8.1f} KB, "
+                      f"figura y JSON {elapsed * 1000:7.1f} ms")
+            print(f"  Reducción: {sizes['Completa'] / max(sizes['Reducida'], 1):6.1f}x")
+
+        connection_manager.close_all(db_path)
+
+
+def legacy_detail_table(processor):
+    """Tabla detallada anterior: todos los registros, montos formateados con .apply"""
+    display_df = processor.df.copy()
+    display_df['ingresos_totales'] = display_df['ingresos_totales'].apply(lambda x: f"${x:,.2f}")
+    display_df['costo_unitario'] = display_df['costo_unitario'].apply(lambda x: f"${x:,.2f}")
+    return display_df
+
+
+def benchmark_table(rows):
+    """Tabla de datos detallados: frame completo formateado vs página resuelta en SQL"""
+    print(f"Generando {rows:,} filas sintéticas...")
+    df = generate_synthetic_data(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'table.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'sintetico.xls')
+        processor = EnhancedDataProcessor(db_path)
+        processor.initialize_from_database()
+        processor.use_result_cache = False
+        total = len(processor.df)
+
+        start = time.perf_counter()
+        shown = legacy_detail_table(processor)
+        print(f"{'Frame completo':22}: {(time.perf_counter() - start) * 1000:10.1f} ms, {len(shown):,} filas enviadas")
+
+        pages = (
+            ('Primera página', {}),
+            ('Página intermedia', {'page': total // 100}),
+            ('Orden por servicio', {'sort_by': 'servicio', 'descending': False}),
+            ('Orden por ingresos', {'sort_by': 'ingresos_totales'}),
+            ('Búsqueda', {'search': 'SERVICIO 01'}),
+        )
+        for label, params in pages:
+            start = time.perf_counter()
+            result = processor.get_data_page(page_size=50, **params)
+            format_page(result['data'])
+            elapsed = time.perf_counter() - start
+            print(f"{label:22}: {elapsed * 1000:10.1f} ms, {len(result['data']):,} filas de {result['total']:,}")
+
+        connection_manager.close_all(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del dashboard consular")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    insert_parser = subparsers.add_parser('insert', help='Inserción masiva vs fila por fila')
+    insert_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    connections_parser = subparsers.add_parser('connections', help='Aperturas de conexión por render')
+    connections_parser.add_argument('--rows', type=int, default=50_000)
+
+    rollup_parser = subparsers.add_parser('rollup', help='Consultas del dashboard: crudas vs resumen diario')
+    rollup_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    memory_parser = subparsers.add_parser('memory', help='Pico de memoria del filtrado por fecha')
+    memory_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    rerun_parser = subparsers.add_parser('rerun', help='Cambio de rango: relectura vs corte en memoria')
+    rerun_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    grouping_parser = subparsers.add_parser('grouping', help='Agrupación de servicios: fila por fila vs vectorizada')
+    grouping_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    compact_parser = subparsers.add_parser('compact', help='Memoria y agregaciones: modo normal vs compacto')
+    compact_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Validar y cargar un reporte HTML')
+    ingest_parser.add_argument('--rows', type=int, default=200_000)
+
+    formats_parser = subparsers.add_parser('formats', help='Lectura de un corpus mixto de formatos')
+    formats_parser.add_argument('--rows', type=int, default=20_000)
+
+    stream_parser = subparsers.add_parser('stream', help='Memoria al leer reportes HTML grandes')
+    stream_parser.add_argument('--rows', type=int, default=200_000)
+
+    batch_parser = subparsers.add_parser('batch', help='Carga en lote: secuencial vs procesos en paralelo')
+    batch_parser.add_argument('--rows', type=int, default=20_000)
+    batch_parser.add_argument('--files', type=int, default=36)
+    batch_parser.add_argument('--workers', type=int, default=None)
+
+    parquet_parser = subparsers.add_parser('parquet', help='Relectura de un reporte: original vs caché Parquet')
+    parquet_parser.add_argument('--rows', type=int, default=200_000)
+
+    analytics_parser = subparsers.add_parser('analytics', help='Series de las gráficas de análisis: por gráfica vs motor')
+    analytics_parser.add_argument('--rows', type=int, default=1_000_000)
+
+    payload_parser = subparsers.add_parser('payload', help='JSON de las gráficas diarias: completa vs reducida')
+    payload_parser.add_argument('--days', type=int, default=3650)
+
+    table_parser = subparsers.add_parser('table', help='Tabla de datos detallados: frame completo vs paginada')
+    table_parser.add_argument('--rows', type=int, default=500_000)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.benchmark == 'insert':
+        benchmark_insert(args.rows)
+    elif args.benchmark == 'connections':
+        benchmark_connections(args.rows)
+    elif args.benchmark == 'rollup':
+        benchmark_rollup(args.rows)
+    elif args.benchmark == 'memory':
+        benchmark_memory(args.rows)
+    elif args.benchmark == 'rerun':
+        benchmark_rerun(args.rows)
+    elif args.benchmark == 'grouping':
+        benchmark_grouping(args.rows)
+    elif args.benchmark == 'compact':
+        benchmark_compact(args.rows)
+    elif args.benchmark == 'ingest':
+        benchmark_ingest(args.rows)
+    elif args.benchmark == 'formats':
+        benchmark_formats(args.rows)
+    elif args.benchmark == 'stream':
+        benchmark_stream(args.rows)
+    elif args.benchmark == 'batch':
+        benchmark_batch(args.rows, args.files, args.workers)
+    elif args.benchmark == 'parquet':
+        benchmark_parquet(args.rows)
+    elif args.benchmark == 'analytics':
+        benchmark_analytics(args.rows)
+    elif args.benchmark == 'payload':
+        benchmark_payload(args.days)
+    elif args.benchmark == 'table':
+        benchmark_table(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Configuración común de pytest: la caché Parquet de archivos leídos se guarda en
+una carpeta temporal, no en la del dashboard.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+if 'MAYO_CACHE_DIR' not in os.environ:
+    os.environ['MAYO_CACHE_DIR'] = tempfile.mkdtemp(prefix='mayo_cache_')
+    atexit.register(shutil.rmtree, os.environ['MAYO_CACHE_DIR'], ignore_errors=True)
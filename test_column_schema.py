@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests de la resolución de columnas y la conversión de tipos del reporte
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+
+import pandas as pd
+
+import column_schema
+from column_schema import parse_count, parse_currency, resolve_columns
+from data_processor import MayoDataProcessor
+from robust_data_processor import RobustDataProcessor, parsed_file_cache
+
+
+def test_header_variants_resolve_once():
+    """Acentos, mayúsculas, espacios y mojibake resuelven a las mismas columnas, una vez por diseño"""
+    layouts = [
+        ['Servicio', 'Articulo', 'Derechos', 'No. de trámites', 'Importe USD', 'Fecha recaudación'],
+        ['SERVICIO', 'ARTÍCULO', 'derechos', 'No.  de  tramites', 'importe usd', 'Fecha recaudacion'],
+        ['Servicio', 'Artículo', 'Derechos', 'No. de tr�mites', 'Importe USD', 'Fecha recaudaci�n'],
+        ['Servicio', 'ArtÃ\xadculo', 'Derechos', 'No. de trÃ¡mites', 'Importe USD', 'Fecha recaudaciÃ³n'],
+    ]
+    column_schema._resolve_signature.cache_clear()
+    for headers in layouts:
+        resolution = resolve_columns(headers)
+        assert resolution.missing == (), headers
+        assert list(resolution.rename.values()) == ['servicio', 'categoria', 'costo_unitario',
+                                                    'num_tramites', 'ingresos_totales', 'fecha_emision']
+
+    # El mismo diseño otra vez: solo se consulta la caché
+    for headers in layouts:
+        resolve_columns(headers)
+    info = column_schema._resolve_signature.cache_info()
+    assert (info.misses, info.hits) == (len(layouts), len(layouts))
+
+    assert resolve_columns(['Servicio', 'Derechos']).missing == (
+        'categoria', 'num_tramites', 'ingresos_totales', 'fecha_emision')
+
+
+def test_typed_conversion():
+    """Importes en texto se leen de forma vectorizada y los conteos quedan enteros si se puede"""
+    currency = parse_currency(pd.Series(['$1,234.00', 'USD 80', '', None, 'n/a']))
+    assert currency.dtype == 'float64'
+    assert currency.iloc[:2].tolist() == [1234.0, 80.0]
+    assert currency.iloc[2:].isna().all()
+
+    assert parse_count(pd.Series(['1,200', '3'])).tolist() == [1200, 3]
+    assert parse_count(pd.Series(['1,200', '3'])).dtype == 'int64'
+    assert parse_count(pd.Series([1.0, None])).dtype == 'float64'
+
+
+def test_validation_and_cleaning_agree():
+    """Un encabezado que la validación acepta también se limpia (antes la limpieza fallaba)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'junio.xls')
+        pd.DataFrame({
+            'SERVICIO': ['VISAS', 'VISAS'],
+            'Artículo': ['VISAS', 'VISAS'],
+            'Derechos': ['$25.00', '$25.00'],
+            'No. de tramites': [2, 3],
+            'Importe USD': ['$50.00', '$75.00'],
+            'Fecha recaudacion': ['01/06/2025', '02/06/2025']
+        }).to_html(path, index=False)
+        parsed_file_cache.clear()
+
+        validation = RobustDataProcessor(path).validate_structure()
+        assert validation['is_valid'], validation['error_message']
+
+        df = MayoDataProcessor.clean_frame(pd.read_html(path)[0])
+        assert df['ingresos_totales'].tolist() == [50.0, 75.0]
+        assert df['formas_canceladas'].tolist() == [0, 0]
+        assert df['fecha_emision'].dt.day.tolist() == [1, 2]
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la resolución de columnas...")
+    for test in (test_header_variants_resolve_once, test_typed_conversion,
+                 test_validation_and_cleaning_agree):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Tests del gestor de base de datos (inserción masiva y conteos)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+from connection_manager import connection_manager
+from database_manager import DatabaseManager
+
+
+def make_sample_data():
+    """Crea un DataFrame limpio similar al que produce MayoDataProcessor"""
+    return pd.DataFrame({
+        'servicio': ['PASAPORTE ORDINARIO', 'RCM - DURANGO - ACTAS', 'VISAS', 'VISAS'],
+        'categoria': ['PASAPORTES', 'ART. 22', 'VISAS', 'VISAS'],
+        'costo_unitario': [80.0, 19.0, 25.0, 25.0],
+        'num_tramites': [3, 1, 2, 4],
+        'ingresos_totales': [240.0, 19.0, 50.0, 100.0],
+        'fecha_emision': pd.to_datetime(['2025-05-01', '2025-05-01', '2025-05-02', '2025-05-03']),
+        'formas_canceladas': [0, 1, 0, 0]
+    })
+
+
+def test_bulk_insert_counts():
+    """La inserción masiva reporta insertados, duplicados y errores correctamente"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'test.db'))
+        df = make_sample_data()
+
+        stats = db.insert_data_from_dataframe(df, 'mayo.xls')
+        assert stats == {'inserted': 4, 'duplicates': 0, 'errors': 0, 'total_processed': 4}
+
+        stats = db.insert_data_from_dataframe(df, 'mayo.xls')
+        assert stats == {'inserted': 0, 'duplicates': 4, 'errors': 0, 'total_processed': 4}
+
+        data = db.get_all_data()
+        assert len(data) == 4
+        assert sorted(data['fecha_emision'].unique()) == ['2025-05-01', '2025-05-02', '2025-05-03']
+        assert data['ingresos_totales'].sum() == 409.0
+
+
+def test_bulk_insert_invalid_rows():
+    """Filas sin fecha o sin servicio se cuentan como errores y los NaN se guardan como NULL"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'test.db'))
+        df = make_sample_data()
+        df.loc[0, 'fecha_emision'] = pd.NaT
+        df.loc[1, 'servicio'] = None
+        df.loc[2, 'costo_unitario'] = float('nan')
+
+        stats = db.insert_data_from_dataframe(df, 'mayo.xls')
+        assert stats['inserted'] == 2
+        assert stats['errors'] == 2
+        assert stats['duplicates'] == 0
+
+        data = db.get_all_data()
+        assert data['costo_unitario'].isna().sum() == 1
+
+
+def test_upsert_overwrites_changed_rows():
+    """El modo sobrescribir inserta, actualiza y detecta registros sin cambios"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'test.db'))
+        db.insert_data_from_dataframe(make_sample_data(), 'mayo.xls')
+
+        corrected = make_sample_data()
+        corrected.loc[0, 'num_tramites'] = 5
+        corrected.loc[0, 'ingresos_totales'] = 400.0
+        extra = corrected.iloc[[3]].assign(fecha_emision=pd.Timestamp('2025-05-04'))
+        repeated = corrected.iloc[[2]]
+        corrected = pd.concat([corrected, extra, repeated], ignore_index=True)
+
+        stats = db.upsert_data_from_dataframe(corrected, 'mayo.xls')
+        assert stats['inserted'] == 1
+        assert stats['updated'] == 1
+        assert stats['unchanged'] == 3
+        assert stats['duplicates'] == 1
+        assert stats['errors'] == 0
+
+        data = db.get_all_data()
+        assert len(data) == 5
+        pasaporte = data[data['servicio'] == 'PASAPORTE ORDINARIO'].iloc[0]
+        assert pasaporte['num_tramites'] == 5
+        assert pasaporte['ingresos_totales'] == 400.0
+
+        # El historial conserva un solo registro por archivo sobrescrito
+        assert (db.get_files_history()['nombre_archivo'] == 'mayo.xls').sum() == 1
+
+        # Una clave repetida en un bloque posterior se queda con la primera aparición
+        first = make_sample_data().iloc[[0]].assign(num_tramites=7)
+        second = pd.concat([make_sample_data().iloc[[0]].assign(num_tramites=9), make_sample_data().iloc[[1]]])
+        stats = db.upsert_data_from_chunks([first, second], 'mayo.xls')
+        assert (stats['updated'], stats['unchanged'], stats['duplicates']) == (1, 1, 1)
+        data = db.get_all_data()
+        assert data.loc[data['servicio'] == 'PASAPORTE ORDINARIO', 'num_tramites'].tolist() == [7]
+
+
+def test_connection_reuse_per_thread():
+    """Cada hilo reutiliza una sola conexión y el esquema se crea una vez por ruta"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        setups_before = connection_manager.stats['schema_setups']
+
+        first = DatabaseManager(db_path)
+        second = DatabaseManager(db_path)
+        assert first.get_connection() is second.get_connection()
+        assert connection_manager.stats['schema_setups'] == setups_before + 1
+
+        journal_mode = first.get_connection().execute('PRAGMA journal_mode').fetchone()[0]
+        assert journal_mode.lower() == 'wal'
+
+        other_thread = {}
+        worker = threading.Thread(target=lambda: other_thread.update(conn=DatabaseManager(db_path).get_connection()))
+        worker.start()
+        worker.join()
+        assert other_thread['conn'] is not first.get_connection()
+
+        # close_all no cierra la conexión de otro hilo a mitad de una consulta;
+        # ese hilo la reemplaza en su siguiente get_connection
+        in_query, invalidated, results = threading.Event(), threading.Event(), {}
+
+        def query_during_close_all():
+            conn = DatabaseManager(db_path).get_connection()
+            in_query.set()
+            invalidated.wait()
+            results['count'] = conn.execute('SELECT COUNT(*) FROM consular_data').fetchone()[0]
+            results['reopened'] = DatabaseManager(db_path).get_connection() is not conn
+
+        worker = threading.Thread(target=query_during_close_all)
+        worker.start()
+        in_query.wait()
+        own = first.get_connection()
+        connection_manager.close_all(db_path)
+        invalidated.set()
+        worker.join()
+        assert results == {'count': 0, 'reopened': True}
+        assert first.get_connection() is not own
+
+        connection_manager.close_all(db_path)
+
+
+def rollup_snapshot(db):
+    """Resumen diario ordenado para comparar contra una reconstrucción completa"""
+    rollup = db.get_daily_rollup()
+    return rollup.sort_values(['fecha_emision', 'servicio', 'categoria']).reset_index(drop=True)
+
+
+def test_daily_rollup_tracks_writes():
+    """El resumen diario se mantiene al insertar, sobrescribir, eliminar y agrupar"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'test.db'))
+        df = make_sample_data()
+        df.loc[3, 'servicio'] = 'PASAPORTE COBRADO AL 50%'
+        db.insert_data_from_dataframe(df, 'mayo.xls')
+
+        rollup = db.get_daily_rollup()
+        assert len(rollup) == 4
+        assert set(rollup['servicio']) == {'Pasaportes Ordinarios', 'RCM - Expedición Diaria', 'VISAS'}
+        assert rollup['registros'].sum() == 4
+        assert rollup['ingresos_totales'].sum() == 409.0
+
+        extra = make_sample_data().assign(fecha_emision=pd.Timestamp('2025-05-01'), categoria='OTRA')
+        db.insert_data_from_dataframe(extra, 'junio.xls')
+        corrected = make_sample_data()
+        corrected.loc[2, 'ingresos_totales'] = 75.0
+        db.upsert_data_from_dataframe(corrected, 'mayo.xls')
+        db.delete_data_by_file('junio.xls')
+
+        from service_grouping_manager import ServiceGroupingManager
+        ServiceGroupingManager(db.db_path).apply_permanent_grouping(confirm=True)
+
+        incremental = rollup_snapshot(db)
+        db.rebuild_daily_rollup()
+        pd.testing.assert_frame_equal(incremental, rollup_snapshot(db))
+
+        stats = db.get_summary_stats()
+        assert stats['total_registros'] == 5
+        assert stats['ingresos_totales'] == 534.0
+
+
+def test_processor_kpis_match_pandas():
+    """Los KPIs y series del procesador coinciden con la agregación en pandas"""
+    from enhanced_data_processor import EnhancedDataProcessor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        df = make_sample_data()
+        compulsa = df.iloc[[0]].assign(servicio='COMPULSA RCM', ingresos_totales=999.0)
+        DatabaseManager(db_path).insert_data_from_dataframe(pd.concat([df, compulsa]), 'mayo.xls')
+
+        processor = EnhancedDataProcessor(db_path)
+        assert processor.initialize_from_database('2025-05-01', '2025-05-02')
+        expected = processor.df.groupby('fecha_emision')['ingresos_totales'].sum()
+
+        kpis = processor.get_kpis()
+        assert kpis['total_ingresos'] == expected.sum() == 309.0
+        assert kpis['ingreso_diario_promedio'] == expected.mean()
+        assert kpis['ingreso_diario_std'] == expected.std()
+        assert processor.get_summary_stats()['total_registros'] == len(processor.df)
+
+        monthly = processor.get_temporal_data('mes')
+        assert len(monthly) == 1
+        assert monthly['registros'].iloc[0] == 3
+        assert monthly['ingresos_totales'].iloc[0] == 309.0
+
+        service = processor.get_service_temporal_data('Pasaportes Ordinarios', 'dia')
+        assert service['num_tramites'].tolist() == [3]
+
+
+def test_files_table_migration():
+    """Las bases anteriores reciben las columnas de firma sin perder su historial"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'antigua.db')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('''
+                CREATE TABLE archivos_cargados (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nombre_archivo TEXT NOT NULL,
+                    ruta_archivo TEXT NOT NULL,
+                    fecha_carga TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    registros_insertados INTEGER,
+                    registros_duplicados INTEGER,
+                    estado TEXT DEFAULT 'success'
+                )
+            ''')
+            conn.execute("INSERT INTO archivos_cargados (nombre_archivo, ruta_archivo) VALUES ('abril.xls', 'abril.xls')")
+        conn.close()
+
+        db = DatabaseManager(db_path)
+        signature = {'tamaño_bytes': 10, 'fecha_modificacion': 1.5, 'hash_contenido': 'abc'}
+        db.insert_data_from_dataframe(make_sample_data(), 'mayo.xls', signature)
+
+        index = db.get_loaded_files_index()
+        assert index['names'] == {'abril.xls', 'mayo.xls'}
+        assert index['hashes'] == {'abc': 'mayo.xls'}
+        assert index['signatures']['mayo.xls'] == signature
+        assert db.find_loaded_file('copia.xls', 'abc') == 'mayo.xls'
+        assert db.find_loaded_file('abril.xls') == 'abril.xls'
+        assert db.find_loaded_file('junio.xls', 'otro') is None
+        connection_manager.close_all(db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests del gestor de base de datos...")
+    for test in (test_bulk_insert_counts, test_bulk_insert_invalid_rows,
+                 test_upsert_overwrites_changed_rows, test_connection_reuse_per_thread,
+                 test_daily_rollup_tracks_writes, test_processor_kpis_match_pandas,
+                 test_files_table_migration):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Tests de la reconstrucción completa de la base de datos
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+import database_rebuild
+from connection_manager import connection_manager
+from database_manager import SWAP_LOCK_TIMEOUT, DatabaseManager
+from database_rebuild import rebuild_database
+from file_manager import FileManager
+from parquet_cache import parquet_cache
+from robust_data_processor import parsed_file_cache
+from test_file_manager import write_html_export
+
+
+def load_month_files(tmp_dir):
+    """Carga dos reportes (el segundo sobrescribiendo) y devuelve el gestor"""
+    manager = FileManager(os.path.join(tmp_dir, 'consular.db'))
+    for name, days, overwrite in (('abril.xls', 3, False), ('mayo.xls', 5, True)):
+        path = os.path.join(tmp_dir, 'entrada', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_html_export(path, days=days)
+        result = manager.load_file_to_database(path, overwrite_duplicates=overwrite)
+        assert result['success'], result['message']
+    # Los archivos originales ya no están (cargas desde archivos temporales)
+    shutil.rmtree(os.path.join(tmp_dir, 'entrada'))
+    return manager
+
+
+def test_rebuild_restores_source_data():
+    """La base reconstruida tiene los datos de los archivos, no las modificaciones posteriores"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parsed_file_cache.clear()
+        manager = load_month_files(tmp_dir)
+        db = manager.db_manager
+        expected = db.get_all_data().drop(columns=['fecha_carga'])
+        files = [(f['nombre_archivo'], f['modo_carga'], f['hash_contenido']) for f in db.get_loaded_files()]
+        assert [f[1] for f in files] == ['insert', 'upsert']
+
+        # Modificación destructiva, como aplicar la agrupación permanente
+        with db.get_connection() as conn:
+            conn.execute("UPDATE consular_data SET servicio = 'Pasaportes Ordinarios' WHERE servicio LIKE 'PASAPORTE%'")
+            conn.commit()
+        version = db.get_data_version()
+
+        progress = []
+        result = rebuild_database(db.db_path, max_workers=2,
+                                  progress_callback=lambda done, total, name: progress.append((done, total, name)))
+        assert result['success'], result['message']
+        assert progress == [(1, 2, 'abril.xls'), (2, 2, 'mayo.xls')]
+        assert set(result['timings']) == {'inventario', 'lectura', 'escritura', 'verificacion', 'intercambio'}
+
+        # El mismo gestor ve la base nueva
+        assert db.get_data_version() == version + 1 == result['data_version']
+        rebuilt = db.get_all_data().drop(columns=['fecha_carga'])
+        pd.testing.assert_frame_equal(rebuilt, expected)
+        assert [(f['nombre_archivo'], f['modo_carga'], f['hash_contenido'])
+                for f in db.get_loaded_files()] == files
+        assert db.get_summary_stats()['total_registros'] == 10
+        assert not os.path.exists(db.db_path + '.rebuild')
+        connection_manager.close_all(db.db_path)
+
+
+def test_rebuild_sources_and_failures():
+    """Sin copia archivada se usa la caché Parquet; sin ninguna fuente la base queda intacta"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parsed_file_cache.clear()
+        manager = load_month_files(tmp_dir)
+        db = manager.db_manager
+        shutil.rmtree(manager.archive_dir)
+
+        # Solo la caché Parquet
+        result = rebuild_database(db.db_path, max_workers=1)
+        assert result['success'], result['message']
+        assert db.get_summary_stats()['total_registros'] == 10
+
+        # Ninguna fuente: no se reconstruye
+        parquet_cache.clear()
+        version = db.get_data_version()
+        result = rebuild_database(db.db_path, max_workers=1)
+        assert not result['success']
+        assert result['missing_files'] == ['abril.xls', 'mayo.xls']
+        assert db.get_data_version() == version
+
+        # Un cambio en la base durante la reconstrucción la cancela
+        write_html_export(os.path.join(tmp_dir, 'junio.xls'), days=2)
+        assert manager.load_file_to_database(os.path.join(tmp_dir, 'junio.xls'))['success']
+        parsed_file_cache.clear()
+        result = rebuild_database(db.db_path, max_workers=1, skip_missing=True,
+                                  progress_callback=lambda *args: db.delete_data_by_file('abril.xls'))
+        assert not result['success']
+        assert 'cambió' in result['message']
+        # Se conserva la base con la eliminación (los 6 registros de abril)
+        assert db.get_summary_stats()['total_registros'] == 4
+        connection_manager.close_all(db.db_path)
+
+
+def open_handles(path):
+    """Rutas abiertas por este proceso que empiezan con path (solo Linux)"""
+    fd_dir = '/proc/self/fd'
+    handles = []
+    for fd in os.listdir(fd_dir):
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.startswith(path):
+            handles.append(target)
+    return handles
+
+
+def test_swap_lock_rejects_writes():
+    """Con el archivo de bloqueo no se escribe, y el reemplazo se hace sin la base abierta"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parsed_file_cache.clear()
+        manager = load_month_files(tmp_dir)
+        db = manager.db_manager
+        lock_path = db.db_path + database_rebuild.SWAP_LOCK_SUFFIX
+
+        # Un intercambio en curso: las escrituras y otra reconstrucción se rechazan
+        open(lock_path, 'w').close()
+        try:
+            db.delete_data_by_file('abril.xls')
+            raise AssertionError('La eliminación debió rechazarse')
+        except sqlite3.OperationalError:
+            pass
+        assert db.get_summary_stats()['total_registros'] == 10
+        assert not rebuild_database(db.db_path, max_workers=1)['success']
+        assert os.path.exists(lock_path)
+
+        # Un bloqueo vencido no impide escribir ni reconstruir
+        stale = time.time() - SWAP_LOCK_TIMEOUT - 1
+        os.utime(lock_path, (stale, stale))
+        assert db.delete_data_by_file('abril.xls') == 6
+
+        replace = os.replace
+        seen = {}
+
+        def checked_replace(src, dst):
+            if os.path.isdir('/proc/self/fd'):
+                seen['handles'] = open_handles(dst)
+            replace(src, dst)
+
+        database_rebuild.os.replace = checked_replace
+        try:
+            result = rebuild_database(db.db_path, max_workers=1, skip_missing=True)
+        finally:
+            database_rebuild.os.replace = replace
+        assert result['success'], result['message']
+        assert seen.get('handles', []) == []
+        assert not os.path.exists(lock_path)
+        assert db.get_summary_stats()['total_registros'] == 10
+        connection_manager.close_all(db.db_path)
+
+
+def serve_database(db_path, requests, replies):
+    """Otro proceso (como el dashboard) con la base abierta: responde versión y registros"""
+    db = DatabaseManager(db_path)
+    for command in iter(requests.get, None):
+        if command == 'eliminar':
+            db.delete_data_by_file('abril.xls')
+        replies.put((db.get_data_version(), db.get_summary_stats()['total_registros']))
+
+
+def test_other_process_sees_rebuilt_database():
+    """Un proceso con la base abierta lee y escribe la base reconstruida, no la reemplazada"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parsed_file_cache.clear()
+        manager = load_month_files(tmp_dir)
+        db = manager.db_manager
+        version = db.get_data_version()
+
+        context = multiprocessing.get_context('spawn')
+        requests, replies = context.Queue(), context.Queue()
+        process = context.Process(target=serve_database, args=(db.db_path, requests, replies))
+        process.start()
+        try:
+            requests.put('leer')
+            assert replies.get(timeout=60) == (version, 10)
+
+            result = rebuild_database(db.db_path, max_workers=1)
+            assert result['success'], result['message']
+            requests.put('leer')
+            assert replies.get(timeout=60) == (version + 1, 10)
+
+            # Lo que escribe ese proceso queda en la base nueva
+            requests.put('eliminar')
+            assert replies.get(timeout=60) == (version + 2, 4)
+            assert (db.get_data_version(), db.get_summary_stats()['total_registros']) == (version + 2, 4)
+        finally:
+            requests.put(None)
+            process.join(timeout=60)
+
+        # Una escritura que empezó sobre la base reemplazada (con la conexión de
+        # otro hilo, que el intercambio no cierra) se rechaza
+        opened, swapped, results = threading.Event(), threading.Event(), {}
+
+        def write_after_swap():
+            conn = db.get_connection()
+            opened.set()
+            swapped.wait()
+            try:
+                db.bump_data_version(conn.cursor())
+                results['rejected'] = False
+            except sqlite3.OperationalError:
+                conn.rollback()
+                results['rejected'] = True
+            results['reopened'] = db.get_connection() is not conn
+
+        worker = threading.Thread(target=write_after_swap)
+        worker.start()
+        opened.wait()
+        assert rebuild_database(db.db_path, max_workers=1, skip_missing=True)['success']
+        swapped.set()
+        worker.join()
+        assert results == {'rejected': True, 'reopened': True}
+        connection_manager.close_all(db.db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la reconstrucción de la base...")
+    for test in (test_rebuild_restores_source_data, test_rebuild_sources_and_failures,
+                 test_swap_lock_rejects_writes, test_other_process_sees_rebuilt_database):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Tests del procesador de datos (filtrado por fecha sin copias)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from connection_manager import connection_manager
+from database_manager import DatabaseManager
+from enhanced_data_processor import EnhancedDataProcessor, get_shared_processor, clear_shared_processors
+from result_cache import ResultCache, result_cache
+
+
+def make_processor(tmp_dir):
+    """Procesador inicializado con 60 días de datos"""
+    db_path = os.path.join(tmp_dir, 'test.db')
+    fechas = pd.date_range('2025-03-01', periods=60, freq='D')
+    df = pd.DataFrame({
+        'servicio': ['VISAS', 'PASAPORTE ORDINARIO'] * 60,
+        'categoria': ['VISAS', 'PASAPORTES'] * 60,
+        'costo_unitario': [25.0, 80.0] * 60,
+        'num_tramites': np.arange(120) % 7,
+        'ingresos_totales': (np.arange(120) % 7) * 10.0,
+        'fecha_emision': fechas.repeat(2),
+        'formas_canceladas': [0] * 120
+    })
+    DatabaseManager(db_path).insert_data_from_dataframe(df, 'marzo.xls')
+    processor = EnhancedDataProcessor(db_path)
+    assert processor.initialize_from_database()
+    return processor, db_path
+
+
+def test_filtered_data_is_copy_free():
+    """El filtrado por fecha coincide con las máscaras y comparte memoria con self.df"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        df = processor.df
+
+        for start_date, end_date in ((None, None), ('2025-03-10', '2025-03-20'),
+                                     ('2025-03-10', None), (None, '2025-03-01'),
+                                     ('2025-04-29', '2025-05-30'), ('2025-03-20', '2025-03-10')):
+            mask = pd.Series(True, index=df.index)
+            if start_date:
+                mask &= df['fecha_emision'] >= start_date
+            if end_date:
+                mask &= df['fecha_emision'] <= end_date
+
+            filtered = processor._get_filtered_data(start_date, end_date)
+            pd.testing.assert_frame_equal(filtered, df[mask])
+
+        view = processor.filter_by_date('2025-03-10', '2025-03-20')
+        assert len(view) == 22
+        assert np.shares_memory(view['num_tramites'].to_numpy(), df['num_tramites'].to_numpy())
+
+        # Un DataFrame asignado desde fuera se vuelve a indexar
+        processor.df = df[df['categoria'] == 'VISAS']
+        assert len(processor._get_filtered_data('2025-03-10', '2025-03-20')) == 11
+
+        connection_manager.close_all(db_path)
+
+
+def test_aggregate_by_period_does_not_mutate():
+    """aggregate_by_period agrupa sin agregar columnas a los datos de origen"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        view = processor._get_filtered_data('2025-03-01', '2025-04-30')
+        columns_before = list(view.columns)
+
+        monthly = processor.aggregate_by_period(view, 'Mensual', ['num_tramites', 'ingresos_totales'])
+        assert monthly['periodo'].tolist() == ['2025-03', '2025-04']
+        assert monthly['num_tramites'].sum() == view['num_tramites'].sum()
+        assert list(view.columns) == columns_before
+
+        daily = processor.aggregate_by_period(view, 'Diaria', ['num_tramites'])
+        assert len(daily) == 60
+        assert processor.aggregate_by_period(view, 'Anual', ['num_tramites'])['periodo'].tolist() == [2025]
+
+        connection_manager.close_all(db_path)
+
+
+def test_period_series_matches_filtered_aggregation():
+    """Las series por período coinciden con filtrar y agrupar self.df, también en modo compacto"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        compact = EnhancedDataProcessor(db_path, compact=True)
+        assert compact.initialize_from_database('2025-03-15', '2025-04-20')
+        processor.initialize_from_database('2025-03-15', '2025-04-20')
+        df = processor.df
+
+        filters = (
+            ({}, df),
+            ({'categoria_contains': 'PASAPORTES'}, df[df['categoria'].str.contains('PASAPORTES', na=False)]),
+            ({'servicio': 'VISAS'}, df[df['servicio'] == 'VISAS']),
+            ({'servicio_pattern': 'pasaporte|RCM'},
+             df[df['servicio'].str.contains('pasaporte|RCM', case=False, na=False)]),
+        )
+        columns = ['ingresos_totales', 'num_tramites']
+        for grouping in ('Diaria', 'Mensual', 'Anual'):
+            for arguments, rows in filters:
+                expected = processor.aggregate_by_period(rows, grouping, columns)
+                for source in (processor, compact):
+                    series = source.get_period_series(grouping, tuple(columns), **arguments)
+                    assert series['periodo'].tolist() == expected['periodo'].tolist()
+                    np.testing.assert_allclose(series[columns].to_numpy(dtype=float),
+                                               expected[columns].to_numpy(dtype=float))
+
+        assert processor.get_period_series('Mensual', ('num_tramites',), servicio='OTRO').empty
+        connection_manager.close_all(db_path)
+
+
+def test_result_cache_hits_and_invalidation():
+    """Las llamadas repetidas se sirven de la caché hasta que cambia la versión de datos"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        result_cache.reset_stats()
+
+        first = processor.get_data_by_category(start_date='2025-03-01', end_date='2025-03-31')
+        first['registros'] = 0  # Modificar el resultado no altera la entrada cacheada
+        again = processor.get_data_by_category(start_date=pd.Timestamp('2025-03-01'), end_date='2025-03-31')
+        assert result_cache.stats['misses'] == 1
+        assert result_cache.stats['hits'] == 1
+        assert again['registros'].sum() == 62
+
+        # Una carga nueva cambia la versión de datos e invalida la caché
+        extra = pd.DataFrame({
+            'servicio': ['LEGALIZACIÓN'], 'categoria': ['VISAS'], 'costo_unitario': [25.0],
+            'num_tramites': [1], 'ingresos_totales': [25.0],
+            'fecha_emision': pd.to_datetime(['2025-03-05']), 'formas_canceladas': [0]
+        })
+        version = processor.db_manager.get_data_version()
+        processor.db_manager.insert_data_from_dataframe(extra, 'extra.xls')
+        assert processor.db_manager.get_data_version() == version + 1
+
+        updated = processor.get_data_by_category(start_date='2025-03-01', end_date='2025-03-31')
+        assert updated['registros'].sum() == 63
+        assert result_cache.stats['invalidations'] >= 1
+
+        # Un DataFrame como argumento no se memoriza
+        hits = result_cache.stats['hits']
+        processor.get_summary_stats(processor.df)
+        processor.get_summary_stats(processor.df)
+        assert result_cache.stats['hits'] == hits
+
+        connection_manager.close_all(db_path)
+
+
+def test_date_range_changes_use_loaded_data():
+    """Los cambios de rango cortan el histórico en memoria; la base se relee al cambiar la versión"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        full = processor.df
+        reads = []
+        get_all_data = processor.db_manager.get_all_data
+        processor.db_manager.get_all_data = lambda *args: reads.append(args) or get_all_data(*args)
+
+        view = processor.with_date_range('2025-03-10', '2025-03-20')
+        expected = full[(full['fecha_emision'] >= '2025-03-10') & (full['fecha_emision'] <= '2025-03-20')]
+        pd.testing.assert_frame_equal(view.df, expected)
+        assert len(get_all_data('2025-03-10', '2025-03-20')) == len(view.df) == 22
+        assert processor.df is full
+
+        assert processor.initialize_from_database('2025-04-01', None)
+        assert processor.df['fecha_emision'].min() == pd.Timestamp('2025-04-01')
+        assert view.get_kpis()['total_registros'] == 22
+        assert reads == []
+
+        extra = pd.DataFrame({
+            'servicio': ['VISAS'], 'categoria': ['VISAS'], 'costo_unitario': [25.0],
+            'num_tramites': [1], 'ingresos_totales': [25.0],
+            'fecha_emision': [pd.Timestamp('2025-05-15')], 'formas_canceladas': [0]
+        })
+        DatabaseManager(db_path).insert_data_from_dataframe(extra, 'mayo.xls')
+        assert processor.initialize_from_database('2025-05-01', None)
+        assert len(reads) == 1
+        assert processor.df['fecha_emision'].max() == pd.Timestamp('2025-05-15')
+
+        shared = get_shared_processor(db_path)
+        assert get_shared_processor(db_path) is shared
+        assert len(shared.df) == 121
+        assert shared.compact and shared.df['servicio'].dtype == 'category'
+        assert shared.df['mes_año'].max() == 202505
+        assert shared.get_memory_usage()['total_bytes'] < processor.get_memory_usage()['total_bytes']
+        clear_shared_processors()
+
+        connection_manager.close_all(db_path)
+
+
+def test_service_grouping_matches_rowwise_rules():
+    """La agrupación por nombres distintos coincide con aplicar las reglas fila por fila"""
+    processor = EnhancedDataProcessor.__new__(EnhancedDataProcessor)
+    services = ['RCM - DURANGO - ACTAS', None, 'Compulsa de documentos', 'pasaporte ordinario 3 años',
+                'PASAPORTE COBRADO AL 50 %', 'VISAS', 'RCM - DURANGO - ACTAS', 'COMPULSA RCM', None]
+    df = pd.DataFrame({'servicio': services, 'num_tramites': np.arange(len(services))})
+
+    expected = df[~df['servicio'].str.contains('COMPULSA', case=False, na=False)].copy()
+    expected['servicio'] = expected['servicio'].apply(processor._group_service_name)
+
+    processor.df = df
+    processor._apply_service_filters_and_grouping()
+    pd.testing.assert_frame_equal(processor.df, expected, check_dtype=False)
+    assert processor.df['servicio'].isna().sum() == 2
+
+    processor.df = df[df['servicio'].isna()]
+    processor._apply_service_filters_and_grouping()
+    assert len(processor.df) == 2
+
+
+def test_result_cache_limits():
+    """La caché respeta el número máximo de entradas y el presupuesto de bytes"""
+    cache = ResultCache(max_entries=2, max_bytes=10_000)
+    frame = pd.DataFrame({'valor': np.arange(100)})
+    cache.put(('db', 'a'), frame)
+    cache.put(('db', 'b'), frame)
+    assert cache.get(('db', 'a'))[0]
+    cache.put(('db', 'c'), frame)
+    assert not cache.get(('db', 'b'))[0]
+    assert cache.get(('db', 'a'))[0] and cache.get(('db', 'c'))[0]
+
+    cache.put(('db', 'grande'), pd.DataFrame({'valor': np.arange(10_000)}))
+    assert not cache.get(('db', 'grande'))[0]
+
+    cache.put(('db', 'd'), pd.DataFrame({'valor': np.arange(1000)}))
+    stats = cache.get_stats()
+    assert stats['bytes'] <= 10_000
+    assert stats['evictions'] >= 2
+
+    cache.sync_version('db', 1)
+    cache.sync_version('db', 2)
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_replaced_frame_bypasses_database_summaries():
+    """Con self.df filtrado desde fuera, KPIs y series describen el filtro y no toda la base"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        full_kpis = processor.get_kpis()
+        processor.df = processor.df[processor.df['categoria'] == 'VISAS']
+        visas = processor.df
+        expected_total = visas['ingresos_totales'].sum()
+        assert expected_total < full_kpis['total_ingresos']
+
+        kpis = processor.get_kpis()
+        assert kpis['total_ingresos'] == expected_total
+        assert kpis['total_registros'] == len(visas) == 60
+        stats = processor.get_summary_stats()
+        assert stats['total_ingresos'] == expected_total
+        assert stats['categorias_unicas'] == 1
+        temporal = processor.get_temporal_data('mes')
+        assert temporal['ingresos_totales'].sum() == expected_total
+        assert temporal['registros'].tolist() == [31, 29]
+        efficiency = processor.get_efficiency_metrics()
+        assert efficiency['global_metrics']['total_ingresos'] == expected_total
+        assert list(efficiency['servicio_metrics']) == ['VISAS']
+        assert processor.get_daily_rollup('2025-03-10', '2025-03-19')['registros'].sum() == 10
+
+        # Las agregaciones SQL también quedan fuera
+        assert processor.get_data_by_category()['categoria'].tolist() == ['VISAS']
+        assert processor.get_data_by_service()['ingresos_totales'].sum() == expected_total
+        assert processor.get_top_services(top_n=10)['ingresos_totales'].sum() == expected_total
+        assert processor.get_services_count_over_time('mes')['servicios_unicos'].tolist() == [1, 1]
+
+        connection_manager.close_all(db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests del procesador de datos...")
+    for test in (test_filtered_data_is_copy_free, test_aggregate_by_period_does_not_mutate,
+                 test_period_series_matches_filtered_aggregation, test_result_cache_hits_and_invalidation, test_date_range_changes_use_loaded_data,
+                 test_service_grouping_matches_rowwise_rules, test_result_cache_limits,
+                 test_replaced_frame_bypasses_database_summaries):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
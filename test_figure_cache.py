@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché de figuras plotly
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import json
+import tempfile
+
+import plotly.express as px
+
+from connection_manager import connection_manager
+from database_manager import DatabaseManager
+from figure_cache import FigureCache
+from test_enhanced_data_processor import make_processor
+
+
+def test_figures_reused_until_data_changes():
+    """Una figura se construye una vez por parámetros y datos; otra versión de datos la reconstruye"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        view = processor.with_date_range('2025-03-10', '2025-04-10')
+        cache = FigureCache()
+        builds = []
+
+        def chart(grouping):
+            def build_figure():
+                builds.append(grouping)
+                data = view.get_period_series(grouping, ('ingresos_totales',))
+                return px.line(data, x='periodo', y='ingresos_totales', title=grouping)
+            return cache.get_figure('ingresos', build_figure, view.cache_scope(), grouping=grouping)
+
+        first = chart('Mensual')
+        again = chart('Mensual')
+        chart('Anual')
+        assert builds == ['Mensual', 'Anual']
+        assert json.loads(again.to_json()) == json.loads(first.to_json())
+        assert again.layout.title.text == 'Mensual'
+
+        # El rango inicial es parte de la clave
+        other_range = processor.with_date_range('2025-03-01', '2025-03-05')
+        cache.get_figure('ingresos', lambda: builds.append('rango') or first,
+                         other_range.cache_scope(), grouping='Mensual')
+        assert builds[-1] == 'rango'
+
+        # Nueva versión de datos: las figuras guardadas se descartan
+        DatabaseManager(db_path).delete_data_by_file('marzo.xls')
+        chart('Mensual')
+        assert builds[-1] == 'Mensual' and len(builds) == 4
+
+        stats = cache.get_stats()
+        assert stats['charts']['ingresos']['hits'] == 1
+        assert stats['charts']['ingresos']['builds'] == 4
+        assert stats['invalidations'] == 1
+        connection_manager.close_all(db_path)
+
+
+def test_uncacheable_figures_are_built_each_time():
+    """Sin alcance de datos o sin figura no se guarda nada; el tamaño en bytes está acotado"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor, db_path = make_processor(tmp_dir)
+        def line(points):
+            return px.line(x=list(range(points)), y=[point % 7 for point in range(points)])
+        # Espacio para dos figuras
+        cache = FigureCache(max_bytes=int(sys.getsizeof(line(3000).to_json()) * 2.5))
+
+        # Un DataFrame asignado desde fuera no identifica sus datos
+        processor.df = processor.df[processor.df['categoria'] == 'VISAS']
+        assert processor.cache_scope() is None
+        builds = []
+        for _ in range(2):
+            cache.get_figure('visas', lambda: builds.append(1) or px.bar(x=[1], y=[1]), processor.cache_scope())
+        assert len(builds) == 2
+
+        scope = ('base', 1, (None, None))
+        assert cache.get_figure('vacia', lambda: None, scope) is None
+        assert cache.get_stats()['entries'] == 0
+
+        # Figuras grandes: se desalojan las usadas hace más tiempo
+        for points in (3000, 3001, 3002):
+            cache.get_figure('puntos', lambda: line(points), scope, points=points)
+        stats = cache.get_stats()
+        assert stats['entries'] == 2 and stats['evictions'] == 1
+        connection_manager.close_all(db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la caché de figuras...")
+    for test in (test_figures_reused_until_data_changes, test_uncacheable_figures_are_built_each_time):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Tests del gestor de archivos (validación y carga con una sola lectura)
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import shutil
+import tempfile
+
+import pandas as pd
+
+from connection_manager import connection_manager
+import file_manager
+import robust_data_processor
+from data_processor import MayoDataProcessor, detect_file_format
+from file_manager import FileManager
+from parquet_cache import parquet_cache
+from robust_data_processor import parsed_file_cache
+
+
+def write_html_export(path, days=5):
+    """Escribe un reporte HTML con las columnas del sistema consular"""
+    rows = []
+    for day in range(1, days + 1):
+        for servicio, articulo, derechos in (('PASAPORTE ORDINARIO', 'PASAPORTES', 80.0),
+                                             ('VISAS', 'VISAS', 25.0)):
+            rows.append({
+                'Servicio': servicio,
+                'Concepto': '',
+                'Articulo': articulo,
+                'Derechos': derechos,
+                'No. de trámites': day,
+                'Importe USD': derechos * day,
+                'Fecha recaudación': f'{day:02d}/05/2025',
+                'No. cancelados': 0
+            })
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<html><head><meta charset="utf-8"></head><body>')
+        f.write(pd.DataFrame(rows).to_html(index=False))
+        f.write('</body></html>')
+
+
+def test_validate_and_load_parse_once():
+    """Validar y cargar el mismo contenido (con otro nombre) lee el archivo una sola vez"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        source = os.path.join(tmp_dir, 'temp_validate_mayo.xls')
+        write_html_export(source)
+        parsed_file_cache.clear()
+        parquet_cache.clear()
+
+        reads = []
+        load_data = MayoDataProcessor.load_data
+        MayoDataProcessor.load_data = lambda self: reads.append(self.file_path) or load_data(self)
+        try:
+            manager = FileManager(db_path)
+            validation = manager.validate_file_structure(source)
+            assert validation['is_valid'], validation['error_message']
+            assert validation['rows_count'] == 10
+
+            copy_path = os.path.join(tmp_dir, 'mayo.xls')
+            shutil.copy(source, copy_path)
+            result = manager.load_file_to_database(copy_path)
+            assert result['success'], result['message']
+            assert result['stats']['inserted'] == 10
+
+            # Segunda carga sin sobrescribir: se rechaza sin leer el archivo
+            assert not manager.load_file_to_database(copy_path)['success']
+        finally:
+            MayoDataProcessor.load_data = load_data
+
+        assert reads == [source]
+        assert validation['engine'] == 'html'
+        connection_manager.close_all(db_path)
+
+
+def test_invalid_file_result_is_cached():
+    """Los errores de lectura también se guardan y se reportan igual en cada llamada"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        path = os.path.join(tmp_dir, 'roto.xls')
+        with open(path, 'w') as f:
+            f.write('sin tablas')
+        parsed_file_cache.clear()
+
+        manager = FileManager(db_path)
+        first = manager.validate_file_structure(path)
+        second = manager.validate_file_structure(path)
+        assert not first['is_valid']
+        assert first['error_message'] == second['error_message']
+        assert parsed_file_cache.get_stats()['entries'] == 1
+
+        result = manager.load_file_to_database(path)
+        assert not result['success']
+        connection_manager.close_all(db_path)
+
+
+def test_format_detection():
+    """El formato se reconoce por el contenido, no por la extensión"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_path = os.path.join(tmp_dir, 'reporte.xls')
+        write_html_export(html_path)
+        xlsx_path = os.path.join(tmp_dir, 'reporte.xlsx')
+        pd.read_html(html_path)[0].to_excel(xlsx_path, index=False)
+        ole2_path = os.path.join(tmp_dir, 'antiguo.xls')
+        with open(ole2_path, 'wb') as f:
+            f.write(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 512)
+        other_path = os.path.join(tmp_dir, 'notas.xls')
+        with open(other_path, 'w') as f:
+            f.write('sin tablas')
+
+        assert detect_file_format(html_path) == 'html'
+        assert detect_file_format(xlsx_path) == 'xlsx'
+        assert detect_file_format(ole2_path) == 'xls'
+        assert detect_file_format(other_path) is None
+        assert detect_file_format(os.path.join(os.path.dirname(__file__), 'Inicio', 'mayo.xls')) == 'html'
+
+        processor = MayoDataProcessor(xlsx_path)
+        assert len(processor.load_data()) == 10
+        assert processor.engine == 'openpyxl'
+
+
+def test_streaming_parser_matches_read_html():
+    """El parser incremental entrega los mismos datos que read_html, por bloques"""
+    source = os.path.join(os.path.dirname(__file__), 'Inicio', 'mayo.xls')
+    expected = MayoDataProcessor.clean_frame(pd.read_html(source)[0])
+
+    chunks = list(MayoDataProcessor(source).iter_clean_chunks(chunk_size=7))
+    assert len(chunks) > 1
+    streamed = pd.concat(chunks, ignore_index=True)
+
+    columns = ['servicio', 'categoria', 'costo_unitario', 'num_tramites',
+               'ingresos_totales', 'fecha_emision', 'formas_canceladas']
+    pd.testing.assert_frame_equal(streamed[columns], expected[columns].reset_index(drop=True))
+
+
+def test_large_file_loads_by_chunks():
+    """Sobre el umbral, validación y carga trabajan por bloques con el mismo resultado"""
+    threshold = robust_data_processor.STREAMING_MIN_BYTES
+    chunk_rows = robust_data_processor.STREAMING_CHUNK_ROWS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'mayo.xls')
+        write_html_export(source, days=6)
+        parsed_file_cache.clear()
+        parquet_cache.clear()
+
+        robust_data_processor.STREAMING_MIN_BYTES = 0
+        robust_data_processor.STREAMING_CHUNK_ROWS = 5
+        try:
+            manager = FileManager(os.path.join(tmp_dir, 'stream.db'))
+            validation = manager.validate_file_structure(source)
+            assert validation['is_valid'], validation['error_message']
+            assert validation['engine'] == 'html-stream'
+            assert validation['rows_count'] == 12
+            assert len(validation['preview_data']) == 5
+
+            result = manager.load_file_to_database(source)
+            assert result['success'], result['message']
+            assert result['stats']['inserted'] == 12
+
+            result = manager.load_file_to_database(source, overwrite_duplicates=True)
+            assert result['stats']['unchanged'] == 12
+        finally:
+            robust_data_processor.STREAMING_MIN_BYTES = threshold
+            robust_data_processor.STREAMING_CHUNK_ROWS = chunk_rows
+
+        parsed_file_cache.clear()
+        reference = FileManager(os.path.join(tmp_dir, 'full.db'))
+        assert reference.load_file_to_database(source)['success']
+
+        streamed_data = manager.db_manager.get_all_data().drop(columns=['fecha_carga'])
+        full_data = reference.db_manager.get_all_data().drop(columns=['fecha_carga'])
+        pd.testing.assert_frame_equal(streamed_data, full_data)
+        connection_manager.close_all(manager.db_manager.db_path)
+        connection_manager.close_all(reference.db_manager.db_path)
+
+
+def test_parsed_chunks_travel_through_parquet():
+    """Los procesos de lectura devuelven los límites de los bloques en la caché, no los datos"""
+    threshold = robust_data_processor.STREAMING_MIN_BYTES
+    chunk_rows = robust_data_processor.STREAMING_CHUNK_ROWS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'mayo.xls')
+        write_html_export(source, days=6)
+        content_hash = file_manager.file_content_hash(source)
+        parsed_file_cache.clear()
+        parquet_cache.clear()
+
+        robust_data_processor.STREAMING_CHUNK_ROWS = 5
+        try:
+            expected = list(robust_data_processor.RobustDataProcessor(source).iter_clean_chunks(5, 1))
+            assert [len(chunk) for chunk in expected] == [5, 2]
+
+            parsed_file_cache.clear()
+            parquet_cache.clear()
+            error_message, chunk_offsets, chunks = file_manager.parse_file_for_load(source, None, 5, 1)
+            assert (error_message, chunk_offsets, chunks) == (None, [0, 5, 10, 12], None)
+            loaded = list(file_manager.iter_loaded_chunks(source, content_hash, chunk_offsets, chunks, 5, 1))
+            for chunk, reference in zip(loaded, expected):
+                pd.testing.assert_frame_equal(chunk, reference.reset_index(drop=True))
+
+            # Sin caché: un archivo pequeño vuelve en bloques; uno grande lo recorre quien escribe
+            parquet_cache.enabled = False
+            parsed_file_cache.clear()
+            error_message, chunk_offsets, chunks = file_manager.parse_file_for_load(source, None, 5, 1)
+            assert chunk_offsets is None and [len(chunk) for chunk in chunks] == [5, 2]
+
+            robust_data_processor.STREAMING_MIN_BYTES = 0
+            parsed_file_cache.clear()
+            assert file_manager.parse_file_for_load(source, None, 5, 1) == (None, None, None)
+            loaded = list(file_manager.iter_loaded_chunks(source, content_hash, None, None, 5, 1))
+            assert [len(chunk) for chunk in loaded] == [5, 2]
+        finally:
+            parquet_cache.enabled = True
+            robust_data_processor.STREAMING_MIN_BYTES = threshold
+            robust_data_processor.STREAMING_CHUNK_ROWS = chunk_rows
+
+
+def test_interrupted_load_resumes_from_checkpoint():
+    """Una carga interrumpida continúa desde el último bloque confirmado sin contar dos veces"""
+    chunk_rows = file_manager.INGEST_CHUNK_ROWS
+    iter_clean_chunks = robust_data_processor.RobustDataProcessor.iter_clean_chunks
+
+    def interrupted_chunks(self, *args):
+        # Se corta la lectura después de dos bloques, como un proceso detenido
+        for index, chunk in enumerate(iter_clean_chunks(self, *args)):
+            if index == 2:
+                raise RuntimeError('carga detenida')
+            yield chunk
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'mayo.xls')
+        write_html_export(source, days=8)
+        parsed_file_cache.clear()
+
+        file_manager.INGEST_CHUNK_ROWS = 5
+        try:
+            manager = FileManager(os.path.join(tmp_dir, 'resume.db'))
+            robust_data_processor.RobustDataProcessor.iter_clean_chunks = interrupted_chunks
+            try:
+                result = manager.load_file_to_database(source)
+            finally:
+                robust_data_processor.RobustDataProcessor.iter_clean_chunks = iter_clean_chunks
+            assert not result['success']
+
+            content_hash = robust_data_processor.file_content_hash(source)
+            checkpoint = manager.db_manager.get_ingest_checkpoint(content_hash, 'insert')
+            assert checkpoint['ultimo_bloque'] == 1
+            assert checkpoint['stats']['inserted'] == 10
+            assert 'mayo.xls' not in manager.db_manager.get_loaded_files_index()['names']
+
+            progress = []
+            result = manager.load_file_to_database(
+                source, progress_callback=lambda done, total: progress.append((done, total)))
+            assert result['success'], result['message']
+            assert result['stats']['inserted'] == 16
+            assert result['stats']['total_processed'] == 16
+            assert progress == [(3, 4), (4, 4)]
+            assert manager.db_manager.get_ingest_checkpoint(content_hash, 'insert') is None
+        finally:
+            file_manager.INGEST_CHUNK_ROWS = chunk_rows
+
+        reference = FileManager(os.path.join(tmp_dir, 'full.db'))
+        assert reference.load_file_to_database(source)['success']
+
+        resumed_data = manager.db_manager.get_all_data().drop(columns=['fecha_carga'])
+        full_data = reference.db_manager.get_all_data().drop(columns=['fecha_carga'])
+        pd.testing.assert_frame_equal(resumed_data, full_data)
+        connection_manager.close_all(manager.db_manager.db_path)
+        connection_manager.close_all(reference.db_manager.db_path)
+
+
+def test_parallel_batch_matches_sequential():
+    """La carga en lote con procesos deja la misma base que la carga en secuencia"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for month, days in (('enero', 3), ('febrero', 4), ('marzo', 5)):
+            path = os.path.join(tmp_dir, f'{month}.xls')
+            write_html_export(path, days=days)
+            paths.append(path)
+        broken = os.path.join(tmp_dir, 'roto.xls')
+        with open(broken, 'w') as f:
+            f.write('sin tablas')
+        # El mismo archivo dos veces: la segunda se rechaza como ya cargada
+        paths += [broken, paths[0]]
+
+        # Archivos enviados a leer por delante del último escrito
+        progress, ahead = [], []
+
+        class CountingPool(file_manager.ProcessPoolExecutor):
+            def submit(self, *args, **kwargs):
+                ahead.append(len(ahead) + 1 - len(progress))
+                return super().submit(*args, **kwargs)
+
+        data = {}
+        pool = file_manager.ProcessPoolExecutor
+        for label, workers in (('secuencial', 1), ('paralelo', 2)):
+            parsed_file_cache.clear()
+            progress.clear()
+            manager = FileManager(os.path.join(tmp_dir, f'{label}.db'))
+            file_manager.ProcessPoolExecutor = CountingPool
+            try:
+                result = manager.batch_load_files(paths, max_workers=workers,
+                                                  progress_callback=lambda *args: progress.append(args))
+            finally:
+                file_manager.ProcessPoolExecutor = pool
+
+            assert [f['filename'] for f in result['successful_files']] == ['enero.xls', 'febrero.xls', 'marzo.xls']
+            assert [f['filename'] for f in result['failed_files']] == ['roto.xls', 'enero.xls']
+            assert result['total_stats']['inserted'] == 10
+            assert [done for done, _, _ in progress] == [1, 2, 3, 4, 5]
+
+            data[label] = manager.db_manager.get_all_data().drop(columns=['fecha_carga'])
+            connection_manager.close_all(manager.db_manager.db_path)
+
+        pd.testing.assert_frame_equal(data['paralelo'], data['secuencial'])
+        # La copia de enero no se lee; nunca hay más de max_workers archivos
+        # leídos por delante del que se escribe
+        assert len(ahead) == 4 and max(ahead) <= 3
+
+
+def test_rescan_detects_renamed_copies():
+    """Una búsqueda consulta el historial una vez, no relee archivos sin cambios y reconoce copias renombradas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, 'reportes')
+        os.makedirs(data_dir)
+        enero = os.path.join(data_dir, 'enero.xls')
+        write_html_export(enero, days=3)
+        write_html_export(os.path.join(data_dir, 'febrero.xls'), days=4)
+        shutil.copy(enero, os.path.join(data_dir, 'copia_enero.xls'))
+
+        manager = FileManager(os.path.join(tmp_dir, 'test.db'))
+        assert manager.load_file_to_database(enero)['success']
+
+        hashed = []
+        lookups = []
+        content_hash = file_manager.file_content_hash
+        index = manager.db_manager.get_loaded_files_index
+        file_manager.file_content_hash = lambda path: hashed.append(os.path.basename(path)) or content_hash(path)
+        manager.db_manager.get_loaded_files_index = lambda: lookups.append(1) or index()
+        try:
+            file_manager._scanned_signatures.clear()
+            files = {f['nombre']: f for f in manager.get_available_files(data_dir)}
+            # enero.xls se reconoce por la firma registrada al cargarlo
+            assert sorted(hashed) == ['copia_enero.xls', 'febrero.xls']
+            assert files['enero.xls']['ya_cargado']
+            assert files['copia_enero.xls']['cargado_como'] == 'enero.xls'
+            assert not files['febrero.xls']['ya_cargado']
+
+            manager.get_available_files(data_dir)
+            assert len(hashed) == 2
+            assert len(lookups) == 2
+        finally:
+            file_manager.file_content_hash = content_hash
+            manager.db_manager.get_loaded_files_index = index
+
+        result = manager.load_file_to_database(os.path.join(data_dir, 'copia_enero.xls'))
+        assert not result['success']
+        assert 'enero.xls' in result['message']
+        connection_manager.close_all(manager.db_manager.db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests del gestor de archivos...")
+    for test in (test_validate_and_load_parse_once, test_invalid_file_result_is_cached,
+                 test_format_detection, test_streaming_parser_matches_read_html,
+                 test_large_file_loads_by_chunks, test_parsed_chunks_travel_through_parquet,
+                 test_interrupted_load_resumes_from_checkpoint,
+                 test_parallel_batch_matches_sequential,
+                 test_rescan_detects_renamed_copies):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests del servicio de carga automática desde una carpeta de entrada
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+import threading
+import time
+
+from connection_manager import connection_manager
+from ingest_service import IngestService
+from robust_data_processor import parsed_file_cache
+from test_file_manager import write_html_export
+
+
+def test_partial_files_wait_until_settled():
+    """Un archivo solo se carga cuando deja de cambiar, y una sola vez"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        drop_dir = os.path.join(tmp_dir, 'entrada')
+        os.makedirs(drop_dir)
+        parsed_file_cache.clear()
+        service = IngestService(drop_dir, os.path.join(tmp_dir, 'test.db'),
+                                settle_seconds=5, use_events=False)
+        db = service.file_manager.db_manager
+
+        path = os.path.join(drop_dir, 'mayo.xls')
+        write_html_export(path, days=2)
+        assert service.process_pending(full_scan=True, now=0) is None
+        assert service.process_pending(full_scan=True, now=3) is None
+
+        # Sigue escribiéndose: la espera vuelve a empezar
+        write_html_export(path, days=4)
+        assert service.process_pending(full_scan=True, now=6) is None
+        assert service.process_pending(full_scan=True, now=10) is None
+
+        version = db.get_data_version()
+        result = service.process_pending(full_scan=True, now=11)
+        assert [f['filename'] for f in result['successful_files']] == ['mayo.xls']
+        assert result['total_stats']['inserted'] == 8
+        assert db.get_data_version() > version
+        assert 'mayo.xls' in db.get_loaded_files_index()['names']
+
+        # Sin cambios no se vuelve a intentar
+        assert service.process_pending(full_scan=True, now=30) is None
+        connection_manager.close_all(db.db_path)
+
+
+def test_service_loads_dropped_files():
+    """El servicio en marcha carga los archivos que llegan a la carpeta"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        drop_dir = os.path.join(tmp_dir, 'entrada')
+        parsed_file_cache.clear()
+        service = IngestService(drop_dir, os.path.join(tmp_dir, 'test.db'),
+                                settle_seconds=0.2, poll_seconds=0.1)
+        db = service.file_manager.db_manager
+        worker = threading.Thread(target=service.run)
+        worker.start()
+        try:
+            while not os.path.isdir(drop_dir):
+                time.sleep(0.05)
+            write_html_export(os.path.join(drop_dir, 'junio.xls'), days=3)
+
+            deadline = time.monotonic() + 15
+            while 'junio.xls' not in db.get_loaded_files_index()['names']:
+                assert time.monotonic() < deadline, f"No se cargó el archivo ({service.mode})"
+                time.sleep(0.1)
+        finally:
+            service.stop()
+            worker.join()
+
+        assert db.get_summary_stats()['total_registros'] == 6
+        connection_manager.close_all(db.db_path)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests del servicio de carga automática...")
+    for test in (test_partial_files_wait_until_settled, test_service_loads_dropped_files):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
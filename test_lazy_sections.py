@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests de las secciones diferidas de la página de análisis
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+from streamlit.testing.v1 import AppTest
+
+from lazy_sections import memoize_section
+from result_cache import result_cache
+
+
+def lazy_page():
+    """Página con dos pestañas diferidas que registran qué sección se calculó"""
+    import sys
+    import streamlit as st
+    sys.path.append(st.session_state['inicio_dir'])
+    from lazy_sections import lazy_tabs
+
+    computed = st.session_state.setdefault('computed', [])
+    for (tab, is_open), name in zip(lazy_tabs(['Resumen', 'Detalle'], key='seccion'), ('Resumen', 'Detalle')):
+        with tab:
+            if is_open:
+                computed.append(name)
+                st.write(name)
+
+
+def test_only_selected_tab_is_computed():
+    """Solo la pestaña seleccionada calcula su contenido"""
+    at = AppTest.from_function(lazy_page)
+    at.session_state['inicio_dir'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Inicio')
+    at.run()
+    assert not at.exception
+    assert at.session_state['computed'] == ['Resumen']
+
+    at.session_state['seccion'] = 'Detalle'
+    at.run()
+    assert at.session_state['computed'] == ['Resumen', 'Detalle']
+
+
+def test_sections_memoized_per_filters():
+    """Cada sección se calcula una vez por filtros, controles y versión de datos"""
+    result_cache.clear()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'total': len(calls)}
+
+    scope = ('base-secciones', 1, ('2025-01-01', '2025-01-31'))
+    assert memoize_section('kpis', compute, scope, servicio='VISAS') == {'total': 1}
+    assert memoize_section('kpis', compute, scope, servicio='VISAS') == {'total': 1}
+    assert memoize_section('kpis', compute, scope, servicio='RCM') == {'total': 2}
+    assert memoize_section('kpis', compute, scope[:2] + (('2025-02-01', None),), servicio='VISAS') == {'total': 3}
+    assert memoize_section('kpis', compute, ('base-secciones', 2, scope[2]), servicio='VISAS') == {'total': 4}
+
+    # Sin alcance (datos reemplazados) o sin resultado no se memoriza
+    assert memoize_section('kpis', compute, None) == {'total': 5}
+    assert memoize_section('vacia', lambda: calls.append(1), scope) is None
+    assert memoize_section('vacia', lambda: calls.append(1), scope) is None
+    assert len(calls) == 7
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de las secciones diferidas...")
+    for test in (test_only_selected_tab_is_computed, test_sections_memoized_per_filters):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
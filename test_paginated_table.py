@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests de la tabla paginada de datos detallados
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from connection_manager import connection_manager
+from database_manager import DatabaseManager
+from enhanced_data_processor import EnhancedDataProcessor
+from paginated_table import format_currency
+
+
+def make_detail_data():
+    """Registros de 30 días con servicios agrupables y uno excluido (COMPULSA)"""
+    services = ['PASAPORTE ORDINARIO 3 AÑOS', 'RCM - DURANGO - ACTAS', 'VISAS 10%_ESPECIAL', 'COMPULSA DE DOCUMENTOS']
+    fechas = pd.date_range('2025-05-01', periods=30, freq='D')
+    rows = [(service, f'CAT {i % 2}', 10.0 + i, 1 + (day + i) % 4, fecha)
+            for day, fecha in enumerate(fechas) for i, service in enumerate(services)]
+    df = pd.DataFrame(rows, columns=['servicio', 'categoria', 'costo_unitario', 'num_tramites', 'fecha_emision'])
+    df['ingresos_totales'] = df['costo_unitario'] * df['num_tramites']
+    df['formas_canceladas'] = 0
+    return df
+
+
+def test_data_page_matches_processor_frame():
+    """Las páginas de SQL recorren, en orden, los mismos registros que self.df"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(make_detail_data(), 'mayo.xls')
+        processor = EnhancedDataProcessor(db_path)
+        processor.initialize_from_database('2025-05-05', '2025-05-20')
+        expected = processor.df.sort_values(['ingresos_totales', 'fecha_emision'], ascending=False, kind='stable')
+
+        pages = [processor.get_data_page(sort_by='ingresos_totales', page=page, page_size=7) for page in range(1, 8)]
+        assert [p['total'] for p in pages] == [len(expected)] * 7 == [48] * 7
+        assert pages[0]['pages'] == 7 and [len(p['data']) for p in pages] == [7] * 6 + [6]
+        combined = pd.concat([p['data'] for p in pages], ignore_index=True)
+        assert combined['servicio'].tolist() == expected['servicio'].tolist()
+        assert combined['ingresos_totales'].tolist() == expected['ingresos_totales'].tolist()
+        assert 'Pasaportes Ordinarios' in set(combined['servicio'])
+
+        # Búsqueda literal (el _ no es comodín) sobre el servicio agrupado
+        found = processor.get_data_page(search='10%_esp', sort_by='servicio', descending=False)
+        assert found['total'] == 16 and set(found['data']['servicio']) == {'VISAS 10%_ESPECIAL'}
+        assert processor.get_data_page(search='10%xesp')['total'] == 0
+        assert processor.get_data_page(search='ordinarios')['total'] == 16
+
+        # El filtro de categoría del análisis reemplaza self.df; la tabla lo recibe aparte
+        processor.df = processor.df[processor.df['categoria'] == 'CAT 0']
+        filtered = processor.get_data_page(categoria='CAT 0', page_size=50)
+        assert filtered['total'] == len(processor.df) == 32
+        assert set(filtered['data']['categoria']) == {'CAT 0'}
+
+        # Una página después de la última devuelve la última
+        last = processor.db_manager.get_data_page(page=99, page_size=50)
+        assert (last['page'], last['pages'], last['total'], len(last['data'])) == (3, 3, 120, 20)
+        connection_manager.close_all(db_path)
+
+
+def test_format_currency_matches_fstring():
+    """El formato vectorizado coincide con f'${x:,.2f}' y deja vacíos los nulos"""
+    values = pd.Series(np.random.default_rng(7).uniform(-2e7, 2e7, 1000).round(3))
+    values.iloc[:6] = [0.0, 0.125, 1.005, 999.995, 1234567.891, -0.5]
+    expected = [f"${x:,.2f}" for x in values]
+    assert format_currency(values).tolist() == expected
+
+    with_nulls = pd.Series([1500.0, None], index=[4, 9])
+    assert format_currency(with_nulls).to_dict() == {4: '$1,500.00', 9: ''}
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la tabla paginada...")
+    for test in (test_data_page_matches_processor_frame, test_format_currency_matches_fstring):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
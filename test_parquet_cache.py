@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché Parquet de archivos leídos
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+import time
+
+import pandas as pd
+
+import data_processor
+import robust_data_processor
+from data_processor import MayoDataProcessor
+from parquet_cache import ParquetFrameCache, parquet_cache
+from robust_data_processor import RobustDataProcessor, file_content_hash, parsed_file_cache
+from test_file_manager import write_html_export
+
+
+def test_reload_reads_parquet_not_source():
+    """Después de leer un archivo, otra sesión toma los datos limpios del Parquet"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'mayo.xls')
+        write_html_export(path, days=4)
+        parsed_file_cache.clear()
+        parquet_cache.clear()
+
+        expected = RobustDataProcessor(path).load_and_clean_data()
+        assert parquet_cache.get_stats()['entries'] == 1
+
+        # El artefacto en memoria se comparte sin copias; los datos entregados
+        # pueden modificarse sin alterarlo
+        artifact = RobustDataProcessor(path).parse()
+        assert RobustDataProcessor(path).parse() is artifact
+        loaded = RobustDataProcessor(path).load_and_clean_data()
+        loaded['extra'] = 1
+        assert 'extra' not in artifact['cleaned_df'].columns
+
+        # Sin la caché en memoria (otro proceso o un reinicio) y sin poder leer el original
+        parsed_file_cache.clear()
+        load_data = MayoDataProcessor.load_data
+        MayoDataProcessor.load_data = lambda self: 1 / 0
+        try:
+            processor = RobustDataProcessor(path)
+            validation = processor.validate_structure()
+            cached = processor.load_and_clean_data()
+        finally:
+            MayoDataProcessor.load_data = load_data
+
+        assert validation['is_valid'], validation['error_message']
+        assert validation['engine'] == 'html'
+        pd.testing.assert_frame_equal(cached, expected.reset_index(drop=True))
+
+        # Otra versión de la limpieza no usa la entrada y la elimina
+        content_hash = file_content_hash(path)
+        newer = ParquetFrameCache(parquet_cache.cache_dir, version=parquet_cache.version + 1)
+        assert newer.get_metadata(content_hash) is None
+        assert newer.evict() == 1
+        assert parquet_cache.get_metadata(content_hash) is None
+
+
+def test_streamed_chunks_read_from_parquet():
+    """Un archivo leído por bloques se reanuda desde el Parquet con los mismos bloques"""
+    threshold = robust_data_processor.STREAMING_MIN_BYTES
+    chunk_rows = robust_data_processor.STREAMING_CHUNK_ROWS
+    iter_html_table_chunks = data_processor.iter_html_table_chunks
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'mayo.xls')
+        write_html_export(path, days=7)
+        parsed_file_cache.clear()
+        parquet_cache.clear()
+
+        robust_data_processor.STREAMING_MIN_BYTES = 0
+        robust_data_processor.STREAMING_CHUNK_ROWS = 5
+        try:
+            assert RobustDataProcessor(path).validate_structure()['is_valid']
+            expected = list(MayoDataProcessor(path).iter_clean_chunks(5, skip_chunks=1))
+
+            parsed_file_cache.clear()
+            data_processor.iter_html_table_chunks = None
+            processor = RobustDataProcessor(path)
+            validation = processor.validate_structure()
+            chunks = list(processor.iter_clean_chunks(5, skip_chunks=1))
+        finally:
+            data_processor.iter_html_table_chunks = iter_html_table_chunks
+            robust_data_processor.STREAMING_MIN_BYTES = threshold
+            robust_data_processor.STREAMING_CHUNK_ROWS = chunk_rows
+
+        assert validation['rows_count'] == 14
+        assert len(validation['preview_data']) == 5
+        assert [len(chunk) for chunk in chunks] == [5, 4]
+        for chunk, reference in zip(chunks, expected):
+            pd.testing.assert_frame_equal(chunk, reference.reset_index(drop=True))
+
+
+def test_size_bounded_eviction():
+    """Al pasar el límite se eliminan primero las entradas usadas hace más tiempo"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        frame = pd.DataFrame({'servicio': ['VISAS'] * 100, 'ingresos_totales': range(100)})
+        cache = ParquetFrameCache(tmp_dir)
+        for index, content_hash in enumerate(('a', 'b', 'c')):
+            assert cache.put(content_hash, frame, {'rows_count': 100})
+            stamp = time.time() - 100 + index
+            for path in (cache.data_path(content_hash), cache.metadata_path(content_hash)):
+                os.utime(path, (stamp, stamp))
+        entry_bytes = cache.get_stats()['bytes'] // 3
+
+        # Usar 'a' la vuelve la más reciente
+        assert cache.get_metadata('a') == {'rows_count': 100, 'chunk_offsets': [0, 100]}
+        cache.max_bytes = entry_bytes * 2
+        assert cache.evict() == 1
+        assert cache.get_metadata('b') is None
+        assert cache.get_metadata('a') is not None and cache.get_metadata('c') is not None
+        pd.testing.assert_frame_equal(cache.read_frame('c'), frame)
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la caché Parquet...")
+    for test in (test_reload_reads_parquet_not_source, test_streamed_chunks_read_from_parquet,
+                 test_size_bounded_eviction):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
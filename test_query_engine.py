@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests de paridad entre las agregaciones en SQL y la versión en pandas
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from connection_manager import connection_manager
+from database_manager import DatabaseManager
+from enhanced_data_processor import EnhancedDataProcessor
+from query_engine import compile_aggregation
+
+
+SERVICES = [
+    ('PASAPORTE ORDINARIO 3 AÑOS', 'PASAPORTES'),
+    ('PASAPORTE ORDINARIO COBRADO AL 50 %', 'PASAPORTES'),
+    ('RCM - DURANGO - ACTAS', 'ART. 22'),
+    ('RCM - JALISCO - ACTAS', 'ART. 22'),
+    ('COMPULSA DE DOCUMENTOS', 'ART. 22'),
+    ('VISA ORDINARIA', 'VISAS'),
+    ('VISA ORDINARIA', None),
+    ('CERTIFICADO DE MATRÍCULA', 'DOCUMENTOS'),
+    ('LEGALIZACIÓN', 'DOCUMENTOS')
+]
+
+
+def make_history(seed=7):
+    """Historial de dos años con categorías nulas, COMPULSA, agrupaciones y empates"""
+    rng = np.random.default_rng(seed)
+    fechas = pd.date_range('2024-11-01', '2025-02-28', freq='D')
+    rows = []
+    for fecha in fechas:
+        for servicio, categoria in SERVICES:
+            if rng.random() < 0.3:
+                continue
+            tramites = int(rng.integers(0, 6))
+            costo = float(rng.choice([0.0, 25.5, 80.0]))
+            rows.append({
+                'servicio': servicio,
+                'categoria': categoria,
+                'costo_unitario': costo,
+                'num_tramites': tramites,
+                'ingresos_totales': costo * tramites,
+                'fecha_emision': fecha,
+                'formas_canceladas': int(rng.integers(0, 2))
+            })
+    return pd.DataFrame(rows)
+
+
+def run_both(processor, method, *args, **kwargs):
+    """Ejecuta un método con la consulta SQL y con el respaldo en pandas"""
+    processor.use_sql_pushdown = True
+    sql_result = getattr(processor, method)(*args, **kwargs)
+    processor.use_sql_pushdown = False
+    pandas_result = getattr(processor, method)(*args, **kwargs)
+    processor.use_sql_pushdown = True
+    return sql_result, pandas_result
+
+
+def check_parity(processor, method, *args, **kwargs):
+    sql_result, pandas_result = run_both(processor, method, *args, **kwargs)
+    pd.testing.assert_frame_equal(sql_result, pandas_result, obj=f'{method}{args}{kwargs}')
+    return sql_result
+
+
+def test_parity_full_range(compact=False):
+    """Todas las agregaciones coinciden sobre el rango completo"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(make_history(), 'historial.xls')
+        processor = EnhancedDataProcessor(db_path, compact=compact)
+        assert processor.initialize_from_database()
+
+        assert not check_parity(processor, 'get_data_by_category').empty
+        check_parity(processor, 'get_data_by_service')
+        check_parity(processor, 'get_data_by_service', categoria='PASAPORTES')
+        check_parity(processor, 'get_data_by_service', categoria='NO EXISTE')
+        for by in ('ingresos', 'tramites'):
+            for top_n in (1, 3, 10):
+                check_parity(processor, 'get_top_services', by=by, top_n=top_n)
+        for group_by in ('dia', 'mes', 'trimestre', 'año'):
+            check_parity(processor, 'get_services_count_over_time', group_by)
+            for metric in ('ingresos_totales', 'num_tramites', 'servicios_unicos'):
+                check_parity(processor, 'get_period_timeline_data', metric, group_by)
+
+        connection_manager.close_all(db_path)
+
+
+def test_parity_compact_mode():
+    """El modo compacto devuelve los mismos resultados y tipos que SQL"""
+    test_parity_full_range(compact=True)
+
+
+def test_parity_date_ranges():
+    """Los filtros de fecha se combinan con el rango de inicialización igual que en pandas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        DatabaseManager(db_path).insert_data_from_dataframe(make_history(), 'historial.xls')
+        processor = EnhancedDataProcessor(db_path)
+        assert processor.initialize_from_database('2024-12-15', '2025-01-31')
+
+        for start_date, end_date in ((None, None), ('2024-12-20', '2025-01-10'),
+                                     ('2024-01-01', '2025-12-31'), ('2025-01-31', '2025-01-31'),
+                                     ('2026-01-01', None)):
+            dates = {'start_date': start_date, 'end_date': end_date}
+            check_parity(processor, 'get_data_by_category', **dates)
+            check_parity(processor, 'get_data_by_service', **dates)
+            check_parity(processor, 'get_top_services', by='tramites', top_n=5, **dates)
+            check_parity(processor, 'get_services_count_over_time', 'mes', **dates)
+            check_parity(processor, 'get_period_timeline_data', 'ingresos_totales', 'dia', **dates)
+
+        connection_manager.close_all(db_path)
+
+
+def test_top_services_ties():
+    """Los empates del top-N se resuelven igual que nlargest"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'test.db')
+        df = pd.DataFrame({
+            'servicio': ['VISA C', 'VISA A', 'VISA B', 'VISA A'],
+            'categoria': ['VISAS', 'VISAS', 'VISAS', 'OTRAS'],
+            'costo_unitario': [10.0, 10.0, 10.0, 10.0],
+            'num_tramites': [2, 2, 2, 2],
+            'ingresos_totales': [20.0, 20.0, 20.0, 20.0],
+            'fecha_emision': pd.to_datetime(['2025-05-01'] * 4),
+            'formas_canceladas': [0, 0, 0, 0]
+        })
+        DatabaseManager(db_path).insert_data_from_dataframe(df, 'empates.xls')
+        processor = EnhancedDataProcessor(db_path)
+        assert processor.initialize_from_database()
+
+        top = check_parity(processor, 'get_top_services', by='ingresos', top_n=3)
+        assert top[['servicio', 'categoria']].values.tolist() == [
+            ['VISA A', 'OTRAS'], ['VISA A', 'VISAS'], ['VISA B', 'VISAS']
+        ]
+
+        connection_manager.close_all(db_path)
+
+
+def test_compiled_sql_is_parameterized():
+    """Los valores de filtro viajan como parámetros y el top-N como LIMIT"""
+    query, params = compile_aggregation(
+        ['servicio', 'categoria'], {'ingresos_totales': 'ingresos_totales'},
+        start_date='2025-01-01', categoria="ART. 22'", exclude_pattern='COMPULSA',
+        order_by=[('ingresos_totales', True)], limit=5
+    )
+    assert "ART. 22'" not in query
+    assert params == ['2025-01-01', "ART. 22'", '%COMPULSA%', 5]
+    assert query.rstrip().endswith('ORDER BY "ingresos_totales" DESC LIMIT ?')
+
+    try:
+        compile_aggregation(['servicio'], {'x': 'costo_unitario'})
+        assert False, "Se esperaba ValueError"
+    except ValueError:
+        pass
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de paridad SQL vs pandas...")
+    for test in (test_parity_full_range, test_parity_compact_mode, test_parity_date_ranges, test_top_services_ties,
+                 test_compiled_sql_is_parameterized):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests de la reducción de puntos de las series temporales
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Inicio'))
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from series_downsampling import downsample_frame, downsample_indices, figure_payload_bytes
+
+
+def test_peaks_and_troughs_survive():
+    """Ambos métodos respetan el presupuesto y conservan extremos, primer y último punto"""
+    rng = np.random.default_rng(7)
+    y = rng.normal(size=5000).cumsum()
+    y[1234] = 1e6
+    y[4321] = -1e6
+    y[100] = np.nan
+
+    for method in ('minmax', 'lttb'):
+        indices = downsample_indices(y, 500, method=method)
+        assert len(indices) <= 502
+        assert indices[0] == 0 and indices[-1] == len(y) - 1
+        assert np.all(np.diff(indices) > 0)
+        assert 1234 in indices and 4321 in indices
+
+    # minmax conserva el máximo y el mínimo de cada cubeta
+    indices = downsample_indices(y, 500, method='minmax')
+    kept = set(y[indices][~np.isnan(y[indices])])
+    edges = np.linspace(1, len(y) - 1, 250).astype(int)
+    for start, end in zip(edges[:-1], edges[1:]):
+        assert np.nanmax(y[start:end]) in kept and np.nanmin(y[start:end]) in kept
+
+    # Series cortas sin cambios
+    assert downsample_indices(np.arange(10), 500).tolist() == list(range(10))
+
+
+def test_downsampled_figure_payload():
+    """La figura de una serie diaria larga se envía con menos bytes"""
+    fechas = pd.date_range('2015-01-01', periods=3650, freq='D')
+    data = pd.DataFrame({'periodo': fechas.date, 'ingresos_totales': np.arange(3650) % 97 * 10.0})
+
+    reduced = downsample_frame(data, 'ingresos_totales', max_points=1000)
+    assert len(reduced) <= 1000
+    assert reduced['ingresos_totales'].max() == data['ingresos_totales'].max()
+    assert reduced['ingresos_totales'].min() == data['ingresos_totales'].min()
+    short = data.head(100)
+    assert downsample_frame(short, 'ingresos_totales', max_points=1000) is short
+
+    full_bytes = figure_payload_bytes(px.line(data, x='periodo', y='ingresos_totales'))
+    reduced_bytes = figure_payload_bytes(px.line(reduced, x='periodo', y='ingresos_totales'))
+    assert reduced_bytes < full_bytes / 2
+
+
+def main():
+    """Función principal de testing"""
+    print("Iniciando tests de la reducción de series...")
+    for test in (test_peaks_and_troughs_survive, test_downsampled_figure_payload):
+        test()
+        print(f"[OK] {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()